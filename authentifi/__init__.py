@@ -0,0 +1 @@
+"""Background services and indexes backing the Authentifi research app."""
@@ -0,0 +1,217 @@
+"""Bulk export and import of research topics.
+
+Topics are flattened to one row per message (topics without messages get a
+single row with empty message columns) and written in fixed-size batches as
+Parquet, Arrow IPC or JSON Lines. Readers also work batch by batch, so
+archives larger than memory can be moved between deployments; Parquet and
+Arrow files load straight into ``pandas.read_parquet`` / ``pyarrow``.
+
+Parquet and Arrow need the optional ``pyarrow`` package; JSON Lines works
+with the standard library only.
+"""
+import io
+import json
+import uuid
+from datetime import datetime
+from typing import IO, Dict, Iterable, Iterator, List, Optional
+
+FORMATS = ("parquet", "arrow", "jsonl")
+COLUMNS = ("topic_id", "topic_name", "topic_created_at",
+           "message_id", "role", "content", "timestamp")
+DEFAULT_BATCH_SIZE = 1000
+# Topics only hold the conversation; anything else would be sent to the model as is
+ROLES = ("user", "assistant")
+
+
+def format_for(filename: str) -> str:
+    lowered = filename.lower()
+    if lowered.endswith(".parquet"):
+        return "parquet"
+    if lowered.endswith((".arrow", ".ipc", ".feather")):
+        return "arrow"
+    if lowered.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ValueError(f"Unsupported archive type: {filename}")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet and Arrow archives require pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def check_format(fmt: str) -> None:
+    """Raise ValueError for an unknown format, ImportError when it needs pyarrow and that is missing"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown archive format: {fmt}")
+    if fmt != "jsonl":
+        _pyarrow()
+
+
+def _schema(pa):
+    return pa.schema([(name, pa.string()) for name in COLUMNS])
+
+
+def iter_rows(topics: Dict[str, Dict]) -> Iterator[Dict]:
+    for topic_id, topic in topics.items():
+        base = {
+            "topic_id": topic_id,
+            "topic_name": topic["name"],
+            "topic_created_at": topic.get("created_at"),
+        }
+        messages = topic.get("messages", [])
+        if not messages:
+            yield {**base, "message_id": None, "role": None, "content": None, "timestamp": None}
+        for message in messages:
+            yield {
+                **base,
+                "message_id": message.get("id"),
+                "role": message["role"],
+                "content": message["content"],
+                "timestamp": message.get("timestamp"),
+            }
+
+
+def batched(rows: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_topics(topics: Dict[str, Dict], sink: IO[bytes], fmt: str = "parquet",
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Write topics to a binary file object and return the number of rows"""
+    written = 0
+    batches = batched(iter_rows(topics), batch_size)
+    if fmt == "jsonl":
+        for batch in batches:
+            sink.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch).encode("utf-8"))
+            written += len(batch)
+        return written
+    pa = _pyarrow()
+    schema = _schema(pa)
+    if fmt == "parquet":
+        writer = pa.parquet.ParquetWriter(sink, schema)
+    elif fmt == "arrow":
+        writer = pa.ipc.new_file(sink, schema)
+    else:
+        raise ValueError(f"Unknown archive format: {fmt}")
+    with writer:
+        for batch in batches:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+            written += len(batch)
+    return written
+
+
+def iter_archive(source: IO[bytes], fmt: str,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict]]:
+    """Read an archive back as batches of row dicts"""
+    if fmt == "jsonl":
+        lines = (json.loads(line) for line in io.TextIOWrapper(source, encoding="utf-8") if line.strip())
+        yield from batched(lines, batch_size)
+        return
+    pa = _pyarrow()
+    if fmt == "parquet":
+        for record_batch in pa.parquet.ParquetFile(source).iter_batches(batch_size=batch_size):
+            yield record_batch.to_pylist()
+    elif fmt == "arrow":
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i).to_pylist()
+    else:
+        raise ValueError(f"Unknown archive format: {fmt}")
+
+
+def _timestamp(value, field: str, row_number: int) -> Optional[str]:
+    """ISO timestamp of an archive value, or None when it is missing"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).isoformat()
+        except ValueError:
+            pass
+    raise ValueError(f"Archive row {row_number}: {field} is not an ISO timestamp: {value!r}")
+
+
+def _checked(row: Dict, row_number: int) -> Dict:
+    """The row with its values validated, or ValueError naming what is wrong"""
+    if not isinstance(row, dict):
+        raise ValueError(f"Archive row {row_number} is not a record")
+    missing = [name for name in COLUMNS if name not in row]
+    if missing:
+        raise ValueError(f"Archive row {row_number} is missing columns: {', '.join(missing)}")
+    if not isinstance(row["topic_id"], str) or not row["topic_id"]:
+        raise ValueError(f"Archive row {row_number} has no topic_id")
+    if row["role"] is not None:
+        if row["role"] not in ROLES:
+            raise ValueError(f"Archive row {row_number} has an unknown role: {row['role']!r}")
+        if not isinstance(row["content"], str):
+            raise ValueError(f"Archive row {row_number} has no message content")
+    return {
+        **row,
+        "topic_name": str(row["topic_name"]) if row["topic_name"] else "Imported topic",
+        "topic_created_at": _timestamp(row["topic_created_at"], "topic_created_at", row_number),
+        "message_id": str(row["message_id"]) if row["message_id"] else None,
+        "timestamp": _timestamp(row["timestamp"], "timestamp", row_number),
+    }
+
+
+def import_topics(source: IO[bytes], fmt: str, topics: Dict[str, Dict],
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """Merge an archive into topics, skipping messages that already exist
+
+    The whole archive is checked before anything is merged, so a ValueError
+    leaves topics unchanged. Missing timestamps default to the previous
+    message's (or the topic's creation time, or now).
+    """
+    now = datetime.now().isoformat()
+    known_ids: Dict[str, set] = {}
+    new_topics: Dict[str, Dict] = {}
+    new_messages: Dict[str, List[Dict]] = {}
+    row_number = 0
+    for batch in iter_archive(source, fmt, batch_size):
+        for row in batch:
+            row_number += 1
+            row = _checked(row, row_number)
+            topic_id = row["topic_id"]
+            topic: Optional[Dict] = topics.get(topic_id) or new_topics.get(topic_id)
+            if topic is None:
+                topic = new_topics[topic_id] = {
+                    "name": row["topic_name"],
+                    "messages": [],
+                    "created_at": row["topic_created_at"] or row["timestamp"] or now,
+                }
+            if row["role"] is None:
+                continue
+            ids = known_ids.get(topic_id)
+            if ids is None:
+                ids = known_ids[topic_id] = {m.get("id") for m in topic["messages"]}
+            if row["message_id"] and row["message_id"] in ids:
+                continue
+            ids.add(row["message_id"])
+            added = new_messages.setdefault(topic_id, [])
+            previous = added[-1] if added else (topic["messages"][-1] if topic["messages"] else None)
+            added.append({
+                "id": row["message_id"] or str(uuid.uuid4()),
+                "role": row["role"],
+                "content": row["content"],
+                "timestamp": row["timestamp"] or (previous["timestamp"] if previous else topic["created_at"]),
+            })
+    topics.update(new_topics)
+    for topic_id, messages in new_messages.items():
+        # Branched topics hold a copy-on-write Branch, which only supports append
+        for message in messages:
+            topics[topic_id]["messages"].append(message)
+    return {"topics": len(new_topics), "messages": sum(len(messages) for messages in new_messages.values())}
@@ -0,0 +1,196 @@
+"""Chat completion backends.
+
+``ResearchChat`` talks to an ``LLMBackend`` rather than to ``openai.OpenAI``
+directly so the app can run against the OpenAI API, any local server that
+speaks the OpenAI protocol (llama.cpp, vLLM, Ollama, LM Studio), or the
+in-process ``OfflineBackend`` when there is no network at all.
+"""
+import contextlib
+import functools
+import re
+import socket
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterator, List, Optional
+
+UsageCallback = Callable[[Dict], None]
+# Called with a function that aborts the request; safe to call from another thread
+OpenCallback = Callable[[Callable[[], None]], None]
+
+
+class LLMBackend(ABC):
+    """Backends call on_usage once per request with prompt_tokens,
+    completion_tokens and cached_tokens, when the server reports them, and
+    on_open once the request is sent, with a function that aborts it even
+    while the stream is blocked waiting for the next chunk."""
+
+    name = "backend"
+
+    @abstractmethod
+    def stream_chat(self, messages: List[Dict], model: str, max_tokens: Optional[int] = None,
+                    on_usage: Optional[UsageCallback] = None,
+                    on_open: Optional[OpenCallback] = None) -> Iterator[str]:
+        """Yield completion text chunks"""
+
+    def complete(self, messages: List[Dict], model: str, max_tokens: Optional[int] = None,
+                 on_usage: Optional[UsageCallback] = None) -> str:
+        return "".join(self.stream_chat(messages, model, max_tokens, on_usage))
+
+
+def usage_dict(usage) -> Dict:
+    """Normalize an OpenAI usage object"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens or 0,
+        "completion_tokens": usage.completion_tokens or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details else 0,
+    }
+
+
+def _shutdown(response) -> None:
+    """Shut down an HTTP response's socket; unlike close() this wakes a thread blocked reading it"""
+    network_stream = response.extensions.get("network_stream")
+    sock = network_stream.get_extra_info("socket") if network_stream is not None else None
+    if sock is not None:
+        with contextlib.suppress(OSError):
+            sock.shutdown(socket.SHUT_RDWR)
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI API, or any server exposing the same chat completions endpoint."""
+
+    name = "openai"
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None,
+                 model_override: Optional[str] = None, include_usage: bool = True):
+        from openai import OpenAI
+
+        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.model_override = model_override
+        self.include_usage = include_usage
+
+    def stream_chat(self, messages: List[Dict], model: str, max_tokens: Optional[int] = None,
+                    on_usage: Optional[UsageCallback] = None,
+                    on_open: Optional[OpenCallback] = None) -> Iterator[str]:
+        options = {"stream_options": {"include_usage": True}} if self.include_usage else {}
+        with self.client.chat.completions.create(
+            model=self.model_override or model,
+            messages=messages,
+            max_tokens=max_tokens,
+            stream=True,
+            **options
+        ) as stream:
+            if on_open is not None:
+                on_open(functools.partial(_shutdown, stream.response))
+            for chunk in stream:
+                if chunk.usage is not None and on_usage is not None:
+                    on_usage(usage_dict(chunk.usage))
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    def complete(self, messages: List[Dict], model: str, max_tokens: Optional[int] = None,
+                 on_usage: Optional[UsageCallback] = None) -> str:
+        response = self.client.chat.completions.create(
+            model=self.model_override or model,
+            messages=messages,
+            max_tokens=max_tokens
+        )
+        if response.usage is not None and on_usage is not None:
+            on_usage(usage_dict(response.usage))
+        return response.choices[0].message.content or ""
+
+
+class OfflineBackend(LLMBackend):
+    """Deterministic in-process responder for offline use and benchmarks.
+
+    It answers by restating the question and the most relevant earlier
+    sentences from the conversation, streamed word by word. ``delay`` adds a
+    per-chunk pause to mimic a model's token rate.
+    """
+
+    name = "offline"
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def stream_chat(self, messages: List[Dict], model: str, max_tokens: Optional[int] = None,
+                    on_usage: Optional[UsageCallback] = None,
+                    on_open: Optional[OpenCallback] = None) -> Iterator[str]:
+        aborted = threading.Event()
+        if on_open is not None:
+            on_open(aborted.set)
+        words = self._answer(messages).split(" ")
+        if max_tokens is not None:
+            words = words[:max(1, max_tokens)]
+        for i, word in enumerate(words):
+            if self.delay and aborted.wait(self.delay):
+                return
+            yield word if i == 0 else " " + word
+        if on_usage is not None:
+            on_usage({
+                "prompt_tokens": sum(len(m["content"]) for m in messages) // 4,
+                "completion_tokens": len(words),
+                "cached_tokens": 0,
+            })
+
+    def _answer(self, messages: List[Dict]) -> str:
+        question = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        terms = set(re.findall(r"[a-z]{4,}", question.lower()))
+        related = []
+        for message in messages[:-1]:
+            if message["role"] == "system":
+                continue
+            for sentence in re.split(r"(?<=[.!?])\s+", message["content"]):
+                if terms & set(re.findall(r"[a-z]{4,}", sentence.lower())):
+                    related.append(sentence.strip())
+        answer = f"Offline answer to: {question.strip()}"
+        if related:
+            answer += "\n\nRelated points from this conversation:\n" + "\n".join(
+                f"- {sentence}" for sentence in related[-3:]
+            )
+        return answer
+
+
+def conformance_failures(backend: LLMBackend, model: str) -> List[str]:
+    """Run the checks every backend must pass; an empty list means it conforms"""
+    failures = []
+    messages = [
+        {"role": "system", "content": "You are a concise research assistant."},
+        {"role": "user", "content": "Reply with one short sentence about research."},
+    ]
+    usage = []
+    try:
+        chunks = list(backend.stream_chat(messages, model, on_usage=usage.append))
+    except Exception as e:
+        return [f"stream_chat raised {type(e).__name__}: {e}"]
+    if len(usage) > 1:
+        failures.append("stream_chat reported usage more than once")
+    elif usage and not {"prompt_tokens", "completion_tokens", "cached_tokens"} <= set(usage[0]):
+        failures.append("stream_chat reported usage without token counts")
+    if not chunks:
+        failures.append("stream_chat yielded no chunks")
+    if not all(isinstance(chunk, str) for chunk in chunks):
+        failures.append("stream_chat yielded non-string chunks")
+    if not "".join(chunks).strip():
+        failures.append("stream_chat produced an empty answer")
+    try:
+        answer = backend.complete(messages, model, max_tokens=16)
+    except Exception as e:
+        failures.append(f"complete raised {type(e).__name__}: {e}")
+    else:
+        if not isinstance(answer, str) or not answer.strip():
+            failures.append("complete returned an empty answer")
+    try:
+        stream = backend.stream_chat(messages + [
+            {"role": "assistant", "content": "Research needs evidence."},
+            {"role": "user", "content": "Say it differently."},
+        ], model)
+        next(iter(stream))
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+    except StopIteration:
+        failures.append("multi-turn stream yielded nothing")
+    except Exception as e:
+        failures.append(f"multi-turn or early close raised {type(e).__name__}: {e}")
+    return failures
@@ -0,0 +1,38 @@
+"""Shared worker pool for work that must stay off the Streamlit rerun path."""
+import importlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Set
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+_warmed: Set[str] = set()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="authentifi")
+        return _executor
+
+
+def submit(fn: Callable, *args, **kwargs) -> Future:
+    """Run fn in the shared background pool"""
+    return get_executor().submit(fn, *args, **kwargs)
+
+
+def _import_quietly(name: str) -> None:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+
+
+def warm_up(*modules: str) -> None:
+    """Import heavy modules in the background so first use does not pay for them"""
+    with _lock:
+        pending = [name for name in modules if name not in _warmed]
+        _warmed.update(pending)
+    for name in pending:
+        submit(_import_quietly, name)
@@ -0,0 +1,85 @@
+"""Copy-on-write conversation branches.
+
+A topic's message list is append-only, so any prefix of it never changes.
+A ``Branch`` is a message list made of a shared prefix of its parent (the
+first ``fork_at`` messages) plus the messages appended to the branch
+itself. Forking stores only the parent pointer and the fork position, so it
+is O(1) however long the history is; the branches of a topic form a tree
+whose nodes share every common prefix. Indexing walks up to the segment that
+owns a position, and iteration walks the branch path from the root once.
+"""
+from typing import Dict, Iterator, List, Sequence, Set, Tuple, Union
+
+Messages = Union[List[Dict], "Branch"]
+
+
+class Branch(Sequence):
+    __slots__ = ("parent", "fork_at", "own")
+
+    def __init__(self, parent: Messages, fork_at: int):
+        if not 0 <= fork_at <= len(parent):
+            raise IndexError(f"cannot fork at {fork_at} of {len(parent)} messages")
+        self.parent = parent
+        self.fork_at = fork_at
+        self.own: List[Dict] = []
+
+    def __len__(self) -> int:
+        return self.fork_at + len(self.own)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("message index out of range")
+        node: Messages = self
+        while isinstance(node, Branch) and index < node.fork_at:
+            node = node.parent
+        return node.own[index - node.fork_at] if isinstance(node, Branch) else node[index]
+
+    def __iter__(self) -> Iterator[Dict]:
+        path = []
+        node: Messages = self
+        end = len(self)
+        while isinstance(node, Branch):
+            path.append((node.own, max(0, end - node.fork_at)))
+            end = min(end, node.fork_at)
+            node = node.parent
+        yield from node[:end]
+        for own, count in reversed(path):
+            yield from own[:count]
+
+    def append(self, message: Dict) -> None:
+        self.own.append(message)
+
+    @property
+    def depth(self) -> int:
+        depth, node = 0, self
+        while isinstance(node, Branch):
+            depth, node = depth + 1, node.parent
+        return depth
+
+
+def fork(messages: Messages, at: int) -> Branch:
+    """Branch sharing the first `at` messages, attached to the shallowest ancestor that holds them"""
+    if not 0 <= at <= len(messages):
+        raise IndexError(f"cannot fork at {at} of {len(messages)} messages")
+    while isinstance(messages, Branch) and at <= messages.fork_at:
+        messages = messages.parent
+    return Branch(messages, at)
+
+
+def lineage(topics: Dict[str, Dict], topic_id: str) -> Tuple[List[str], Set[str]]:
+    """Ids of a topic and the topics it branched from, plus the ids of the
+    ancestors' messages written after the point the branch shares"""
+    scope = [topic_id]
+    later: Set[str] = set()
+    topic = topics[topic_id]
+    shared = len(topic["messages"])
+    while topic.get("parent_id") in topics:
+        shared = min(shared, topic.get("forked_at", shared))
+        scope.append(topic["parent_id"])
+        topic = topics[topic["parent_id"]]
+        later.update(message["id"] for message in topic["messages"][shared:])
+    return scope, later
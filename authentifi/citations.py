@@ -0,0 +1,238 @@
+"""Citation verification against a local bibliographic database.
+
+The database is SQLite with one row per work (DOI, title, year, first
+author's surname), imported from Crossref or OpenAlex JSON-lines dumps with
+``python -m authentifi.citations import <dump.jsonl>``. A Bloom filter over
+every DOI, title and (first author, year) pair is kept beside it and rebuilt when
+the database changes, so most unknown citations are rejected without
+touching SQLite; the rest are confirmed with a few batched, indexed
+queries. Verification runs as a job on the background queue, so any worker
+process can take it, and its results are recorded on the topic's
+``SourceIndex``.
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+from authentifi.sources import normalize_doi, normalize_title
+
+# normalize_title in SQL, short of collapsing whitespace; the same expression is indexed
+_TITLE_KEY = "rtrim(lower(title), '.,;:!?*_''\")]>')"
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS work (
+    doi TEXT PRIMARY KEY,
+    title TEXT,
+    year INTEGER,
+    first_author TEXT
+);
+CREATE INDEX IF NOT EXISTS work_author_year ON work (first_author, year);
+CREATE INDEX IF NOT EXISTS work_title ON work ({_TITLE_KEY});
+"""
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def save(self, path: Path, stamp: str) -> None:
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp, bits=self.bits, size=self.size, hashes=self.hashes, stamp=stamp)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, stamp: str) -> Optional["BloomFilter"]:
+        try:
+            with np.load(path) as data:
+                if str(data["stamp"]) != stamp:
+                    return None
+                bloom = cls.__new__(cls)
+                bloom.bits = data["bits"]
+                bloom.size = int(data["size"])
+                bloom.hashes = int(data["hashes"])
+                return bloom
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def citation_key(author: str, year: int) -> str:
+    """Same key format as sources.find_sources uses for author-year citations"""
+    return f"cite:{author.lower()}|{year}"
+
+
+def _surname(name: str) -> str:
+    parts = re.findall(r"[A-Za-z'\-]+", name)
+    return parts[-1].lower() if parts else ""
+
+
+def parse_work(record: Dict) -> Optional[Tuple[str, str, Optional[int], str]]:
+    """(doi, title, year, first author surname) from a Crossref or OpenAlex record"""
+    doi = record.get("DOI") or record.get("doi") or ""
+    doi = normalize_doi(re.sub(r"^https?://(dx\.)?doi\.org/", "", doi, flags=re.IGNORECASE))
+    if not doi:
+        return None
+    title = record.get("title") or record.get("display_name") or ""
+    if isinstance(title, list):
+        title = title[0] if title else ""
+    year = record.get("publication_year")
+    if year is None:
+        parts = (record.get("issued") or record.get("published") or {}).get("date-parts") or [[None]]
+        year = parts[0][0] if parts and parts[0] else None
+    author = ""
+    if record.get("author"):
+        first = record["author"][0]
+        author = (first.get("family") or _surname(first.get("name", ""))).lower()
+    elif record.get("authorships"):
+        author = _surname(record["authorships"][0].get("author", {}).get("display_name", ""))
+    return doi, title, int(year) if year else None, author
+
+
+def import_jsonl(db_path: Path, source: TextIO, batch_size: int = 10000) -> int:
+    """Load a Crossref/OpenAlex JSON-lines dump; returns how many works were added"""
+    def works() -> Iterator[Tuple]:
+        for line in source:
+            if line.strip():
+                work = parse_work(json.loads(line))
+                if work:
+                    yield work
+
+    added = 0
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(_SCHEMA)
+        batch = []
+        for work in works():
+            batch.append(work)
+            if len(batch) == batch_size:
+                added += conn.executemany("INSERT OR IGNORE INTO work VALUES (?, ?, ?, ?)", batch).rowcount
+                batch = []
+        added += conn.executemany("INSERT OR IGNORE INTO work VALUES (?, ?, ?, ?)", batch).rowcount
+    return added
+
+
+class CitationVerifier:
+    def __init__(self, db_path: Path, error_rate: float = 0.01):
+        self.db_path = db_path
+        self.bloom_path = Path(db_path).with_suffix(".bloom.npz")
+        self.error_rate = error_rate
+        self.bloom: Optional[BloomFilter] = None
+        self._bloom_stamp = ""
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return Path(self.db_path).exists()
+
+    def _stamp(self) -> str:
+        stat = Path(self.db_path).stat()
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _filter(self) -> BloomFilter:
+        """The Bloom filter for the current database, loaded or rebuilt as needed"""
+        with self._lock:
+            stamp = self._stamp()
+            if self.bloom is not None and self._bloom_stamp == stamp:
+                return self.bloom
+            bloom = BloomFilter.load(self.bloom_path, stamp)
+            if bloom is None:
+                with sqlite3.connect(self.db_path) as conn:
+                    count = conn.execute("SELECT COUNT(*) FROM work").fetchone()[0]
+                    bloom = BloomFilter(3 * count, self.error_rate)
+                    for doi, title, author, year in conn.execute("SELECT doi, title, first_author, year FROM work"):
+                        bloom.add(f"doi:{doi}")
+                        if title:
+                            bloom.add(f"title:{normalize_title(title)}")
+                        if author and year:
+                            bloom.add(citation_key(author, year))
+                bloom.save(self.bloom_path, stamp)
+            self.bloom, self._bloom_stamp = bloom, stamp
+            return bloom
+
+    def verify(self, keys: Iterable[str], batch_size: int = 500) -> Dict[str, bool]:
+        """Whether each doi:/cite:/title: source key matches a work in the database"""
+        keys = list(keys)
+        results = {key: False for key in keys}
+        if not keys or not self.available:
+            return results
+        bloom = self._filter()
+        maybe = [key for key in keys if key in bloom]
+        dois = [key[4:] for key in maybe if key.startswith("doi:")]
+        pairs = [(author, int(year)) for author, _, year in
+                 (key[5:].partition("|") for key in maybe if key.startswith("cite:"))]
+        titles = [key[6:] for key in maybe if key.startswith("title:")]
+        with sqlite3.connect(self.db_path) as conn:
+            for start in range(0, len(dois), batch_size):
+                batch = dois[start:start + batch_size]
+                for (doi,) in conn.execute(
+                    f"SELECT doi FROM work WHERE doi IN ({','.join('?' * len(batch))})", batch
+                ):
+                    results[f"doi:{doi}"] = True
+            # Each (author, year) term is answered from the work_author_year index
+            for start in range(0, len(pairs), batch_size):
+                batch = pairs[start:start + batch_size]
+                terms = " OR ".join(["(first_author = ? AND year = ?)"] * len(batch))
+                for author, year in conn.execute(
+                    f"SELECT DISTINCT first_author, year FROM work WHERE {terms}",
+                    [value for pair in batch for value in pair]
+                ):
+                    results[citation_key(author, year)] = True
+            for start in range(0, len(titles), batch_size):
+                batch = titles[start:start + batch_size]
+                for (title,) in conn.execute(
+                    f"SELECT DISTINCT {_TITLE_KEY} FROM work WHERE {_TITLE_KEY} IN ({','.join('?' * len(batch))})",
+                    batch
+                ):
+                    results[f"title:{title}"] = True
+        return results
+
+
+_verifiers: Dict[str, CitationVerifier] = {}
+
+
+def verify_job(payload: Dict, context=None) -> Dict[str, bool]:
+    """Job handler: verify payload["keys"] against the database at payload["db"]"""
+    # One verifier per database per process, so its Bloom filter is loaded once
+    verifier = _verifiers.setdefault(payload["db"], CitationVerifier(Path(payload["db"])))
+    return verifier.verify(payload["keys"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local bibliographic database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("import", help="import a Crossref or OpenAlex JSON-lines dump")
+    load.add_argument("dump", type=Path)
+    load.add_argument("--db", type=Path, default=None, help="defaults to bibliography.db in the data dir")
+    args = parser.parse_args()
+
+    from authentifi import config
+
+    db_path = args.db or config.data_dir() / "bibliography.db"
+    with open(args.dump, encoding="utf-8") as source:
+        added = import_jsonl(db_path, source)
+    print(f"Imported {added:,} works into {db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Shared topics with live message fan-out.
+
+A shared topic's dict is registered with the hub so every session that joins
+works on the same message list. Changes are pushed as small events through a
+broker: completed messages, plus the deltas of assistant answers that are
+still streaming. Viewers drain their own subscription queue instead of
+polling the topic. The broker only holds subscriptions weakly, so a queue
+goes away with the session that owns it even if it is never unsubscribed.
+``InProcessBroker`` serves a single server process; another broker with the
+same publish/subscribe interface can replace it for multi-process
+deployments.
+"""
+import queue
+import threading
+import weakref
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+
+class Subscription:
+    def __init__(self, channel: str, maxsize: int = 1000):
+        self.channel = channel
+        self.events: "queue.Queue[Dict]" = queue.Queue(maxsize=maxsize)
+
+    def deliver(self, event: Dict) -> None:
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def drain(self) -> List[Dict]:
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._subscribers: Dict[str, "weakref.WeakSet[Subscription]"] = defaultdict(weakref.WeakSet)
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, event: Dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(channel)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def subscriber_count(self, channel: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+class LiveView:
+    """What one viewer of a shared topic draws on top of the stored messages:
+    messages other sessions added since the last full redraw, and their
+    answers that are still streaming."""
+
+    def __init__(self, origin: str):
+        self.origin = origin
+        self.messages: List[Dict] = []
+        self.streams: Dict[str, str] = {}
+
+    def apply(self, events: List[Dict], keep_messages: bool = True) -> None:
+        """Fold drained events in, skipping this viewer's own"""
+        for event in events:
+            if event["origin"] == self.origin:
+                continue
+            if event["type"] == "delta":
+                self.streams[event["stream_id"]] = self.streams.get(event["stream_id"], "") + event["text"]
+            elif event["type"] == "end":
+                self.streams.pop(event["stream_id"], None)
+            else:
+                self.streams.pop(event["message"]["id"], None)
+                if keep_messages:
+                    self.messages.append(event["message"])
+
+    def redrawn(self, events: List[Dict]) -> None:
+        """A full redraw has shown every stored message; keep only the open streams"""
+        self.messages = []
+        self.apply(events, keep_messages=False)
+
+
+class CollaborationHub:
+    def __init__(self, broker: Optional[InProcessBroker] = None):
+        self.broker = broker or InProcessBroker()
+        self.topics: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def share(self, topic_id: str, topic: Dict) -> None:
+        with self._lock:
+            self.topics.setdefault(topic_id, topic)
+        topic["shared"] = True
+
+    def join(self, topic_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self.topics.get(topic_id)
+
+    def subscribe(self, topic_id: str) -> Subscription:
+        return self.broker.subscribe(topic_id)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.broker.unsubscribe(subscription)
+
+    def message_added(self, topic_id: str, message: Dict, origin: str) -> None:
+        self.broker.publish(topic_id, {"type": "message", "message": message, "origin": origin})
+
+    def stream_delta(self, topic_id: str, stream_id: str, text: str, origin: str) -> None:
+        self.broker.publish(topic_id, {"type": "delta", "stream_id": stream_id, "text": text, "origin": origin})
+
+    def stream_end(self, topic_id: str, stream_id: str, origin: str) -> None:
+        self.broker.publish(topic_id, {"type": "end", "stream_id": stream_id, "origin": origin})
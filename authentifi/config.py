@@ -0,0 +1,20 @@
+"""Deployment settings read from the environment."""
+import os
+from pathlib import Path
+
+
+def data_dir() -> Path:
+    """Directory for the app's local stores, created on first use"""
+    path = Path(os.environ.get("AUTHENTIFI_DATA_DIR", ".authentifi"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def int_setting(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def path_setting(name: str, default: Path) -> Path:
+    value = os.environ.get(name)
+    return Path(value) if value else default
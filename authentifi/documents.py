@@ -0,0 +1,290 @@
+"""Document uploads: extraction, chunking and indexing off the request path.
+
+An upload is stored under its SHA-256 and recorded in SQLite; the script
+run returns straight away and a process pool does the rest. Each worker
+streams text out of the file (page by page for PDF, paragraph by paragraph
+for DOCX and plain text), packs it into chunks, skips chunks whose content
+hash the topic already holds, and journals the rest into the semantic
+memory, where they are recalled like earlier turns, and into the overlap
+index that backs the authenticity score. Progress is written
+back after every batch, so the UI only reads a row and an interrupted
+ingestion resumes after the last finished batch. Uploading the same file
+to the same topic again is a no-op.
+
+A worker claims a document by recording itself as the owner with a lease
+that every batch renews, like the job queue does. On start-up, only
+documents whose lease has run out, or whose owner on this host has exited,
+are picked up again, so several server processes can share one data
+directory without ingesting the same file twice.
+
+PDF extraction needs the optional ``pypdf`` package; DOCX and text files
+use only the standard library.
+"""
+import hashlib
+import multiprocessing
+import os
+import re
+import socket
+import sqlite3
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from authentifi.jobs import alive
+
+KINDS = {".pdf": "pdf", ".docx": "docx", ".txt": "txt", ".md": "txt"}
+CHUNK_CHARS = 1200
+BATCH_SIZE = 32
+# Seconds a worker holds a document without renewing its claim
+LEASE = 120.0
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+_SCHEMA = """
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS document (
+    doc_hash TEXT NOT NULL,
+    topic_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    chunks_done INTEGER NOT NULL DEFAULT 0,
+    chunks_indexed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL NOT NULL,
+    owner TEXT,
+    lease_until REAL,
+    PRIMARY KEY (doc_hash, topic_id)
+);
+"""
+
+# Paragraphs: (text, fraction of the file read so far)
+Paragraphs = Iterator[Tuple[str, float]]
+
+
+def kind_for(filename: str) -> str:
+    kind = KINDS.get(Path(filename).suffix.lower())
+    if kind is None:
+        raise ValueError(f"Unsupported document type: {filename}")
+    return kind
+
+
+def _pdf_paragraphs(path: Path) -> Paragraphs:
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ImportError("Reading PDF files needs pypdf: pip install pypdf") from e
+    reader = PdfReader(path)
+    pages = len(reader.pages)
+    for number, page in enumerate(reader.pages, start=1):
+        for paragraph in re.split(r"\n\s*\n", page.extract_text() or ""):
+            yield paragraph, number / pages
+
+
+def _docx_paragraphs(path: Path) -> Paragraphs:
+    with zipfile.ZipFile(path) as archive:
+        size = archive.getinfo("word/document.xml").file_size or 1
+        with archive.open("word/document.xml") as xml:
+            for _, element in ElementTree.iterparse(xml):
+                if element.tag == f"{_W}p":
+                    yield "".join(node.text or "" for node in element.iter(f"{_W}t")), min(1.0, xml.tell() / size)
+                    element.clear()
+
+
+def _text_paragraphs(path: Path) -> Paragraphs:
+    size = path.stat().st_size or 1
+    lines: List[str] = []
+    with open(path, "rb") as f:
+        for raw in f:
+            line = raw.decode("utf-8", errors="replace").rstrip()
+            if line:
+                lines.append(line)
+            elif lines:
+                yield " ".join(lines), f.tell() / size
+                lines = []
+        if lines:
+            yield " ".join(lines), 1.0
+
+
+EXTRACTORS = {"pdf": _pdf_paragraphs, "docx": _docx_paragraphs, "txt": _text_paragraphs}
+
+
+def chunks(paragraphs: Paragraphs, size: int = CHUNK_CHARS) -> Iterator[Tuple[str, float]]:
+    """Pack paragraphs into chunks of at most `size` characters, splitting long ones at spaces"""
+    buffer = ""
+    fraction = 0.0
+    for paragraph, fraction in paragraphs:
+        paragraph = " ".join(paragraph.split())
+        while len(paragraph) > size:
+            cut = paragraph.rfind(" ", 0, size)
+            cut = cut if cut > 0 else size
+            if buffer:
+                yield buffer, fraction
+                buffer = ""
+            yield paragraph[:cut], fraction
+            paragraph = paragraph[cut:].lstrip()
+        if buffer and len(buffer) + 1 + len(paragraph) > size:
+            yield buffer, fraction
+            buffer = ""
+        if paragraph:
+            buffer = f"{buffer}\n{paragraph}" if buffer else paragraph
+    if buffer:
+        yield buffer, fraction
+
+
+def _update(db_path: Path, doc_hash: str, topic_id: str, owner: Optional[str] = None, **fields) -> bool:
+    """Update a document row; with an owner, only while that worker still holds it"""
+    fields["updated"] = time.time()
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    condition = " AND owner = ?" if owner is not None else ""
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        return conn.execute(f"UPDATE document SET {assignments} WHERE doc_hash = ? AND topic_id = ?{condition}",
+                            [*fields.values(), doc_hash, topic_id, *([owner] if owner is not None else [])]
+                            ).rowcount > 0
+
+
+def _claim(db_path: Path, doc_hash: str, topic_id: str, owner: str) -> bool:
+    """Take a queued document, or one whose previous worker let its lease run out"""
+    now = time.time()
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        return conn.execute(
+            """UPDATE document SET status = 'processing', owner = ?, lease_until = ?, updated = ?
+               WHERE doc_hash = ? AND topic_id = ?
+                 AND (status = 'queued' OR (status = 'processing' AND (lease_until IS NULL OR lease_until < ?)))""",
+            (owner, now + LEASE, now, doc_hash, topic_id, now)
+        ).rowcount > 0
+
+
+class _LeaseLost(Exception):
+    pass
+
+
+def ingest(db_path: Path, memory_path: Path, overlap_path: Path, path: Path, doc_hash: str, topic_id: str) -> None:
+    """Worker process: extract, chunk, dedup and index one document, resuming where it stopped"""
+    from authentifi.memory import journal
+    from authentifi.overlap import OverlapIndex
+
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    if not _claim(db_path, doc_hash, topic_id, owner):
+        # Done, or being ingested by a live worker
+        return
+    overlap = OverlapIndex(overlap_path)
+
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        user_id, name, kind, done, indexed = conn.execute(
+            "SELECT user_id, name, kind, chunks_done, chunks_indexed FROM document WHERE doc_hash = ? AND topic_id = ?",
+            (doc_hash, topic_id)
+        ).fetchone()
+
+    def renew(**fields) -> float:
+        if not _update(db_path, doc_hash, topic_id, owner, lease_until=time.time() + LEASE, **fields):
+            raise _LeaseLost()
+        return time.time()
+
+    seen = set()
+    batch: List[Dict] = []
+    number = 0
+    renewed = time.time()
+    try:
+        for number, (text, fraction) in enumerate(chunks(EXTRACTORS[kind](path)), start=1):
+            chunk_hash = hashlib.sha1(text.lower().encode("utf-8")).hexdigest()
+            if number <= done or chunk_hash in seen:
+                seen.add(chunk_hash)
+                # Skipping a long finished prefix still has to keep the claim alive
+                if time.time() - renewed > LEASE / 3:
+                    renewed = renew()
+                continue
+            seen.add(chunk_hash)
+            # The id is the content hash, so a chunk the topic already holds is skipped by the journal
+            batch.append({"id": f"doc:{topic_id}:{chunk_hash}", "role": "document", "content": f"[{name}] {text}"})
+            if len(batch) == BATCH_SIZE:
+                indexed += journal(memory_path, user_id, topic_id, batch)
+                overlap.add_chunks(user_id, batch)
+                batch = []
+                renewed = renew(chunks_done=number, chunks_indexed=indexed, progress=fraction)
+        indexed += journal(memory_path, user_id, topic_id, batch)
+        overlap.add_chunks(user_id, batch)
+        _update(db_path, doc_hash, topic_id, owner, status="done", progress=1.0,
+                chunks_done=number, chunks_indexed=indexed, lease_until=None)
+    except _LeaseLost:
+        # Another worker took the document over after this one stalled; it carries on from the last batch
+        pass
+    except Exception as e:
+        _update(db_path, doc_hash, topic_id, owner, status="failed", error=f"{type(e).__name__}: {e}",
+                lease_until=None)
+
+
+class DocumentIngestor:
+    def __init__(self, db_path: Path, upload_dir: Path, memory_path: Path, overlap_path: Path, workers: int = 2):
+        self.db_path = db_path
+        self.upload_dir = upload_dir
+        self.memory_path = memory_path
+        self.overlap_path = overlap_path
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.executescript(_SCHEMA)
+        self.resume()
+
+    def submit(self, user_id: str, topic_id: str, name: str, data: bytes) -> str:
+        """Store the upload and queue it; returns the document hash"""
+        kind = kind_for(name)
+        doc_hash = hashlib.sha256(data).hexdigest()
+        path = self.upload_dir / f"{doc_hash}{Path(name).suffix.lower()}"
+        if not path.exists():
+            tmp = path.with_name(path.name + ".part")
+            tmp.write_bytes(data)
+            tmp.replace(path)
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            inserted = conn.execute(
+                """INSERT OR IGNORE INTO document (doc_hash, topic_id, user_id, name, kind, status, updated)
+                   VALUES (?, ?, ?, ?, ?, 'queued', ?)""",
+                (doc_hash, topic_id, user_id, name, kind, time.time())
+            ).rowcount
+            # A failed document is retried when it is uploaded again
+            inserted = inserted or conn.execute(
+                """UPDATE document SET status = 'queued', error = NULL, updated = ?
+                   WHERE doc_hash = ? AND topic_id = ? AND status = 'failed'""",
+                (time.time(), doc_hash, topic_id)
+            ).rowcount
+        if inserted:
+            self.pool.submit(ingest, self.db_path, self.memory_path, self.overlap_path, path, doc_hash, topic_id)
+        return doc_hash
+
+    def resume(self) -> None:
+        """Requeue documents whose worker has stopped: never claimed, lease run out, or owner exited"""
+        host = socket.gethostname()
+        now = time.time()
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            rows = conn.execute(
+                "SELECT doc_hash, topic_id, name, status, owner, lease_until FROM document "
+                "WHERE status IN ('queued', 'processing')"
+            ).fetchall()
+            pending = []
+            for doc_hash, topic_id, name, status, owner, lease_until in rows:
+                if status == "processing" and owner and lease_until is not None and lease_until >= now:
+                    owner_host, pid, _ = owner.rsplit(":", 2)
+                    if owner_host != host or alive(int(pid)):
+                        continue
+                    # The owner is gone, so its lease can be given up now rather than when it expires
+                    conn.execute("UPDATE document SET lease_until = NULL WHERE doc_hash = ? AND topic_id = ? "
+                                 "AND owner = ?", (doc_hash, topic_id, owner))
+                pending.append((doc_hash, topic_id, name))
+        for doc_hash, topic_id, name in pending:
+            path = self.upload_dir / f"{doc_hash}{Path(name).suffix.lower()}"
+            self.pool.submit(ingest, self.db_path, self.memory_path, self.overlap_path, path, doc_hash, topic_id)
+
+    def documents(self, topic_id: str) -> List[Dict]:
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(
+                """SELECT name, status, progress, chunks_indexed, error FROM document
+                   WHERE topic_id = ? ORDER BY updated DESC""",
+                (topic_id,)
+            )]
@@ -0,0 +1,163 @@
+"""Concurrent fan-out of one query to several models or prompts.
+
+Each target streams on its own thread into a shared queue; the caller drains
+the queue on the Streamlit script thread and paints one column per target.
+In ``race`` mode the first target to finish with a non-empty answer wins and
+the others are cancelled; in ``ensemble`` mode every target runs to
+completion (or its timeout) and the answers are merged. Cancelled and timed
+out targets are aborted through the abort function their stream hands to
+``on_open``, so a request still waiting for its first chunk is closed too.
+"""
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from authentifi.findings import SimilarityIndex, shingles
+
+MODES = ("race", "ensemble")
+# stream_fn(messages, model, on_usage=..., on_open=...), like LLMBackend.stream_chat
+StreamFn = Callable[..., Iterable[str]]
+
+
+@dataclass
+class FanOutTarget:
+    label: str
+    model: str
+    system_prompt: Optional[str] = None
+    timeout: Optional[float] = None
+
+
+@dataclass
+class FanOutEvent:
+    label: str
+    kind: str  # "chunk", "done", "error", "timeout" or "cancelled"
+    text: str = ""
+
+
+@dataclass
+class FanOutResult:
+    answers: Dict[str, str] = field(default_factory=dict)
+    status: Dict[str, str] = field(default_factory=dict)
+    usage: Dict[str, Dict] = field(default_factory=dict)  # as reported, set before the "done" event
+    winner: Optional[str] = None
+    merged: str = ""
+
+
+def merge_answers(answers: Dict[str, str]) -> str:
+    """Longest answer plus any sentences the others add that it lacks"""
+    if not answers:
+        return ""
+    base_label = max(answers, key=lambda label: len(answers[label]))
+    index = SimilarityIndex(threshold=0.5)
+    for sentence in answers[base_label].replace("\n", " ").split(". "):
+        index.add(shingles(sentence))
+    extras = []
+    for label, answer in answers.items():
+        if label == base_label:
+            continue
+        for sentence in answer.replace("\n", " ").split(". "):
+            sentence_shingles = shingles(sentence)
+            if len(sentence_shingles) > 2 and index.find_similar(sentence_shingles) < 0:
+                index.add(sentence_shingles)
+                extras.append(f"- {sentence.strip().rstrip('.')}. *({label})*")
+    merged = answers[base_label]
+    if extras:
+        merged += "\n\n**Additional points from other models**\n" + "\n".join(extras)
+    return merged
+
+
+class FanOutExecutor:
+    def __init__(self, stream_fn: StreamFn, timeout: float = 60.0):
+        self.stream_fn = stream_fn
+        self.timeout = timeout
+
+    def run(self, targets: List[FanOutTarget], messages: List[Dict], mode: str = "race",
+            result: Optional[FanOutResult] = None) -> Iterator[FanOutEvent]:
+        """Stream events from all targets; fills result as targets finish"""
+        result = result if result is not None else FanOutResult()
+        events: "queue.Queue[FanOutEvent]" = queue.Queue()
+        cancels = {target.label: threading.Event() for target in targets}
+        aborts: Dict[str, Callable[[], None]] = {}
+        started = time.monotonic()
+        deadlines = {target.label: started + (target.timeout or self.timeout) for target in targets}
+        partial: Dict[str, List[str]] = {label: [] for label in cancels}
+
+        for target in targets:
+            target_messages = messages
+            if target.system_prompt:
+                target_messages = [{"role": "system", "content": target.system_prompt}] + messages
+            threading.Thread(
+                target=self._worker,
+                args=(target, target_messages, events, cancels[target.label], aborts, result),
+                name=f"fanout-{target.label}",
+                daemon=True,
+            ).start()
+
+        def stop(label: str, kind: str) -> FanOutEvent:
+            cancels[label].set()
+            abort = aborts.get(label)
+            if abort is not None:
+                abort()
+            del deadlines[label]
+            result.status[label] = kind
+            return FanOutEvent(label, kind)
+
+        while deadlines:
+            now = time.monotonic()
+            for label in [label for label, deadline in deadlines.items() if deadline <= now]:
+                yield stop(label, "timeout")
+            if not deadlines:
+                break
+            try:
+                event = events.get(timeout=max(0.0, min(0.1, min(deadlines.values()) - now)))
+            except queue.Empty:
+                continue
+            if event.label not in deadlines:
+                continue
+            if event.kind == "chunk":
+                partial[event.label].append(event.text)
+                yield event
+                continue
+            del deadlines[event.label]
+            result.status[event.label] = event.kind
+            answer = "".join(partial[event.label])
+            if event.kind == "done":
+                result.answers[event.label] = answer
+            yield event
+            if mode == "race" and event.kind == "done" and answer.strip() and result.winner is None:
+                result.winner = event.label
+                for label in list(deadlines):
+                    yield stop(label, "cancelled")
+
+        if mode == "ensemble":
+            result.merged = merge_answers(result.answers)
+        elif result.winner is not None:
+            result.merged = result.answers[result.winner]
+
+    def _worker(self, target: FanOutTarget, messages: List[Dict], events: "queue.Queue[FanOutEvent]",
+                cancel: threading.Event, aborts: Dict[str, Callable[[], None]], result: FanOutResult) -> None:
+        def on_open(abort: Callable[[], None]) -> None:
+            aborts[target.label] = abort
+            if cancel.is_set():
+                abort()
+
+        def on_usage(usage: Dict) -> None:
+            result.usage[target.label] = usage
+
+        stream = None
+        try:
+            stream = self.stream_fn(messages, target.model, on_usage=on_usage, on_open=on_open)
+            for text in stream:
+                if cancel.is_set():
+                    return
+                events.put(FanOutEvent(target.label, "chunk", text))
+            events.put(FanOutEvent(target.label, "done"))
+        except Exception as e:
+            if not cancel.is_set():
+                events.put(FanOutEvent(target.label, "error", str(e)))
+        finally:
+            close = getattr(stream, "close", None)
+            if cancel.is_set() and close is not None:
+                close()
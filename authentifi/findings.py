@@ -0,0 +1,163 @@
+"""Incremental key-findings extraction for research topics.
+
+The extractor keeps a cursor into the topic's message list so each run only
+looks at assistant messages appended since the previous one. Candidate
+sentences are scored with simple cue-phrase heuristics and deduplicated
+against earlier findings through a word-shingle similarity index. A branch
+keeps the findings from before its fork point and reads the parent's
+similarity index for them instead of rebuilding it.
+"""
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+_CUES = (
+    "found", "finds", "shows", "showed", "suggests", "indicates", "demonstrates",
+    "evidence", "results", "conclude", "significant", "increase", "decrease",
+    "key", "important", "critical", "notably", "in summary", "overall",
+)
+_CANDIDATE = re.compile(r"(?:\bet al\.|\be\.g\.|\bi\.e\.|\d\.\d|[^.!?\n])+[.!?]?")
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class Finding:
+    text: str
+    message_id: str
+    offset: int
+    score: float
+
+
+def shingles(text: str, size: int = 3) -> Set[str]:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class SimilarityIndex:
+    """Inverted shingle index answering "is this near an existing entry?".
+
+    A fork reads entries below `limit` from its base index, which only ever
+    appends, and keeps its own entries from `limit` on.
+    """
+
+    def __init__(self, threshold: float = 0.6, base: Optional["SimilarityIndex"] = None, limit: int = 0):
+        self.threshold = threshold
+        self.base = base
+        self.limit = limit
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self.sizes: List[int] = []
+
+    def __len__(self) -> int:
+        return self.limit + len(self.sizes)
+
+    def _size(self, entry_id: int) -> int:
+        return self.sizes[entry_id - self.limit] if entry_id >= self.limit else self.base._size(entry_id)
+
+    def _count(self, text_shingles: Set[str], below: int, overlap: Dict[int, int]) -> None:
+        if self.base is not None:
+            self.base._count(text_shingles, min(below, self.limit), overlap)
+        for shingle in text_shingles:
+            postings = self.postings.get(shingle, ())
+            # Postings are in id order, so the entries below `below` are a prefix
+            for entry_id in postings[:bisect_left(postings, below)]:
+                overlap[entry_id] += 1
+
+    def find_similar(self, text_shingles: Set[str]) -> int:
+        """Id of an entry with Jaccard similarity above threshold, or -1"""
+        overlap: Dict[int, int] = defaultdict(int)
+        self._count(text_shingles, len(self), overlap)
+        for entry_id, shared in overlap.items():
+            union = len(text_shingles) + self._size(entry_id) - shared
+            if union and shared / union >= self.threshold:
+                return entry_id
+        return -1
+
+    def add(self, text_shingles: Set[str]) -> int:
+        entry_id = len(self)
+        self.sizes.append(len(text_shingles))
+        for shingle in text_shingles:
+            self.postings[shingle].append(entry_id)
+        return entry_id
+
+    def fork(self, limit: int) -> "SimilarityIndex":
+        """Index holding this index's first `limit` entries without copying them"""
+        return SimilarityIndex(self.threshold, base=self, limit=limit)
+
+
+def score_sentence(sentence: str, listed: bool) -> float:
+    lowered = sentence.lower()
+    words = len(lowered.split())
+    if words < 6 or words > 60:
+        return 0.0
+    score = sum(1.0 for cue in _CUES if cue in lowered)
+    if re.search(r"\d", lowered):
+        score += 0.5
+    if listed:
+        score += 1.0
+    return score
+
+
+class FindingsExtractor:
+    def __init__(self, min_score: float = 1.0, per_message: int = 3):
+        self.min_score = min_score
+        self.per_message = per_message
+        self.findings: List[Finding] = []
+        # Message position of each finding, in order
+        self.positions: List[int] = []
+        self.cursor = 0
+        self.index = SimilarityIndex()
+        self._lock = threading.Lock()
+
+    def process(self, messages: List[Dict]) -> int:
+        """Extract findings from messages appended since the last run"""
+        with self._lock:
+            new = messages[self.cursor:]
+            added = 0
+            for position, message in enumerate(new, start=self.cursor):
+                if message["role"] == "assistant":
+                    added += self._extract(message, position)
+            self.cursor += len(new)
+            return added
+
+    def fork(self, at: int) -> "FindingsExtractor":
+        """Extractor holding the findings of the first `at` messages"""
+        with self._lock:
+            extractor = FindingsExtractor(self.min_score, self.per_message)
+            extractor.cursor = min(at, self.cursor)
+            kept = bisect_left(self.positions, extractor.cursor)
+            extractor.findings = self.findings[:kept]
+            extractor.positions = self.positions[:kept]
+            extractor.index = self.index.fork(kept)
+        return extractor
+
+    def top(self, limit: int = 10) -> List[Finding]:
+        with self._lock:
+            return sorted(self.findings, key=lambda f: f.score, reverse=True)[:limit]
+
+    def _extract(self, message: Dict, position: int) -> int:
+        candidates = []
+        for line_match in re.finditer(r"[^\n]+", message["content"]):
+            line = line_match.group()
+            listed = bool(_LIST_MARKER.match(line))
+            for match in _CANDIDATE.finditer(line):
+                sentence = _LIST_MARKER.sub("", match.group()).replace("**", "").replace("__", "").strip(" *_#")
+                score = score_sentence(sentence, listed)
+                if score >= self.min_score:
+                    candidates.append((score, line_match.start() + match.start(), sentence))
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        added = 0
+        for score, offset, sentence in candidates[:self.per_message]:
+            sentence_shingles = shingles(sentence)
+            if self.index.find_similar(sentence_shingles) >= 0:
+                continue
+            self.index.add(sentence_shingles)
+            self.findings.append(Finding(sentence, message.get("id", ""), offset, score))
+            self.positions.append(position)
+            added += 1
+        return added
@@ -0,0 +1,334 @@
+"""Persistent priority job queue for analytics and enrichment work.
+
+Jobs are rows in SQLite, so every server process, and any standalone worker
+started with ``python -m authentifi.jobs work``, shares one queue. A job has
+a kind, a JSON payload, a priority class and a dedup key; enqueueing a job
+while an identical one is still pending returns the pending job instead of
+adding another, and a job is not claimed while one with the same kind and
+key is running, so work on the same topic never overlaps. Workers claim the
+most urgent runnable job in a short write transaction, run the handler
+registered for its kind and store its JSON result, retrying failures with
+exponential backoff. Wait and run times are kept on every row for the
+per-kind metrics.
+
+Jobs that work on in-memory state (a topic's summary tree, findings and so
+on) are enqueued with a ``context`` object. They are scoped to the process
+that enqueued them, which holds the context; jobs of a process that has
+exited are marked failed when the next queue on that host starts. Jobs
+without a context can be claimed by any worker with a handler for the kind,
+and a job whose worker died is reclaimed once its lease runs out. The worker
+running a job renews its lease until the handler returns, so a slow job
+keeps blocking its siblings however long it takes.
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Priority classes, most urgent first
+INTERACTIVE = 0
+ANALYTICS = 1
+ENRICHMENT = 2
+
+# handler(payload, context) -> JSON-serialisable result or None
+Handler = Callable[[Dict, Any], Any]
+
+_SCHEMA = """
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS job (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    scope TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    not_before REAL NOT NULL,
+    lease_until REAL,
+    enqueued REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS job_pending ON job (kind, dedup_key) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS job_claim ON job (status, priority, id);
+CREATE INDEX IF NOT EXISTS job_key ON job (kind, dedup_key, status);
+"""
+
+
+def alive(pid: int) -> bool:
+    """Whether a process with this id exists on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    def __init__(self, db_path: Path, handlers: Dict[str, Handler], workers: int = 4,
+                 lease: float = 300.0, backoff: float = 1.0, poll_interval: float = 1.0,
+                 retention: float = 86400.0):
+        self.db_path = db_path
+        self.handlers = dict(handlers)
+        self.lease = lease
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.scope = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._contexts: Dict[int, Any] = {}
+        self._wake = threading.Condition()
+        # Bumped whenever a job may have become claimable, so idle workers never miss a wake-up
+        self._generation = 0
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self._recover(retention)
+        for number in range(workers):
+            threading.Thread(target=self._work, daemon=True, name=f"authentifi-jobs-{number}").start()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _recover(self, retention: float) -> None:
+        """Fail local jobs of exited processes on this host and drop old finished jobs"""
+        host = socket.gethostname()
+        with self._connect() as conn:
+            scopes = [scope for (scope,) in conn.execute(
+                "SELECT DISTINCT scope FROM job WHERE scope IS NOT NULL AND status IN ('queued', 'running')"
+            )]
+            for scope in scopes:
+                scope_host, pid, _ = scope.rsplit(":", 2)
+                if scope_host == host and not alive(int(pid)):
+                    conn.execute(
+                        """UPDATE job SET status = 'failed', error = 'owner process exited', finished = ?
+                           WHERE scope = ? AND status IN ('queued', 'running')""",
+                        (time.time(), scope)
+                    )
+            conn.execute("DELETE FROM job WHERE status IN ('done', 'failed') AND finished < ?",
+                         (time.time() - retention,))
+
+    def enqueue(self, kind: str, payload: Optional[Dict] = None, key: Optional[str] = None,
+                priority: int = ANALYTICS, context: Any = None, max_attempts: int = 3) -> int:
+        """Queue a job, or return the id of the identical job already pending.
+
+        Jobs with a context run only in this process; the context of a deduplicated
+        job is replaced by the newest one.
+        """
+        payload = payload or {}
+        encoded = json.dumps(payload, sort_keys=True)
+        if key is None:
+            key = hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+        scope = self.scope if context is not None else None
+        now = time.time()
+        job_id, inserted = None, False
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute(
+                    """INSERT OR IGNORE INTO job (kind, dedup_key, priority, payload, scope, status, max_attempts,
+                                                  not_before, enqueued)
+                       VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?)""",
+                    (kind, key, priority, encoded, scope, max_attempts, now, now)
+                )
+                inserted = bool(cursor.rowcount)
+                if inserted:
+                    job_id = cursor.lastrowid
+                else:
+                    job_id, pending_priority = conn.execute(
+                        "SELECT id, priority FROM job WHERE kind = ? AND dedup_key = ? AND status = 'queued'",
+                        (kind, key)
+                    ).fetchone()
+                    if priority < pending_priority:
+                        conn.execute("UPDATE job SET priority = ? WHERE id = ?", (priority, job_id))
+                # Registered before the commit, so no worker can claim the job without its context
+                if context is not None:
+                    self._contexts[job_id] = context
+        except BaseException:
+            if inserted:
+                self._contexts.pop(job_id, None)
+            raise
+        self._signal()
+        return job_id
+
+    def _signal(self) -> None:
+        with self._wake:
+            self._generation += 1
+            self._wake.notify()
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        """Status, attempts, result and error of a job, or None once it has been dropped"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT status, attempts, result, error FROM job WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        status, attempts, result, error = row
+        return {"status": status, "attempts": attempts,
+                "result": None if result is None else json.loads(result), "error": error}
+
+    def _claim(self) -> Optional[tuple]:
+        if not self.handlers:
+            return None
+        now = time.time()
+        kinds = list(self.handlers)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            # BEGIN IMMEDIATE takes the write lock first, so two workers cannot claim the same row
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"""SELECT id, kind, payload, scope FROM job
+                    WHERE kind IN ({",".join("?" * len(kinds))}) AND (scope IS NULL OR scope = ?)
+                      AND ((status = 'queued' AND not_before <= ?)
+                           OR (status = 'running' AND scope IS NULL AND lease_until < ?))
+                      -- One job per (kind, dedup_key) at a time: wait while a live sibling runs
+                      AND NOT EXISTS (
+                          SELECT 1 FROM job AS sibling
+                          WHERE sibling.kind = job.kind AND sibling.dedup_key = job.dedup_key
+                            AND sibling.status = 'running' AND sibling.id != job.id AND sibling.lease_until >= ?)
+                    ORDER BY priority, id LIMIT 1""",
+                [*kinds, self.scope, now, now, now]
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    """UPDATE job SET status = 'running', attempts = attempts + 1, started = ?, lease_until = ?
+                       WHERE id = ?""",
+                    (now, now + self.lease, row[0])
+                )
+            conn.execute("COMMIT")
+            return row
+        finally:
+            conn.close()
+
+    def _work(self) -> None:
+        while True:
+            with self._wake:
+                generation = self._generation
+            # Claimed outside the condition, so enqueue() never waits behind SQLite
+            try:
+                job = self._claim()
+            except sqlite3.Error:
+                job = None
+            if job is None:
+                with self._wake:
+                    if generation == self._generation:
+                        self._wake.wait(self.poll_interval)
+                continue
+            self._run(*job)
+
+    def _run(self, job_id: int, kind: str, payload: str, scope: Optional[str]) -> None:
+        context = self._contexts.pop(job_id, None)
+        if scope is not None and context is None:
+            self._finish(job_id, "failed", error="context lost")
+            return
+        done = threading.Event()
+        threading.Thread(target=self._renew, args=(job_id, done), daemon=True,
+                         name=f"authentifi-lease-{job_id}").start()
+        result, error = None, None
+        try:
+            result = self.handlers[kind](json.loads(payload), context)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            done.set()
+        if error is not None:
+            self._retry(job_id, context, error)
+            return
+        self._finish(job_id, "done", result=None if result is None else json.dumps(result))
+
+    def _renew(self, job_id: int, done: threading.Event) -> None:
+        """Extend a running job's lease every third of the lease until it finishes"""
+        while not done.wait(self.lease / 3):
+            try:
+                with self._connect() as conn:
+                    conn.execute("UPDATE job SET lease_until = ? WHERE id = ? AND status = 'running'",
+                                 (time.time() + self.lease, job_id))
+            except sqlite3.Error:
+                pass
+
+    def _finish(self, job_id: int, status: str, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE job SET status = ?, result = ?, error = ?, finished = ?, lease_until = NULL "
+                         "WHERE id = ?", (status, result, error, time.time(), job_id))
+        # A sibling queued while this job ran may be claimable now
+        self._signal()
+
+    def _retry(self, job_id: int, context: Any, error: str) -> None:
+        with self._connect() as conn:
+            attempts, max_attempts = conn.execute(
+                "SELECT attempts, max_attempts FROM job WHERE id = ?", (job_id,)
+            ).fetchone()
+            # Requeueing is skipped when an identical job has been queued meanwhile
+            retried = attempts < max_attempts and conn.execute(
+                """UPDATE OR IGNORE job SET status = 'queued', error = ?, not_before = ?, lease_until = NULL
+                   WHERE id = ?""",
+                (error, time.time() + self.backoff * 2 ** (attempts - 1), job_id)
+            ).rowcount
+        if retried:
+            if context is not None:
+                self._contexts.setdefault(job_id, context)
+        else:
+            self._finish(job_id, "failed", error=error)
+
+    def stats(self) -> List[Dict]:
+        """Per-kind job counts and timings"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT kind,
+                          SUM(status = 'queued'), SUM(status = 'running'), SUM(status = 'done'), SUM(status = 'failed'),
+                          SUM(attempts) - COUNT(started),
+                          AVG(CASE WHEN status = 'done' THEN started - enqueued END),
+                          AVG(CASE WHEN status = 'done' THEN finished - started END),
+                          MAX(CASE WHEN status = 'done' THEN finished - started END)
+                   FROM job GROUP BY kind ORDER BY kind"""
+            ).fetchall()
+        return [
+            {"Job": kind, "Queued": queued, "Running": running, "Done": done, "Failed": failed,
+             "Retries": max(retries, 0),
+             "Avg wait (ms)": round(1000 * wait, 1) if wait is not None else None,
+             "Avg run (ms)": round(1000 * run, 1) if run is not None else None,
+             "Max run (ms)": round(1000 * slowest, 1) if slowest is not None else None}
+            for kind, queued, running, done, failed, retries, wait, run, slowest in rows
+        ]
+
+
+def _load_handler(spec: str) -> Handler:
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Work on or inspect the background job queue")
+    parser.add_argument("--db", type=Path, default=None, help="defaults to jobs.db in the data dir")
+    commands = parser.add_subparsers(dest="command", required=True)
+    work = commands.add_parser("work", help="run a worker process for jobs that need no in-memory context")
+    work.add_argument("handlers", nargs="+", metavar="KIND=MODULE:FUNCTION")
+    work.add_argument("--workers", type=int, default=2)
+    commands.add_parser("stats", help="print per-kind job counts and timings")
+    args = parser.parse_args()
+
+    from authentifi import config
+
+    db_path = args.db or config.data_dir() / "jobs.db"
+    if args.command == "stats":
+        for row in JobQueue(db_path, {}, workers=0).stats():
+            print(row)
+        return
+    handlers = {kind: _load_handler(spec) for kind, _, spec in (item.partition("=") for item in args.handlers)}
+    JobQueue(db_path, handlers, workers=args.workers)
+    print(f"Working on {', '.join(handlers)} jobs from {db_path}")
+    while True:
+        time.sleep(3600)
+
+
+if __name__ == "__main__":
+    main()
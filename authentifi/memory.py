@@ -0,0 +1,287 @@
+"""Semantic memory over every message a user has exchanged.
+
+Messages are embedded as they are appended and journaled to SQLite, which
+every worker process can write. One process at a time holds the writer
+lock; it copies journaled vectors into the shared memory-mapped
+``VectorStore`` and keeps the IVF index beside it up to date, while all
+other processes map the same files read-only. Rows journaled since the
+writer's last pass are scored from a small in-process tail, so a process
+always sees its own messages. At query time the best-scoring past turns
+from the current topic, or from all of the user's topics, are selected
+under a token budget and passed to the model alongside the recent
+conversation.
+
+The default embedder hashes word unigrams and bigrams into a fixed number
+of signed buckets (the hashing trick). It needs no model download or API
+call and is stable across processes; any callable returning a vector of
+``dim`` floats can replace it.
+"""
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from authentifi.routing import estimate_tokens
+from authentifi.vectorstore import IVFIndex, VectorStore, acquire_writer_lock
+
+# 128 floats keep a 100k-message scan within memory bandwidth for a <10 ms lookup
+DIM = 128
+# Longest stretch of a message kept as a memory
+MAX_CHARS = 1500
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i in is it its of on or that the "
+    "their them these this to was were what when which who why will with you your".split()
+)
+
+_SCHEMA = """
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS memory (
+    message_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    topic_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    created REAL NOT NULL,
+    vector BLOB NOT NULL
+);
+"""
+
+
+def hashed_embedding(text: str, dim: int = DIM) -> np.ndarray:
+    """Unit vector of signed, log-scaled unigram and bigram hash counts"""
+    words = [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector = np.zeros(dim, dtype=np.float32)
+    if not features:
+        return vector
+    hashes = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature in features),
+                         dtype=np.uint32, count=len(features))
+    signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, hashes % dim, signs)
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@dataclass
+class MemoryHit:
+    message_id: str
+    topic_id: str
+    role: str
+    content: str
+    tokens: int
+    score: float
+
+
+def journal(db_path: Path, user_id: str, topic_id: str, messages: Iterable[Dict],
+            embed: Callable[[str], np.ndarray] = hashed_embedding) -> int:
+    """Embed messages and write them to the journal; safe to call from any process.
+
+    Returns how many were new; messages whose id is already journaled are ignored.
+    """
+    rows = []
+    for message in messages:
+        content = message["content"][:MAX_CHARS]
+        rows.append((message["id"], user_id, topic_id, message["role"], content,
+                     estimate_tokens(content), time.time(), embed(content).astype(np.float32).tobytes()))
+    if not rows:
+        return 0
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        conn.executescript(_SCHEMA)
+        return conn.executemany(
+            """INSERT OR IGNORE INTO memory (message_id, user_id, topic_id, role, content, tokens, created, vector)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            rows
+        ).rowcount
+
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    if size <= len(array):
+        return array
+    grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class SemanticMemory:
+    def __init__(self, db_path: Path, embed: Callable[[str], np.ndarray] = hashed_embedding,
+                 dim: int = DIM, nprobe: int = 24, sync_interval: float = 2.0):
+        self.db_path = db_path
+        self.embed = embed
+        self.dim = dim
+        self.nprobe = nprobe
+        self.store_path = Path(db_path).with_suffix(".vec")
+        self.store = VectorStore(self.store_path, dim)
+        self.index = IVFIndex(self.store_path)
+        self.writer = False
+        self._writer_lock: Optional[int] = None
+        # User and topic of every store row, for filtering
+        self.user_codes = np.zeros(1024, dtype=np.int32)
+        self.topic_codes = np.zeros(1024, dtype=np.int32)
+        self.coded = 0
+        # Journaled rows the writer has not copied into the store yet
+        self.tail_keys = np.zeros(0, dtype=np.int64)
+        self.tail_vectors = np.zeros((0, dim), dtype=np.float32)
+        self.tail_users = np.zeros(0, dtype=np.int32)
+        self.tail_topics = np.zeros(0, dtype=np.int32)
+        self._topics: Dict[str, int] = {}
+        self._users: Dict[str, int] = {}
+        self._seen: Set[str] = set()
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self.refresh()
+        threading.Thread(target=self._sync_loop, args=(sync_interval,), daemon=True,
+                         name="authentifi-memory").start()
+
+    def __len__(self) -> int:
+        return self.coded + len(self.tail_keys)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _code(self, codes: Dict[str, int], key: str) -> int:
+        return codes.setdefault(key, len(codes))
+
+    def _sync_loop(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            self.refresh()
+
+    def add(self, user_id: str, topic_id: str, message: Dict) -> None:
+        """Embed and journal one message; messages already journaled are skipped"""
+        self.add_many(user_id, topic_id, [message])
+
+    def add_many(self, user_id: str, topic_id: str, messages: Iterable[Dict]) -> None:
+        new = [message for message in messages if message["id"] not in self._seen]
+        if new:
+            journal(self.db_path, user_id, topic_id, new, self.embed)
+            self._seen.update(message["id"] for message in new)
+            self.refresh()
+
+    def refresh(self) -> None:
+        """Become the writer if nobody is, then catch up with the store and the journal"""
+        with self._lock:
+            if not self.writer:
+                self._writer_lock = acquire_writer_lock(self.store_path.with_suffix(".lock"))
+                self.writer = self._writer_lock is not None
+                if self.writer:
+                    self.store = VectorStore(self.store_path, self.dim, writable=True)
+            with self._connect() as conn:
+                self.index.load()
+                if self.writer:
+                    self._ingest(conn)
+                else:
+                    self.store.refresh()
+                self._load_codes(conn)
+                self._load_tail(conn)
+
+    def _ingest(self, conn: sqlite3.Connection) -> None:
+        rows = conn.execute(
+            "SELECT rowid, vector FROM memory WHERE rowid > ? ORDER BY rowid", (self.store.last_key,)
+        ).fetchall()
+        if rows:
+            keys = np.fromiter((key for key, _ in rows), dtype=np.int64, count=len(rows))
+            vectors = np.frombuffer(b"".join(blob for _, blob in rows), dtype=np.float32).reshape(-1, self.dim)
+            self.store.append(keys, vectors)
+        self.index.update(self.store)
+
+    def _load_codes(self, conn: sqlite3.Connection) -> None:
+        count = self.store.count
+        if count <= self.coded:
+            return
+        after = int(self.store.keys[self.coded - 1]) if self.coded else 0
+        rows = conn.execute(
+            "SELECT user_id, topic_id FROM memory WHERE rowid > ? AND rowid <= ? ORDER BY rowid",
+            (after, int(self.store.keys[count - 1]))
+        ).fetchall()
+        self.user_codes = _grow(self.user_codes, count)
+        self.topic_codes = _grow(self.topic_codes, count)
+        for i, (user_id, topic_id) in enumerate(rows, start=self.coded):
+            self.user_codes[i] = self._code(self._users, user_id)
+            self.topic_codes[i] = self._code(self._topics, topic_id)
+        self.coded = count
+
+    def _load_tail(self, conn: sqlite3.Connection) -> None:
+        stored = int(self.store.keys[self.coded - 1]) if self.coded else 0
+        keep = self.tail_keys > stored
+        after = max(stored, int(self.tail_keys[-1]) if len(self.tail_keys) else 0)
+        rows = conn.execute(
+            "SELECT rowid, user_id, topic_id, vector FROM memory WHERE rowid > ? ORDER BY rowid", (after,)
+        ).fetchall()
+        self.tail_keys = np.concatenate([self.tail_keys[keep], np.array([row[0] for row in rows], dtype=np.int64)])
+        self.tail_users = np.concatenate([self.tail_users[keep], np.array(
+            [self._code(self._users, row[1]) for row in rows], dtype=np.int32)])
+        self.tail_topics = np.concatenate([self.tail_topics[keep], np.array(
+            [self._code(self._topics, row[2]) for row in rows], dtype=np.int32)])
+        self.tail_vectors = np.concatenate([self.tail_vectors[keep], np.frombuffer(
+            b"".join(row[3] for row in rows), dtype=np.float32).reshape(-1, self.dim)])
+
+    def search(self, query: str, user_id: str, topic_ids: Optional[Iterable[str]] = None,
+               exclude: Iterable[str] = (), k: int = 6, budget: int = 1200,
+               min_score: float = 0.2) -> List[MemoryHit]:
+        """Best-matching past messages of a user that fit in `budget` tokens, best first"""
+        with self._lock:
+            count = self.coded
+            vectors, keys = self.store.vectors, self.store.keys
+            user_codes, topic_codes = self.user_codes[:count], self.topic_codes[:count]
+            tail = (self.tail_keys, self.tail_vectors, self.tail_users, self.tail_topics)
+            user_code = self._users.get(user_id)
+            scope = None if topic_ids is None else [self._topics[t] for t in topic_ids if t in self._topics]
+        if user_code is None or scope == []:
+            return []
+        query_vector = self.embed(query).astype(np.float32)
+
+        allowed = user_codes == user_code
+        if scope is not None:
+            allowed &= np.isin(topic_codes, scope)
+        candidates = self.index.probe(query_vector, self.nprobe) if scope is None and self.nprobe else None
+        if candidates is not None:
+            # Rows appended since the last assignment are always scanned
+            candidates = np.concatenate([candidates[candidates < count], np.arange(len(self.index.lists), count)])
+            rows = candidates[allowed[candidates]]
+        else:
+            rows = np.flatnonzero(allowed)
+        scores = vectors[rows] @ query_vector if len(rows) < count // 2 else (vectors[:count] @ query_vector)[rows]
+        row_keys = keys[rows]
+
+        tail_keys, tail_vectors, tail_users, tail_topics = tail
+        in_tail = tail_users == user_code
+        if scope is not None:
+            in_tail &= np.isin(tail_topics, scope)
+        row_keys = np.concatenate([row_keys, tail_keys[in_tail]])
+        scores = np.concatenate([scores, tail_vectors[in_tail] @ query_vector])
+        if not len(scores):
+            return []
+
+        excluded = set(exclude)
+        shortlist = min(len(scores), 4 * k + len(excluded))
+        best = np.argpartition(-scores, shortlist - 1)[:shortlist]
+        best = [j for j in best[np.argsort(-scores[best])] if scores[j] >= min_score]
+        if not best:
+            return []
+        with self._connect() as conn:
+            placeholders = ",".join("?" * len(best))
+            rows_by_key = {row[0]: row[1:] for row in conn.execute(
+                f"SELECT rowid, message_id, topic_id, role, content, tokens FROM memory WHERE rowid IN ({placeholders})",
+                [int(row_keys[j]) for j in best]
+            )}
+        hits = []
+        for j in best:
+            if len(hits) == k:
+                break
+            message_id, topic_id, role, content, tokens = rows_by_key[int(row_keys[j])]
+            if message_id in excluded or tokens > budget:
+                continue
+            hits.append(MemoryHit(message_id, topic_id, role, content, tokens, float(scores[j])))
+            budget -= tokens
+        return hits
@@ -0,0 +1,192 @@
+"""Near-duplicate detection against the uploaded reference corpus.
+
+Text is reduced to hashed word 5-gram shingles and a 128-value MinHash
+signature. Reference chunks are indexed as they are ingested: their
+signature and 64 LSH band keys (two signature values each) go to SQLite,
+so memory stays flat however many shingles the corpus holds and the index
+is shared by every process. A message is checked in windows of 200
+shingles; each window looks up the chunks sharing any band key, estimates
+Jaccard similarity from the signatures, and converts it into the share of
+the window's shingles found in the best-matching chunk.
+
+``OverlapTracker`` scores a topic's assistant messages once each, as they
+arrive, and keeps the running totals behind the authenticity score; the
+user's own prompts may quote the references freely and are not scored.
+Until the user has indexed reference chunks it scores nothing, so the score
+reads as unknown rather than as fully original. Totals are kept per scored message,
+so a branch takes them as of its fork point.
+"""
+import sqlite3
+import threading
+import zlib
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 64
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+WINDOW = 200
+# Messages with fewer shingles than this are too short to judge
+MIN_SHINGLES = 8
+
+_PRIME = np.uint64(4294967291)  # largest prime below 2**32
+
+_SCHEMA = """
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS signature (
+    chunk_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    shingles INTEGER NOT NULL,
+    minhash BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS signature_user ON signature (user_id);
+CREATE TABLE IF NOT EXISTS band (
+    user_id TEXT NOT NULL,
+    key INTEGER NOT NULL,
+    chunk_rowid INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS band_lookup ON band (user_id, key);
+"""
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_WORDS) -> np.ndarray:
+    """Distinct 32-bit hashes of the word n-grams of text, in order of first appearance"""
+    words = text.lower().split()
+    grams = [" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))] if words else []
+    hashes = np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+    _, first = np.unique(hashes, return_index=True)
+    return hashes[np.sort(first)]
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # Coefficients below 2**31 keep a * x + b inside 64 bits for 32-bit x
+        self.a = rng.integers(1, 2 ** 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 2 ** 31, size=num_perm, dtype=np.uint64)
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        if not len(hashes):
+            return np.full(len(self.a), np.iinfo(np.uint32).max, dtype=np.uint32)
+        permuted = (np.outer(hashes, self.a) + self.b) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_keys(signature: np.ndarray) -> np.ndarray:
+    """One signed 64-bit key per band of ROWS signature values"""
+    rows = signature.astype(np.uint64).reshape(BANDS, ROWS)
+    keys = rows[:, 0]
+    for column in range(1, ROWS):
+        keys = (keys << np.uint64(32)) | rows[:, column]
+    keys ^= np.arange(BANDS, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    return keys.view(np.int64)
+
+
+class OverlapIndex:
+    def __init__(self, db_path: Path, hasher: Optional[MinHasher] = None):
+        self.db_path = db_path
+        self.hasher = hasher or MinHasher()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def add_chunks(self, user_id: str, chunks: Iterable[Dict]) -> int:
+        """Index reference chunks ({"id", "content"}); chunks already indexed are skipped"""
+        added = 0
+        with self._connect() as conn:
+            for chunk in chunks:
+                hashes = shingle_hashes(chunk["content"])
+                signature = self.hasher.signature(hashes)
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO signature VALUES (?, ?, ?, ?)",
+                    (chunk["id"], user_id, len(hashes), signature.tobytes())
+                )
+                if cursor.rowcount:
+                    conn.executemany(
+                        "INSERT INTO band VALUES (?, ?, ?)",
+                        [(user_id, int(key), cursor.lastrowid) for key in band_keys(signature)]
+                    )
+                    added += 1
+        return added
+
+    def has_chunks(self, user_id: str) -> bool:
+        """Whether the user has any reference chunks indexed; one indexed lookup"""
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM signature WHERE user_id = ? LIMIT 1", (user_id,)).fetchone() is not None
+
+    def containment(self, user_id: str, text: str) -> Optional[float]:
+        """Estimated share of text's shingles that appear in the user's reference chunks"""
+        hashes = shingle_hashes(text)
+        if len(hashes) < MIN_SHINGLES:
+            return None
+        covered = 0.0
+        with self._connect() as conn:
+            for start in range(0, len(hashes), WINDOW):
+                window = hashes[start:start + WINDOW]
+                signature = self.hasher.signature(window)
+                keys = [int(key) for key in band_keys(signature)]
+                candidates = conn.execute(
+                    f"""SELECT shingles, minhash FROM signature WHERE rowid IN (
+                            SELECT chunk_rowid FROM band WHERE user_id = ? AND key IN ({",".join("?" * len(keys))}))""",
+                    [user_id, *keys]
+                ).fetchall()
+                best = 0.0
+                for size, blob in candidates:
+                    jaccard = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == signature))
+                    # |A ∩ B| = J (|A| + |B|) / (1 + J), as a share of this window
+                    best = max(best, min(1.0, jaccard * (len(window) + size) / (1 + jaccard) / len(window)))
+                covered += best * len(window)
+        return covered / len(hashes)
+
+
+class OverlapTracker:
+    """Per-topic overlap scores, computed once per assistant message."""
+
+    def __init__(self):
+        self.cursor = 0
+        # Position of each scored message and the running (overlapping words, words) after it
+        self.positions: List[int] = []
+        self.totals: List[Tuple[float, int]] = []
+        self._lock = threading.Lock()
+
+    def process(self, messages: List[Dict], index: OverlapIndex, user_id: str) -> None:
+        with self._lock:
+            # Without reference documents there is nothing to compare against; the
+            # messages stay queued and are scored once the user uploads some
+            if not index.has_chunks(user_id):
+                return
+            start, end = self.cursor, len(messages)
+            for position, message in enumerate(messages[start:end], start=start):
+                if message["role"] != "assistant":
+                    continue
+                score = index.containment(user_id, message["content"])
+                if score is not None:
+                    covered, total = self.totals[-1] if self.totals else (0.0, 0)
+                    weight = len(message["content"].split())
+                    self.positions.append(position)
+                    self.totals.append((covered + score * weight, total + weight))
+            self.cursor = end
+
+    def fork(self, at: int) -> "OverlapTracker":
+        """Tracker holding the scores of the first `at` messages"""
+        with self._lock:
+            tracker = OverlapTracker()
+            tracker.cursor = min(at, self.cursor)
+            kept = bisect_left(self.positions, tracker.cursor)
+            tracker.positions = self.positions[:kept]
+            tracker.totals = self.totals[:kept]
+        return tracker
+
+    @property
+    def overlap(self) -> Optional[float]:
+        """Overlap across scored messages, weighted by length"""
+        if not self.totals:
+            return None
+        covered, total = self.totals[-1]
+        return covered / total
@@ -0,0 +1,133 @@
+"""Speculative prefetch of likely follow-up questions.
+
+After an assistant turn the engine guesses the next few questions a
+researcher is likely to ask, answers them in the background while the
+researcher reads, and keeps the answers in a small LRU cache. Clicking a
+suggestion serves the cached answer with no round trip. Each session may
+spend a token budget per rolling window, so speculation cannot run up the
+bill. A prefetch reserves its worst case when it is submitted; once the
+answer arrives the reservation is replaced by the usage the backend
+reported, so short answers hand their unused reservation back.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from authentifi import background
+from authentifi.routing import estimate_tokens
+
+# complete(messages, model, max_tokens, on_usage), like LLMBackend.complete
+Completer = Callable[[List[Dict], str, int, Callable[[Dict], None]], str]
+CacheKey = Tuple[str, str, str]
+
+_NUMBERED = re.compile(r"^\s*(\d+)[.)]\s+\**([^\n*:]{3,60})", re.MULTILINE)
+
+
+def suggest_followups(answer: str, k: int = 3) -> List[str]:
+    """Most likely next questions for an answer, best first"""
+    suggestions = []
+    if not re.search(r"https?://|\b10\.\d{4,9}/|\(\w+,? (?:19|20)\d{2}\)", answer):
+        suggestions.append("Give sources for this")
+    for number, heading in _NUMBERED.findall(answer)[:2]:
+        suggestions.append(f"Expand on point {number}: {heading.strip()}")
+    if len(answer.split()) > 150:
+        suggestions.append("Summarize this in three bullet points")
+    suggestions.append("What are the limitations of this evidence?")
+    return suggestions[:k]
+
+
+class PrefetchCache:
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Future]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: CacheKey) -> Optional[Future]:
+        with self._lock:
+            future = self._entries.get(key)
+            if future is not None:
+                self._entries.move_to_end(key)
+            return future
+
+    def put(self, key: CacheKey, future: Future) -> None:
+        with self._lock:
+            self._entries[key] = future
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class PrefetchEngine:
+    def __init__(self, complete: Completer, budget_tokens: int = 20000, window: float = 600.0,
+                 max_answer_tokens: int = 600, k: int = 3):
+        self.complete = complete
+        self.budget_tokens = budget_tokens
+        self.window = window
+        self.max_answer_tokens = max_answer_tokens
+        self.k = k
+        self.cache = PrefetchCache()
+        self.suggestions: Dict[str, Tuple[str, List[str]]] = {}
+        # [submitted at, tokens] per prefetch; tokens is the reservation until the answer arrives
+        self._charges: Deque[List[float]] = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def spent_tokens(self) -> int:
+        """Tokens charged within the current window"""
+        with self._lock:
+            return self._spent(time.monotonic())
+
+    def _spent(self, now: float) -> int:
+        while self._charges and self._charges[0][0] < now - self.window:
+            self._charges.popleft()
+        return int(sum(tokens for _, tokens in self._charges))
+
+    def prefetch(self, topic_id: str, message: Dict, context: List[Dict],
+                 model_for: Callable[[str], str]) -> List[str]:
+        """Suggest follow-ups to message and answer them within budget"""
+        latest = self.suggestions.get(topic_id)
+        if latest and latest[0] == message["id"]:
+            return latest[1]
+        followups = suggest_followups(message["content"], self.k)
+        self.suggestions[topic_id] = (message["id"], followups)
+        context_tokens = sum(estimate_tokens(m["content"]) for m in context)
+        for followup in followups:
+            cost = context_tokens + estimate_tokens(followup) + self.max_answer_tokens
+            with self._lock:
+                now = time.monotonic()
+                if self._spent(now) + cost > self.budget_tokens:
+                    break
+                charge = [now, cost]
+                self._charges.append(charge)
+            messages = context + [{"role": "user", "content": followup}]
+            self.cache.put((topic_id, message["id"], followup),
+                           background.submit(self._answer, charge, messages, model_for(followup)))
+        return followups
+
+    def _answer(self, charge: List[float], messages: List[Dict], model: str) -> str:
+        """Run one prefetch and charge what it actually used"""
+        reported: List[Dict] = []
+        answer = ""
+        try:
+            answer = self.complete(messages, model, self.max_answer_tokens, reported.append)
+            return answer
+        finally:
+            if reported:
+                used = reported[-1]["prompt_tokens"] + reported[-1]["completion_tokens"]
+            elif answer:
+                used = sum(estimate_tokens(m["content"]) for m in messages) + estimate_tokens(answer)
+            else:
+                # Failed before the backend reported anything
+                used = 0
+            with self._lock:
+                charge[1] = used
+
+    def take(self, topic_id: str, message_id: str, followup: str) -> Optional[str]:
+        """Prefetched answer if it finished successfully, else None"""
+        future = self.cache.get((topic_id, message_id, followup))
+        if future is None or not future.done() or future.exception() is not None:
+            return None
+        return future.result()
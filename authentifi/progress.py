@@ -0,0 +1,132 @@
+"""Per-topic research progress time series.
+
+Messages are recorded into preallocated NumPy ring buffers (timestamp,
+role, response length, latency), so appending is O(1) and memory is fixed
+per topic. Display series are resampled with vectorized binning and cached
+by a version counter, so a rerun with no new messages does no work. Row i
+holds message i until it is overwritten, so a branch copies the parent's
+buffers instead of re-reading the shared history.
+"""
+import math
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ASSISTANT = 1
+USER = 0
+
+
+class ProgressSeries:
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.roles = np.zeros(capacity, dtype=np.int8)
+        self.lengths = np.zeros(capacity, dtype=np.float32)
+        self.latencies = np.full(capacity, np.nan, dtype=np.float32)
+        self.head = 0
+        self.count = 0
+        self.cursor = 0
+        self.version = 0
+        self._cache: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def append(self, timestamp: float, role: int, words: int, latency: Optional[float] = None) -> None:
+        with self._lock:
+            i = self.head
+            self.timestamps[i] = timestamp
+            self.roles[i] = role
+            self.lengths[i] = words
+            self.latencies[i] = np.nan if latency is None else latency
+            self.head = (i + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            self.version += 1
+
+    def add_message(self, message: Dict) -> None:
+        self.append(
+            datetime.fromisoformat(message["timestamp"]).timestamp(),
+            ASSISTANT if message["role"] == "assistant" else USER,
+            len(message["content"].split()),
+            message.get("latency")
+        )
+
+    def fork(self, messages: List[Dict], at: int) -> "ProgressSeries":
+        """Series for the first `at` of messages; at most `capacity` of them are ever read"""
+        series = ProgressSeries(self.capacity)
+        keep = min(at, self.capacity)
+        with self._lock:
+            resident = self.cursor - self.capacity <= at - keep and at <= self.cursor
+            if resident:
+                series.timestamps[:] = self.timestamps
+                series.roles[:] = self.roles
+                series.lengths[:] = self.lengths
+                series.latencies[:] = self.latencies
+        if resident:
+            series.head = at % self.capacity
+            series.count = keep
+            series.version = 1
+        else:
+            for message in messages[at - keep:at]:
+                series.add_message(message)
+        series.cursor = at
+        return series
+
+    def catch_up(self, messages: List[Dict]) -> None:
+        """Record messages appended without going through add_message"""
+        for message in messages[self.cursor:]:
+            self.add_message(message)
+        self.cursor = len(messages)
+
+    def _ordered(self):
+        start = (self.head - self.count) % self.capacity
+        order = (np.arange(self.count) + start) % self.capacity
+        return (self.timestamps[order], self.roles[order],
+                self.lengths[order], self.latencies[order])
+
+    def resample(self, max_points: int = 48) -> Dict[str, np.ndarray]:
+        """Hourly buckets, widened so there are at most max_points of them"""
+        with self._lock:
+            key = ("resample", max_points, self.version)
+            if key in self._cache:
+                return self._cache[key]
+            timestamps, roles, lengths, latencies = self._ordered()
+        if not len(timestamps):
+            return {}
+        origin = math.floor(timestamps.min() / 3600) * 3600
+        span_hours = int((timestamps.max() - origin) // 3600) + 1
+        width = 3600 * max(1, math.ceil(span_hours / max_points))
+        bins = ((timestamps - origin) // width).astype(np.int64)
+        size = int(bins.max()) + 1
+        assistant = roles == ASSISTANT
+        timed = assistant & ~np.isnan(latencies)
+        answers = np.bincount(bins[assistant], minlength=size)
+        timed_answers = np.bincount(bins[timed], minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            series = {
+                "start": origin + np.arange(size) * width,
+                "messages": np.bincount(bins, minlength=size),
+                "response_words": np.bincount(bins[assistant], weights=lengths[assistant], minlength=size) / answers,
+                "latency": np.bincount(bins[timed], weights=latencies[timed], minlength=size) / timed_answers,
+            }
+        with self._lock:
+            self._cache = {key: series}
+        return series
+
+    def frame(self, max_points: int = 48):
+        """Resampled series as a DataFrame indexed by bucket start"""
+        with self._lock:
+            key = ("frame", max_points, self.version)
+            if key in self._cache:
+                return self._cache[key]
+        import pandas as pd
+
+        series = self.resample(max_points)
+        frame = pd.DataFrame({
+            "Messages": series.get("messages", []),
+            "Avg response (words)": series.get("response_words", []),
+            "Avg latency (s)": series.get("latency", []),
+        }, index=pd.to_datetime(series.get("start", []), unit="s"))
+        with self._lock:
+            self._cache[key] = frame
+        return frame
@@ -0,0 +1,85 @@
+"""Deterministic prompt assembly for provider-side prompt caching.
+
+Providers cache the longest previously seen prefix of a request, so every
+completion call starts with the same bytes for a given topic: the system
+prompt, the research filters serialized canonically, and the topic header.
+Older turns are compacted into a summary only at fixed boundaries, so
+between compactions the conversation after the prefix is strictly
+append-only.
+"""
+import json
+import threading
+from typing import Dict, List, Optional
+
+SYSTEM_PROMPT = (
+    "You are Authentifi, a research assistant for education researchers. "
+    "Answer carefully, separate evidence from interpretation, and cite "
+    "sources as URLs, DOIs or author-year references whenever you rely on them. "
+    "Say plainly when you are unsure or when evidence is weak."
+)
+
+# Older turns are folded into the summary digest only in steps of this many messages
+COMPACTION_STEP = 32
+
+
+def canonical(value) -> str:
+    """Byte-stable serialization: sorted keys, sorted lists, fixed separators"""
+    def normalize(item):
+        if isinstance(item, dict):
+            return {str(k): normalize(v) for k, v in item.items()}
+        if isinstance(item, (list, tuple, set)):
+            normalized = [normalize(v) for v in item]
+            return sorted(normalized, key=lambda v: json.dumps(v, sort_keys=True))
+        return item
+    return json.dumps(normalize(value), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def build_prefix(topic_name: str, filters: Dict, system_prompt: str = SYSTEM_PROMPT) -> List[Dict]:
+    return [{
+        "role": "system",
+        "content": f"{system_prompt}\n\nResearch topic: {topic_name}\nResearch filters: {canonical(filters)}",
+    }]
+
+
+def compaction_boundary(message_count: int, recent: int) -> int:
+    """Index before which turns are replaced by the summary digest"""
+    return max(0, (message_count - recent) // COMPACTION_STEP * COMPACTION_STEP)
+
+
+def assemble(prefix: List[Dict], summary: Optional[str], turns: List[Dict],
+             recalled: Optional[List[str]] = None) -> List[Dict]:
+    """Recalled turns change with every query, so they go just before the last turn"""
+    messages = list(prefix)
+    if summary:
+        messages.append({
+            "role": "system",
+            "content": "Summary of the earlier research conversation:\n" + summary,
+        })
+    messages.extend({"role": m["role"], "content": m["content"]} for m in turns)
+    if recalled:
+        messages.insert(len(messages) - 1 if turns else len(messages), {
+            "role": "system",
+            "content": "Relevant earlier turns from this researcher's work:\n"
+                       + "\n".join(f"- {item}" for item in recalled),
+        })
+    return messages
+
+
+class PromptCacheStats:
+    """Running totals of the cached prompt tokens providers report."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, usage: Dict) -> None:
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.cached_tokens += usage.get("cached_tokens", 0)
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
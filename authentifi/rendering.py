@@ -0,0 +1,144 @@
+"""Append-only rendering of streamed markdown.
+
+Re-rendering the whole accumulated answer on every token costs O(n^2) parse
+work and one websocket message per token. ``StreamRenderer`` instead
+coalesces tokens into frames at a fixed rate; on each frame it emits the
+markdown blocks that have been completed since the last frame exactly once,
+and redraws only the trailing block that is still being written.
+
+``RenderCache`` holds sanitized HTML for historical messages, keyed by a
+hash of their content and bounded by total bytes, so a rerun looks each
+message up instead of escaping and formatting it again.
+"""
+import hashlib
+import html
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Tuple
+
+_FENCES = ("```", "~~~")
+
+
+def split_blocks(text: str) -> Tuple[List[str], str]:
+    """Completed markdown blocks in text, plus the unfinished tail"""
+    blocks = []
+    start = 0
+    in_fence = False
+    pos = 0
+    while True:
+        end = text.find("\n", pos)
+        if end < 0:
+            break
+        line = text[pos:end]
+        if line.lstrip().startswith(_FENCES):
+            in_fence = not in_fence
+        elif not in_fence and not line.strip():
+            block = text[start:pos].strip("\n")
+            if block:
+                blocks.append(block)
+            start = end + 1
+        pos = end + 1
+    return blocks, text[start:]
+
+
+class StreamRenderer:
+    """Coalesces streamed tokens into frames of append-only block updates."""
+
+    def __init__(self, emit_block: Callable[[str], None], update_tail: Callable[[str], None],
+                 fps: float = 24.0, clock: Callable[[], float] = time.monotonic):
+        self.emit_block = emit_block
+        self.update_tail = update_tail
+        self.interval = 1.0 / fps
+        self.clock = clock
+        self.pending = ""
+        self.text_parts: List[str] = []
+        self.frames = 0
+        self._shown_tail = ""
+        self._last_frame = float("-inf")
+
+    def feed(self, chunk: str) -> None:
+        self.pending += chunk
+        self.text_parts.append(chunk)
+        if self.clock() - self._last_frame >= self.interval:
+            self.frame()
+
+    def frame(self) -> None:
+        self._last_frame = self.clock()
+        blocks, self.pending = split_blocks(self.pending)
+        for block in blocks:
+            self.emit_block(block)
+        if blocks or self.pending != self._shown_tail:
+            self.update_tail(self.pending)
+            self._shown_tail = self.pending
+            self.frames += 1
+
+    def finish(self) -> str:
+        """Flush everything and return the full text"""
+        blocks, tail = split_blocks(self.pending + "\n\n")
+        if tail.strip():
+            blocks.append(tail.strip("\n"))
+        for block in blocks:
+            self.emit_block(block)
+        self.pending = ""
+        self.update_tail("")
+        return "".join(self.text_parts)
+
+    def render(self, chunks: Iterable[str]) -> str:
+        for chunk in chunks:
+            self.feed(chunk)
+        return self.finish()
+
+
+
+def message_card(role: str, content: str) -> str:
+    """Escaped HTML card for one message in the interaction summary"""
+    icon = "👤" if role == "user" else "🤖"
+    css_class = "human-message" if role == "user" else "ai-message"
+    body = html.escape(content).replace("\n", "<br>")
+    return (f'<div class="conversation-item {css_class}">'
+            f"<strong>{icon} {html.escape(role.title())}</strong><br>{body}</div>")
+
+
+class RenderCache:
+    """LRU of rendered snippets keyed by content hash, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str, build: Callable[[], str]) -> str:
+        with self._lock:
+            rendered = self._entries.get(key)
+            if rendered is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return rendered
+            self.misses += 1
+        rendered = build()
+        cost = len(rendered.encode("utf-8"))
+        if cost > self.max_bytes:
+            return rendered
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = rendered
+                self.size += cost
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted.encode("utf-8"))
+        return rendered
+
+    def card(self, role: str, content: str) -> str:
+        return self.get(self.key("card", role, content), lambda: message_card(role, content))
@@ -0,0 +1,154 @@
+"""Pre-aggregated hourly and daily rollups for the portfolio dashboard.
+
+Each appended message adds to in-memory deltas keyed by (grain, bucket,
+topic); deltas are upserted into SQLite in batches. Dashboard queries read
+only the rollup tables, whose size grows with time and topic count, never
+with message count. Latency and cost distributions are kept as fixed-bin
+histograms so they can be summed across buckets.
+"""
+import atexit
+import bisect
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+GRAINS = {"hour": 3600, "day": 86400}
+LATENCY_BINS = (0.5, 1, 2, 4, 8, 16, 32)
+COST_BINS = (0.0001, 0.001, 0.01, 0.05, 0.1, 0.5)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup (
+    grain TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    topic_id TEXT NOT NULL,
+    user_messages INTEGER NOT NULL DEFAULT 0,
+    assistant_messages INTEGER NOT NULL DEFAULT 0,
+    latency_sum REAL NOT NULL DEFAULT 0,
+    latency_count INTEGER NOT NULL DEFAULT 0,
+    cost_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (grain, bucket, topic_id)
+);
+CREATE TABLE IF NOT EXISTS rollup_histogram (
+    grain TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    metric TEXT NOT NULL,
+    bin INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (grain, bucket, metric, bin)
+);
+"""
+
+
+def bin_labels(edges: Tuple[float, ...], unit: str = "") -> List[str]:
+    labels = [f"<{edges[0]}{unit}"]
+    labels += [f"{lo}–{hi}{unit}" for lo, hi in zip(edges, edges[1:])]
+    labels.append(f"≥{edges[-1]}{unit}")
+    return labels
+
+
+class RollupStore:
+    def __init__(self, db_path: Path, flush_interval: float = 5.0):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self._rows: Dict[Tuple[str, int, str], List[float]] = defaultdict(lambda: [0, 0, 0.0, 0, 0.0])
+        self._histograms: Dict[Tuple[str, int, str, int], int] = defaultdict(int)
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        atexit.register(self.flush)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def record(self, topic_id: str, role: str, timestamp: float,
+               latency: Optional[float] = None, cost: float = 0.0) -> None:
+        with self._lock:
+            for grain, width in GRAINS.items():
+                bucket = int(timestamp // width * width)
+                row = self._rows[(grain, bucket, topic_id)]
+                if role == "user":
+                    row[0] += 1
+                else:
+                    row[1] += 1
+                if latency is not None:
+                    row[2] += latency
+                    row[3] += 1
+                    self._histograms[(grain, bucket, "latency", bisect.bisect(LATENCY_BINS, latency))] += 1
+                if cost:
+                    row[4] += cost
+                    self._histograms[(grain, bucket, "cost", bisect.bisect(COST_BINS, cost))] += 1
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            rows, self._rows = self._rows, defaultdict(lambda: [0, 0, 0.0, 0, 0.0])
+            histograms, self._histograms = self._histograms, defaultdict(int)
+            self._last_flush = time.monotonic()
+        if not rows and not histograms:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                """INSERT INTO rollup VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (grain, bucket, topic_id) DO UPDATE SET
+                       user_messages = user_messages + excluded.user_messages,
+                       assistant_messages = assistant_messages + excluded.assistant_messages,
+                       latency_sum = latency_sum + excluded.latency_sum,
+                       latency_count = latency_count + excluded.latency_count,
+                       cost_sum = cost_sum + excluded.cost_sum""",
+                [key + tuple(values) for key, values in rows.items()]
+            )
+            conn.executemany(
+                """INSERT INTO rollup_histogram VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (grain, bucket, metric, bin) DO UPDATE SET
+                       count = count + excluded.count""",
+                [key + (count,) for key, count in histograms.items()]
+            )
+
+    def series(self, grain: str, since: float) -> List[Dict]:
+        """Per-bucket portfolio totals from the rollup table"""
+        self.flush()
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT bucket, COUNT(DISTINCT topic_id), SUM(user_messages),
+                          SUM(assistant_messages), SUM(latency_sum), SUM(latency_count), SUM(cost_sum)
+                   FROM rollup WHERE grain = ? AND bucket >= ?
+                   GROUP BY bucket ORDER BY bucket""",
+                (grain, int(since))
+            ).fetchall()
+        return [{
+            "bucket": bucket,
+            "active_topics": topics,
+            "queries": queries,
+            "answers": answers,
+            "avg_latency": latency_sum / latency_count if latency_count else None,
+            "cost": cost,
+        } for bucket, topics, queries, answers, latency_sum, latency_count, cost in rows]
+
+    def active_topics(self, grain: str, since: float) -> int:
+        self.flush()
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(DISTINCT topic_id) FROM rollup WHERE grain = ? AND bucket >= ?",
+                (grain, int(since))
+            ).fetchone()[0]
+
+    def histogram(self, grain: str, metric: str, since: float) -> List[int]:
+        """Counts per bin for "latency" or "cost", summed across buckets"""
+        edges = LATENCY_BINS if metric == "latency" else COST_BINS
+        self.flush()
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT bin, SUM(count) FROM rollup_histogram
+                   WHERE grain = ? AND metric = ? AND bucket >= ? GROUP BY bin""",
+                (grain, metric, int(since))
+            ).fetchall()
+        counts = [0] * (len(edges) + 1)
+        for bin_index, count in rows:
+            counts[bin_index] = count
+        return counts
@@ -0,0 +1,132 @@
+"""Per-query model routing.
+
+Each prompt is classified by a cheap local function into a route name, and
+the route decides which model answers it. Simple lookups go to a fast,
+inexpensive model; open-ended research questions go to the large one.
+Every decision is recorded with its latency and estimated cost so routes can
+be compared.
+"""
+import functools
+import re
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional
+
+Classifier = Callable[[str], str]
+
+
+@dataclass(frozen=True)
+class Route:
+    name: str
+    model: str
+    prompt_cost_per_1k: float
+    completion_cost_per_1k: float
+
+
+DEFAULT_ROUTES = {
+    "fast": Route("fast", "gpt-3.5-turbo", 0.0005, 0.0015),
+    "deep": Route("deep", "gpt-4-turbo-preview", 0.01, 0.03),
+}
+
+_DEEP_CUES = re.compile(
+    r"\b(analy[sz]e|compare|contrast|evaluate|critique|methodolog\w*|literature|"
+    r"systematic|meta-analysis|evidence|implications?|framework|hypothes[ie]s|"
+    r"research design|limitations|cite|citations?|sources|in depth|detailed)\b",
+    re.IGNORECASE,
+)
+
+
+def heuristic_classifier(prompt: str) -> str:
+    """Route long, multi-part or research-flavoured prompts to the deep model"""
+    words = len(prompt.split())
+    if words > 40 or prompt.count("?") > 1 or _DEEP_CUES.search(prompt):
+        return "deep"
+    return "fast"
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count from tiktoken when installed, else a 4-characters-per-token guess"""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+@dataclass
+class RoutingDecision:
+    route: str
+    model: str
+    reason: str
+    started: float = field(default_factory=time.perf_counter)
+    latency: Optional[float] = None
+    cost: Optional[float] = None
+
+
+class ModelRouter:
+    def __init__(self, routes: Optional[Dict[str, Route]] = None,
+                 classifier: Classifier = heuristic_classifier,
+                 history: int = 1000, default: Optional[str] = None):
+        self.routes = routes or DEFAULT_ROUTES
+        # Classifier answers outside the routes fall back here; the last route unless configured
+        self.default = default if default is not None else list(self.routes)[-1]
+        if self.default not in self.routes:
+            raise ValueError(f"Unknown default route: {self.default!r}")
+        self.classifier = classifier
+        self.decisions: Deque[RoutingDecision] = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def route(self, prompt: str, override: Optional[str] = None) -> RoutingDecision:
+        if override in self.routes:
+            name, reason = override, "topic override"
+        else:
+            name, reason = self.classifier(prompt), "classifier"
+            if name not in self.routes:
+                name, reason = self.default, f"unknown route {name!r}"
+        return RoutingDecision(name, self.routes[name].model, reason)
+
+    def for_model(self, model: str, reason: str) -> RoutingDecision:
+        """Decision for a model chosen directly, priced as the route serving it"""
+        name = next((name for name, route in self.routes.items() if route.model == model), self.default)
+        return RoutingDecision(name, model, reason)
+
+    def record(self, decision: RoutingDecision, prompt_tokens: int, completion_tokens: int,
+               usage: Optional[Dict] = None) -> None:
+        """Price the decision; token counts the server reported in usage replace the estimates"""
+        if usage:
+            prompt_tokens = usage.get("prompt_tokens", prompt_tokens)
+            completion_tokens = usage.get("completion_tokens", completion_tokens)
+        route = self.routes[decision.route]
+        decision.latency = time.perf_counter() - decision.started
+        decision.cost = (prompt_tokens * route.prompt_cost_per_1k
+                         + completion_tokens * route.completion_cost_per_1k) / 1000
+        with self._lock:
+            self.decisions.append(decision)
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            decisions = list(self.decisions)
+        rows = []
+        for name, route in self.routes.items():
+            taken = [d for d in decisions if d.route == name]
+            if not taken:
+                continue
+            rows.append({
+                "Route": name,
+                "Model": route.model,
+                "Queries": len(taken),
+                "Median latency (s)": round(statistics.median(d.latency for d in taken), 2),
+                "Cost ($)": round(sum(d.cost for d in taken), 4),
+            })
+        return rows
@@ -0,0 +1,259 @@
+"""Bias and research-depth scores for assistant messages, off the request path.
+
+``ResponseClassifier`` is a two-head logistic model over hashed unigram and
+bigram features, so a whole batch is scored with one matrix product on the
+CPU. Trained weights can be loaded from an ``.npz`` file; without one, the
+weights are seeded from cue-word lexicons (loaded or absolutist wording
+versus hedged, two-sided wording for bias; evidence, method and causal
+vocabulary for depth).
+
+``ScoringService`` is shared by every session. Reruns only enqueue new
+assistant messages; one worker thread drains the queue in micro-batches,
+looks the batch up in a SQLite cache keyed by content hash and model
+version, runs the classifier on the misses only, and folds the results into
+each topic's ``ScoreTracker``. The analytics panel reads the tracker's
+running aggregates and never waits for inference. A batch that fails is
+logged and its trackers are rewound, so the next rerun queues it again.
+Scores are kept by message position, so a branch copies the parent's scores
+up to its fork point.
+"""
+import hashlib
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from authentifi.memory import hashed_embedding
+
+logger = logging.getLogger(__name__)
+
+HEADS = ("bias", "depth")
+# Wider than the memory embedding: collisions matter more for a linear model
+FEATURES = 4096
+
+_BIAS_CUES = {
+    "clearly": 1.0, "obviously": 1.2, "undeniably": 1.5, "undoubtedly": 1.2, "certainly": 0.8,
+    "definitely": 0.8, "always": 0.8, "never": 0.8, "everyone": 0.8, "nobody": 0.8,
+    "proves": 1.2, "proven": 1.0, "best": 0.6, "worst": 1.0, "disaster": 1.2, "absurd": 1.5,
+    "ridiculous": 1.5, "must": 0.5, "only": 0.3, "without doubt": 1.5,
+    "however": -0.8, "although": -0.8, "whereas": -0.6, "may": -0.5, "might": -0.5,
+    "suggests": -0.6, "uncertain": -0.8, "limitations": -1.0, "critics": -0.8,
+    "alternatively": -0.8, "mixed": -0.6, "other hand": -1.2, "debate": -0.6,
+    "some studies": -0.8, "evidence": -0.4,
+}
+_DEPTH_CUES = {
+    "because": 0.6, "therefore": 0.6, "mechanism": 1.0, "evidence": 0.8, "study": 0.8,
+    "studies": 0.8, "data": 0.6, "methodology": 1.0, "method": 0.6, "sample": 0.8,
+    "compared": 0.6, "analysis": 0.8, "et al": 1.2, "meta analysis": 1.5, "randomized": 1.2,
+    "controlled": 0.6, "confidence interval": 1.5, "limitations": 1.0, "hypothesis": 1.0,
+    "correlation": 0.8, "causal": 1.0, "variables": 0.8, "significant": 0.6, "replication": 1.0,
+    "peer reviewed": 1.0, "doi": 1.2, "literature": 0.8,
+    "basically": -0.8, "stuff": -1.0, "things": -0.4, "great": -0.4, "sure": -0.4,
+}
+
+_SCHEMA = """
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS score (
+    content_hash TEXT PRIMARY KEY,
+    bias REAL NOT NULL,
+    depth REAL NOT NULL
+);
+"""
+
+
+def _lexicon_weights(cues: Dict[str, float], dim: int) -> np.ndarray:
+    """Weights matching hashed_embedding's bucket and sign for each cue"""
+    weights = np.zeros(dim, dtype=np.float32)
+    for cue, weight in cues.items():
+        hashed = zlib.crc32(cue.encode("utf-8"))
+        weights[hashed % dim] += weight * (-1.0 if hashed >> 31 else 1.0)
+    return weights
+
+
+class ResponseClassifier:
+    def __init__(self, weights: np.ndarray, intercept: np.ndarray):
+        self.weights = weights.astype(np.float32)
+        self.intercept = intercept.astype(np.float32)
+        self.dim = len(weights)
+        self.version = hashlib.blake2b(self.weights.tobytes() + self.intercept.tobytes(),
+                                       digest_size=8).hexdigest()
+
+    @classmethod
+    def lexicon(cls, dim: int = FEATURES) -> "ResponseClassifier":
+        weights = np.stack([_lexicon_weights(_BIAS_CUES, dim), _lexicon_weights(_DEPTH_CUES, dim)], axis=1)
+        # Features are unit-normalised, so the cue weights are scaled up to a usable logit range
+        return cls(weights * 3.0, np.array([-0.5, -1.0]))
+
+    @classmethod
+    def load(cls, path: Path) -> "ResponseClassifier":
+        """Trained weights: an npz with `weights` (features x 2) and `intercept` (2,)"""
+        with np.load(path) as data:
+            return cls(data["weights"], data["intercept"])
+
+    def features(self, texts: List[str]) -> np.ndarray:
+        return np.stack([hashed_embedding(text, self.dim) for text in texts]) if texts \
+            else np.zeros((0, self.dim), dtype=np.float32)
+
+    def predict(self, texts: List[str]) -> np.ndarray:
+        """Probabilities, one row per text and one column per head"""
+        logits = self.features(texts) @ self.weights + self.intercept
+        return 1.0 / (1.0 + np.exp(-logits))
+
+
+class ScoreTracker:
+    """Running per-topic aggregates of message scores, weighted by length."""
+
+    def __init__(self):
+        self.cursor = 0
+        # Per message position: whether it is scored, its length and its scores
+        self.recorded = np.zeros(0, dtype=bool)
+        self.weights = np.zeros(0)
+        self.values = np.zeros((0, len(HEADS)))
+        self.words = 0.0
+        self.sums = np.zeros(len(HEADS))
+        # Branches forked from this tracker, with their fork points
+        self._forks: "weakref.WeakKeyDictionary[ScoreTracker, int]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def pending(self, messages: List[Dict]) -> List[Tuple[int, Dict]]:
+        """Positions and assistant messages appended since the last call"""
+        with self._lock:
+            start, self.cursor = self.cursor, len(messages)
+        return [(position, message) for position, message in enumerate(messages[start:], start=start)
+                if message["role"] == "assistant"]
+
+    def _grow(self, size: int) -> None:
+        if size <= len(self.recorded):
+            return
+        size = max(size, 2 * len(self.recorded), 64)
+        self.recorded = np.concatenate([self.recorded, np.zeros(size - len(self.recorded), dtype=bool)])
+        self.weights = np.concatenate([self.weights, np.zeros(size - len(self.weights))])
+        self.values = np.concatenate([self.values, np.zeros((size - len(self.values), len(HEADS)))])
+
+    def record(self, position: int, scores: np.ndarray, words: int) -> None:
+        with self._lock:
+            self._grow(position + 1)
+            if self.recorded[position]:
+                return
+            self.recorded[position] = True
+            self.weights[position] = words
+            self.values[position] = scores
+            self.words += words
+            self.sums += scores * words
+            # Branches forked while this message was being scored get its score too
+            forks = [tracker for tracker, at in self._forks.items() if position < at]
+        for tracker in forks:
+            tracker.record(position, scores, words)
+
+    def rewind(self, position: int) -> None:
+        """Have the next pending() call return messages from position again"""
+        with self._lock:
+            self.cursor = min(self.cursor, position)
+            forks = [tracker for tracker, at in self._forks.items() if position < at]
+        for tracker in forks:
+            tracker.rewind(position)
+
+    def fork(self, at: int) -> "ScoreTracker":
+        """Tracker holding the scores of the first `at` messages"""
+        tracker = ScoreTracker()
+        with self._lock:
+            tracker.cursor = min(at, self.cursor)
+            kept = min(tracker.cursor, len(self.recorded))
+            tracker.recorded = self.recorded[:kept].copy()
+            tracker.weights = self.weights[:kept].copy()
+            tracker.values = self.values[:kept].copy()
+            tracker.words = float(tracker.weights.sum())
+            tracker.sums = tracker.weights @ tracker.values
+            self._forks[tracker] = at
+        return tracker
+
+    def mean(self, head: str) -> Optional[float]:
+        with self._lock:
+            return float(self.sums[HEADS.index(head)] / self.words) if self.words else None
+
+
+class ScoringService:
+    def __init__(self, db_path: Path, classifier: Optional[ResponseClassifier] = None,
+                 max_batch: int = 64, max_wait: float = 0.05, cache_size: int = 50000):
+        self.db_path = db_path
+        self.classifier = classifier or ResponseClassifier.lexicon()
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.cache_size = cache_size
+        self.cache: Dict[str, np.ndarray] = {}
+        self.batches = 0
+        self.inferred = 0
+        self._queue: "queue.Queue[Tuple[ScoreTracker, int, Dict]]" = queue.Queue()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        threading.Thread(target=self._run, daemon=True, name="authentifi-scoring").start()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def content_hash(self, content: str) -> str:
+        return hashlib.blake2b(f"{self.classifier.version}\0{content}".encode("utf-8"), digest_size=16).hexdigest()
+
+    def enqueue(self, tracker: ScoreTracker, messages: List[Dict]) -> int:
+        """Queue a topic's unscored assistant messages; returns immediately"""
+        pending = tracker.pending(messages)
+        for position, message in pending:
+            self._queue.put((tracker, position, message))
+        return len(pending)
+
+    def _next_batch(self) -> List[Tuple[ScoreTracker, int, Dict]]:
+        """Block for one item, then gather whatever else arrives within max_wait"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                self.score_batch(batch)
+            except Exception:
+                # The worker carries on; the next enqueue() for each topic picks the batch up again
+                logger.exception("Scoring %d messages failed", len(batch))
+                for tracker, position, _ in batch:
+                    tracker.rewind(position)
+
+    def score_batch(self, batch: List[Tuple[ScoreTracker, int, Dict]]) -> None:
+        hashes = [self.content_hash(message["content"]) for _, _, message in batch]
+        scores = {key: self.cache[key] for key in hashes if key in self.cache}
+        misses = list(dict.fromkeys(key for key in hashes if key not in scores))
+        with self._connect() as conn:
+            if misses:
+                for key, bias, depth in conn.execute(
+                    f"SELECT content_hash, bias, depth FROM score WHERE content_hash IN ({','.join('?' * len(misses))})",
+                    misses
+                ):
+                    scores[key] = np.array([bias, depth])
+            texts = {key: message["content"] for key, (_, _, message) in zip(hashes, batch) if key not in scores}
+            if texts:
+                predicted = self.classifier.predict(list(texts.values()))
+                conn.executemany("INSERT OR REPLACE INTO score VALUES (?, ?, ?)",
+                                 [(key, float(row[0]), float(row[1])) for key, row in zip(texts, predicted)])
+                scores.update(zip(texts, predicted))
+                self.batches += 1
+                self.inferred += len(texts)
+        if len(self.cache) > self.cache_size:
+            self.cache.clear()
+        self.cache.update(scores)
+        for key, (tracker, position, message) in zip(hashes, batch):
+            tracker.record(position, scores[key], len(message["content"].split()))
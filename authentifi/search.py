@@ -0,0 +1,112 @@
+"""Incremental topic and message search for the sidebar.
+
+``SearchIndex`` keeps a trigram inverted index over topic names and message
+text and only indexes messages appended since the last sync. Each session
+caches results per query; a query that extends a cached one (typing more
+characters) filters the cached hits instead of going back to the index.
+Queries shorter than a trigram only match topic names.
+"""
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Set, Tuple
+
+DocKey = Tuple[str, int]  # (topic_id, message index); index -1 is the topic name
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+@dataclass
+class SearchHit:
+    topic_id: str
+    name: str
+    matches: int
+    snippet: str
+
+
+class SearchIndex:
+    def __init__(self):
+        self.postings: Dict[str, Set[DocKey]] = defaultdict(set)
+        self.texts: Dict[DocKey, str] = {}
+        self.names: Dict[str, str] = {}
+        self.cursors: Dict[str, int] = {}
+        self.version = 0
+
+    def sync(self, topics: Dict[str, Dict]) -> None:
+        """Index topics and messages added since the last sync"""
+        for topic_id, topic in topics.items():
+            if topic_id not in self.names:
+                self.names[topic_id] = topic["name"]
+                self._add((topic_id, -1), topic["name"])
+            messages = topic.get("messages", [])
+            start = self.cursors.get(topic_id, 0)
+            for i in range(start, len(messages)):
+                self._add((topic_id, i), messages[i]["content"])
+            self.cursors[topic_id] = len(messages)
+
+    def _add(self, key: DocKey, text: str) -> None:
+        lowered = text.lower()
+        self.texts[key] = lowered
+        for gram in trigrams(lowered):
+            self.postings[gram].add(key)
+        self.version += 1
+
+    def candidates(self, query: str) -> Set[DocKey]:
+        """Documents containing every trigram of the query, verified by substring"""
+        if len(query) < 3:
+            keys = {(topic_id, -1) for topic_id in self.names}
+        else:
+            grams = sorted(trigrams(query), key=lambda g: len(self.postings.get(g, ())))
+            keys = set(self.postings.get(grams[0], ()))
+            for gram in grams[1:]:
+                keys &= self.postings.get(gram, set())
+                if not keys:
+                    break
+        return {key for key in keys if query in self.texts[key]}
+
+
+class SearchSession:
+    """Per-session result cache that refines earlier prefixes."""
+
+    def __init__(self, index: SearchIndex, max_entries: int = 64):
+        self.index = index
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Set[DocKey]]" = OrderedDict()
+        self._version = -1
+
+    def search(self, query: str, limit: int = 10) -> List[SearchHit]:
+        query = query.strip().lower()
+        if not query:
+            return []
+        if self._version != self.index.version:
+            self._cache.clear()
+            self._version = self.index.version
+        keys = self._cache.get(query)
+        if keys is None:
+            prefix = max((cached for cached in self._cache if len(cached) >= 3 and query.startswith(cached)),
+                         key=len, default=None)
+            if prefix is not None:
+                keys = {key for key in self._cache[prefix] if query in self.index.texts[key]}
+            else:
+                keys = self.index.candidates(query)
+            self._cache[query] = keys
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        self._cache.move_to_end(query)
+        return self._hits(query, keys, limit)
+
+    def _hits(self, query: str, keys: Set[DocKey], limit: int) -> List[SearchHit]:
+        by_topic: Dict[str, List[int]] = defaultdict(list)
+        for topic_id, position in keys:
+            by_topic[topic_id].append(position)
+        hits = []
+        for topic_id, positions in by_topic.items():
+            first = min(positions)
+            text = self.index.texts[(topic_id, first)]
+            at = text.find(query)
+            snippet = ("…" if at > 30 else "") + text[max(0, at - 30):at + len(query) + 30]
+            hits.append(SearchHit(topic_id, self.index.names[topic_id], len(positions), snippet))
+        hits.sort(key=lambda hit: hit.matches, reverse=True)
+        return hits[:limit]
+
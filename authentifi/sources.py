@@ -0,0 +1,228 @@
+"""Citation and source extraction with a per-topic deduplicated index.
+
+``StreamingSourceExtractor`` is fed completion chunks as they arrive and
+scans each completed line once, so sources are extracted by the time the
+answer finishes streaming. They are only added to the index when the answer
+is stored, so a failed or abandoned completion leaves no references behind.
+``SourceIndex`` keeps running counters so the analytics metrics never
+rescan the conversation, along with the outcome of checking each DOI,
+author-year citation and quoted title against the bibliography. Every
+reference records the position of its message, so a branch takes the
+counts as of its fork point from the parent instead of rescanning the
+shared history.
+"""
+import re
+import threading
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+_URL = re.compile(r"https?://[^\s<>\"'`\]\[)(]+", re.IGNORECASE)
+_DOI = re.compile(r"\b10\.\d{4,9}/[^\s\"'<>\]\[)(,;]+", re.IGNORECASE)
+_CITATION = re.compile(
+    r"\b([A-Z][A-Za-z'\-]+)(?:\s+et\s+al\.?|\s+(?:and|&)\s+[A-Z][A-Za-z'\-]+)?"
+    r"(?:,\s*|\s+\()((?:19|20)\d{2})[a-z]?\)?"
+)
+# Capitalised words that precede a year without naming an author ("January, 2021", "Since (2020)")
+_NOT_AUTHORS = frozenset("""
+    january february march april may june july august september october november december
+    jan feb mar apr jun jul aug sep sept oct nov dec
+    monday tuesday wednesday thursday friday saturday sunday
+    spring summer fall autumn winter
+    in since by from until before after during circa around about as of the year fiscal fy q1 q2 q3 q4
+""".split())
+# A quoted title right after a reference's year: Smith (2020). "Title." or (Smith, 2020), "Title"
+_TITLE = re.compile(r"\b(?:19|20)\d{2}[a-z]?\)?[.,:]?\s*[\"“]([^\"”\n]{10,300}?)[\"”]")
+_TRAILING = ".,;:!?*_'\")]>"
+# Source kinds that can be checked against the bibliography
+CHECKABLE = ("doi", "citation", "title")
+_MAX_PENDING = 2000
+
+
+@dataclass
+class Source:
+    key: str
+    kind: str
+    title: str
+    url: str
+    count: int = 0
+    # Message position of each reference, sorted
+    positions: List[int] = field(default_factory=list)
+
+    @property
+    def relevance(self) -> str:
+        if self.count >= 3:
+            return "High"
+        return "Medium" if self.count == 2 else "Low"
+
+
+def normalize_doi(doi: str) -> str:
+    return doi.rstrip(_TRAILING).lower()
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.rstrip(_TRAILING))
+    query = urlencode([
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_")
+    ])
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(title.lower().split()).rstrip(_TRAILING)
+
+
+def find_sources(text: str) -> List[Tuple[str, str, str, str]]:
+    """(key, kind, title, url) for every reference in text, in order"""
+    found = []
+    url_spans = []
+    for match in _URL.finditer(text):
+        url_spans.append(match.span())
+        doi = _DOI.search(match.group())
+        if doi and "doi.org" in match.group().lower():
+            value = normalize_doi(doi.group())
+            found.append((match.start(), f"doi:{value}", "doi", value, f"https://doi.org/{value}"))
+        else:
+            url = normalize_url(match.group())
+            found.append((match.start(), f"url:{url}", "url", urlsplit(url).netloc + urlsplit(url).path, url))
+    for match in _DOI.finditer(text):
+        if any(start <= match.start() < end for start, end in url_spans):
+            continue
+        value = normalize_doi(match.group())
+        found.append((match.start(), f"doi:{value}", "doi", value, f"https://doi.org/{value}"))
+    for match in _CITATION.finditer(text):
+        author, year = match.group(1), match.group(2)
+        if author.lower() in _NOT_AUTHORS or any(start <= match.start() < end for start, end in url_spans):
+            continue
+        title = match.group()
+        if "(" not in title:
+            title = title.rstrip(")")
+        found.append((match.start(), f"cite:{author.lower()}|{year}", "citation", title, ""))
+    for match in _TITLE.finditer(text):
+        title = match.group(1).strip().rstrip(_TRAILING)
+        if len(title.split()) >= 3:
+            found.append((match.start(1), f"title:{normalize_title(title)}", "title", title, ""))
+    found.sort(key=lambda item: item[0])
+    return [item[1:] for item in found]
+
+
+class SourceIndex:
+    def __init__(self):
+        self.sources: Dict[str, Source] = {}
+        self.total_references = 0
+        self.cursor = 0
+        self.streamed_ids: Set[str] = set()
+        self.verified: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        # Held for a whole catch-up pass; separate from _lock so streaming adds are not held up
+        self._catch_up_lock = threading.Lock()
+
+    def add_text(self, text: str, position: int) -> None:
+        for key, kind, title, url in find_sources(text):
+            self.add(key, kind, title, url, position)
+
+    def add(self, key: str, kind: str, title: str, url: str, position: int) -> None:
+        with self._lock:
+            source = self.sources.get(key)
+            if source is None:
+                source = self.sources[key] = Source(key, kind, title, url)
+            source.count += 1
+            # A streamed answer can be indexed before catch-up reaches older messages
+            insort(source.positions, position)
+            self.total_references += 1
+
+    def catch_up(self, messages: List[Dict]) -> None:
+        """Index assistant messages that were not seen while streaming"""
+        with self._catch_up_lock:
+            new = messages[self.cursor:]
+            for position, message in enumerate(new, start=self.cursor):
+                if message["role"] == "assistant" and message.get("id") not in self.streamed_ids:
+                    self.add_text(message["content"], position)
+            self.cursor += len(new)
+
+    def fork(self, at: int) -> "SourceIndex":
+        """Index holding the references of the first `at` messages"""
+        index = SourceIndex()
+        with self._catch_up_lock, self._lock:
+            index.cursor = min(at, self.cursor)
+            # Answers streamed before the fork point are counted below and must not be indexed again
+            index.streamed_ids = set(self.streamed_ids)
+            for key, source in self.sources.items():
+                kept = bisect_left(source.positions, at)
+                if kept:
+                    index.sources[key] = Source(key, source.kind, source.title, source.url,
+                                                kept, source.positions[:kept])
+                    index.total_references += kept
+                    if key in self.verified:
+                        index.verified[key] = self.verified[key]
+        return index
+
+    @property
+    def unique_count(self) -> int:
+        return len(self.sources)
+
+    @property
+    def checkable_count(self) -> int:
+        """Sources the bibliography can confirm; URLs cannot be checked"""
+        with self._lock:
+            return sum(source.kind in CHECKABLE for source in self.sources.values())
+
+    def unverified(self, kinds: Tuple[str, ...] = CHECKABLE) -> List[str]:
+        """Keys of checkable sources that have not been verified yet"""
+        with self._lock:
+            return [key for key, source in self.sources.items()
+                    if source.kind in kinds and key not in self.verified]
+
+    def mark_verified(self, results: Dict[str, bool]) -> None:
+        with self._lock:
+            self.verified.update(results)
+
+    @property
+    def verified_count(self) -> int:
+        return sum(self.verified.values())
+
+    @property
+    def checked_count(self) -> int:
+        return len(self.verified)
+
+    def ranked(self, limit: Optional[int] = None) -> List[Source]:
+        with self._lock:
+            ranked = sorted(self.sources.values(), key=lambda s: s.count, reverse=True)
+        return ranked[:limit] if limit else ranked
+
+
+class StreamingSourceExtractor:
+    """Scans completion text line by line as tokens arrive; commit() indexes what it found."""
+
+    def __init__(self, index: SourceIndex, message_id: str, position: int):
+        self.index = index
+        self.message_id = message_id
+        self.position = position
+        self.pending = ""
+        self.found: List[Tuple[str, str, str, str]] = []
+        # Catch-up must leave this message to commit(), which runs once it is stored
+        index.streamed_ids.add(message_id)
+
+    def feed(self, chunk: str) -> None:
+        self.pending += chunk
+        cut = self.pending.rfind("\n")
+        if cut < 0 and len(self.pending) > _MAX_PENDING:
+            cut = self.pending.rfind(" ")
+        if cut >= 0:
+            self.found.extend(find_sources(self.pending[:cut]))
+            self.pending = self.pending[cut + 1:]
+
+    def finish(self) -> None:
+        if self.pending:
+            self.found.extend(find_sources(self.pending))
+            self.pending = ""
+
+    def commit(self) -> None:
+        """Index the extracted references; call once the message has been stored"""
+        self.finish()
+        found, self.found = self.found, []
+        for key, kind, title, url in found:
+            self.index.add(key, kind, title, url, self.position)
@@ -0,0 +1,158 @@
+"""Hierarchical rolling summaries over a topic's message history.
+
+Messages are folded into fixed-size leaf chunks; every ``fanout`` complete
+nodes on one level are summarized into a parent on the next. Appending a turn
+only touches the open leaf and, when a chunk fills up, one node per level, so
+a digest of any prefix of the topic is O(fanout * log n) summaries.
+Each level up gets twice the character budget of the level below, up to
+``max_parent_chars``, so a parent keeps sentences from every child rather
+than only their openings. Nodes never change once built, so a branch's tree
+shares every complete node inside the fork point with its parent.
+"""
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+Summarizer = Callable[[List[str], int], str]
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _spread(sentences: List[str], budget: int) -> str:
+    """The first sentence plus evenly spaced later ones, in order, within budget"""
+    count = len(sentences)
+    length = len(" ".join(sentences))
+    if length > budget:
+        count = max(1, count * budget // length)
+    while True:
+        kept = sentences[:1] if count == 1 else \
+            [sentences[round(i * (len(sentences) - 1) / (count - 1))] for i in range(count)]
+        text = " ".join(kept)
+        if len(text) <= budget or count == 1:
+            break
+        count -= 1
+    return text[:budget - 3].rstrip() + "..." if len(text) > budget else text
+
+
+def extractive_summary(texts: List[str], max_chars: int = 600) -> str:
+    """Sentences from across each text; a text's unused share of max_chars goes to the ones after it"""
+    parts = []
+    remaining = max_chars
+    for i, text in enumerate(texts):
+        budget = max(40, remaining // (len(texts) - i))
+        sentences = [sentence for sentence in _SENTENCE_END.split(" ".join(text.split())) if sentence]
+        if sentences:
+            parts.append(_spread(sentences, budget))
+            remaining -= len(parts[-1]) + 1
+    return " ".join(parts)
+
+
+@dataclass
+class SummaryNode:
+    level: int
+    index: int
+    start: int
+    end: int
+    text: str
+
+
+class SummaryTree:
+    def __init__(self, chunk_size: int = 8, fanout: int = 4,
+                 summarize: Summarizer = extractive_summary,
+                 max_chars: int = 600, max_parent_chars: int = 2400):
+        self.chunk_size = chunk_size
+        self.fanout = fanout
+        self.summarize = summarize
+        self.max_chars = max_chars
+        self.max_parent_chars = max_parent_chars
+        self.levels: List[List[SummaryNode]] = [[]]
+        self.open_leaf: Optional[SummaryNode] = None
+        self.covered = 0
+        self._lock = threading.Lock()
+
+    def update(self, messages: List[Dict]) -> None:
+        """Fold any messages appended since the last update into the tree"""
+        with self._lock:
+            total = len(messages)
+            if total <= self.covered:
+                return
+            start = len(self.levels[0]) * self.chunk_size
+            while start + self.chunk_size <= total:
+                self._add_leaf(messages, start, start + self.chunk_size)
+                start += self.chunk_size
+            if start < total:
+                self.open_leaf = SummaryNode(
+                    0, len(self.levels[0]), start, total,
+                    self.summarize(self._leaf_texts(messages, start, total), self.max_chars)
+                )
+            else:
+                self.open_leaf = None
+            self.covered = total
+
+    def fork(self, at: int) -> "SummaryTree":
+        """Tree for the first `at` messages, sharing the parent's complete nodes"""
+        with self._lock:
+            tree = SummaryTree(self.chunk_size, self.fanout, self.summarize,
+                               self.max_chars, self.max_parent_chars)
+            count = min(len(self.levels[0]), at // self.chunk_size)
+            tree.covered = count * self.chunk_size
+            tree.levels = []
+            for level in self.levels:
+                tree.levels.append(level[:count])
+                count //= self.fanout
+        return tree
+
+    def digest(self, end: Optional[int] = None) -> List[SummaryNode]:
+        """Smallest set of summaries covering messages [0, end) in order"""
+        with self._lock:
+            if end is None:
+                end = self.covered
+            result: List[SummaryNode] = []
+            for node in self._roots():
+                self._collect(node, end, result)
+            if self.open_leaf is not None and self.open_leaf.end <= end:
+                result.append(self.open_leaf)
+            return result
+
+    def budget(self, level: int) -> int:
+        """Characters a node on this level may use"""
+        return min(self.max_chars * 2 ** level, self.max_parent_chars)
+
+    def _leaf_texts(self, messages: List[Dict], start: int, end: int) -> List[str]:
+        return [f"{m['role']}: {m['content']}" for m in messages[start:end]]
+
+    def _add_leaf(self, messages: List[Dict], start: int, end: int) -> None:
+        leaf = SummaryNode(0, len(self.levels[0]), start, end,
+                           self.summarize(self._leaf_texts(messages, start, end), self.max_chars))
+        self.levels[0].append(leaf)
+        level = 0
+        while len(self.levels[level]) % self.fanout == 0:
+            children = self.levels[level][-self.fanout:]
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            parent_level = self.levels[level + 1]
+            parent_level.append(SummaryNode(
+                level + 1, len(parent_level), children[0].start, children[-1].end,
+                self.summarize([c.text for c in children], self.budget(level + 1))
+            ))
+            level += 1
+
+    def _roots(self) -> List[SummaryNode]:
+        """Nodes that have not been folded into a parent, oldest first"""
+        roots = []
+        for level in range(len(self.levels) - 1, -1, -1):
+            parented = (len(self.levels[level + 1]) * self.fanout
+                        if level + 1 < len(self.levels) else 0)
+            roots.extend(self.levels[level][parented:])
+        return roots
+
+    def _collect(self, node: SummaryNode, end: int, result: List[SummaryNode]) -> None:
+        if node.end <= end:
+            result.append(node)
+            return
+        if node.start >= end or node.level == 0:
+            return
+        first = node.index * self.fanout
+        for child in self.levels[node.level - 1][first:first + self.fanout]:
+            self._collect(child, end, result)
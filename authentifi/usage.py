@@ -0,0 +1,151 @@
+"""Token usage accounting and quotas per user and per topic.
+
+Every completion call goes through ``MeteredBackend``, which checks quotas
+before the request is sent and records the tokens afterwards, using the
+usage the server reports or a local estimate when it reports none. The
+ledger keeps running totals in memory and writes raw records to SQLite in
+batches, so recording a call never waits on disk.
+"""
+import atexit
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from authentifi.backends import LLMBackend, OpenCallback, UsageCallback
+from authentifi.routing import estimate_tokens
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    ts REAL NOT NULL,
+    user_id TEXT NOT NULL,
+    topic_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    estimated INTEGER NOT NULL
+)
+"""
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class UsageLedger:
+    def __init__(self, db_path: Path, user_quota: int = 0, topic_quota: int = 0,
+                 flush_every: int = 50, flush_interval: float = 10.0):
+        self.db_path = db_path
+        self.user_quota = user_quota
+        self.topic_quota = topic_quota
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.user_totals: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        self.topic_totals: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        self._pending: List[Tuple] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(_SCHEMA)
+            for column, totals in (("user_id", self.user_totals), ("topic_id", self.topic_totals)):
+                for key, prompt, completion in conn.execute(
+                    f"SELECT {column}, SUM(prompt_tokens), SUM(completion_tokens) FROM usage GROUP BY {column}"
+                ):
+                    totals[key] = [prompt, completion]
+        atexit.register(self.flush)
+
+    def check(self, user_id: str, topic_id: str, prompt_tokens: int) -> None:
+        """Raise QuotaExceeded if a request of this size would go over a quota"""
+        with self._lock:
+            if self.user_quota and sum(self.user_totals[user_id]) + prompt_tokens > self.user_quota:
+                raise QuotaExceeded(f"Token quota of {self.user_quota:,} reached for this user")
+            if self.topic_quota and sum(self.topic_totals[topic_id]) + prompt_tokens > self.topic_quota:
+                raise QuotaExceeded(f"Token quota of {self.topic_quota:,} reached for this topic")
+
+    def record(self, user_id: str, topic_id: str, model: str, prompt_tokens: int,
+               completion_tokens: int, estimated: bool = False) -> None:
+        with self._lock:
+            for totals in (self.user_totals[user_id], self.topic_totals[topic_id]):
+                totals[0] += prompt_tokens
+                totals[1] += completion_tokens
+            self._pending.append((time.time(), user_id, topic_id, model,
+                                  prompt_tokens, completion_tokens, int(estimated)))
+            due = (len(self._pending) >= self.flush_every
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if rows:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.executemany("INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def user_total(self, user_id: str) -> int:
+        with self._lock:
+            return sum(self.user_totals.get(user_id, (0, 0)))
+
+    def topic_total(self, topic_id: str) -> int:
+        with self._lock:
+            return sum(self.topic_totals.get(topic_id, (0, 0)))
+
+
+class MeteredBackend(LLMBackend):
+    """Wraps a backend so every call is quota-checked and recorded."""
+
+    def __init__(self, backend: LLMBackend, ledger: UsageLedger, user_id: str, topic_id: str):
+        self.backend = backend
+        self.ledger = ledger
+        self.user_id = user_id
+        self.topic_id = topic_id
+        self.name = backend.name
+
+    def stream_chat(self, messages: List[Dict], model: str, max_tokens: Optional[int] = None,
+                    on_usage: Optional[UsageCallback] = None,
+                    on_open: Optional[OpenCallback] = None) -> Iterator[str]:
+        prompt_tokens = self._check(messages)
+        reported = []
+        chunks = []
+
+        def capture(usage: Dict) -> None:
+            reported.append(usage)
+            if on_usage is not None:
+                on_usage(usage)
+
+        try:
+            for text in self.backend.stream_chat(messages, model, max_tokens, capture, on_open):
+                chunks.append(text)
+                yield text
+        finally:
+            self._record(model, prompt_tokens, "".join(chunks), reported)
+
+    def complete(self, messages: List[Dict], model: str, max_tokens: Optional[int] = None,
+                 on_usage: Optional[UsageCallback] = None) -> str:
+        prompt_tokens = self._check(messages)
+        reported = []
+
+        def capture(usage: Dict) -> None:
+            reported.append(usage)
+            if on_usage is not None:
+                on_usage(usage)
+
+        answer = self.backend.complete(messages, model, max_tokens, capture)
+        self._record(model, prompt_tokens, answer, reported)
+        return answer
+
+    def _check(self, messages: List[Dict]) -> int:
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        self.ledger.check(self.user_id, self.topic_id, prompt_tokens)
+        return prompt_tokens
+
+    def _record(self, model: str, prompt_tokens: int, answer: str, reported: List[Dict]) -> None:
+        if reported:
+            self.ledger.record(self.user_id, self.topic_id, model,
+                               reported[-1]["prompt_tokens"], reported[-1]["completion_tokens"])
+        else:
+            self.ledger.record(self.user_id, self.topic_id, model,
+                               prompt_tokens, estimate_tokens(answer) if answer else 0, estimated=True)
@@ -0,0 +1,211 @@
+"""Append-only vector files shared between worker processes.
+
+``VectorStore`` keeps float32 rows in one memory-mapped file behind a small
+header (magic, dimension, committed row count, capacity), with the external
+key of every row in a sibling ``.ids`` file. A single writer appends rows
+and then bumps the committed count; every other process maps the same
+files read-only, so all of them share one copy of the vectors through the
+page cache and see new rows as soon as the count moves.
+
+``IVFIndex`` is an inverted-file ANN index stored beside the vectors: a set
+of k-means centroids plus the list each row belongs to. Rows appended after
+training are assigned to their nearest centroid as they arrive; the
+centroids are retrained only when the store has doubled since the last
+training, and the new files replace the old ones atomically.
+"""
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+MAGIC = int.from_bytes(b"AFVEC1\0\0", "little")
+# Header words: magic, dimension, committed rows, capacity
+HEADER_WORDS = 8
+HEADER_BYTES = HEADER_WORDS * 8
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process election, so run a single worker process
+    fcntl = None
+
+
+def acquire_writer_lock(path: Path) -> Optional[int]:
+    """File descriptor holding the exclusive writer lock, or None if another process has it"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    if fcntl is None:
+        return fd
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+class VectorStore:
+    def __init__(self, path: Path, dim: int, writable: bool = False):
+        self.path = Path(path)
+        self.ids_path = self.path.with_suffix(".ids")
+        self.dim = dim
+        self.writable = writable
+        self.header = None
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.keys = np.zeros(0, dtype=np.int64)
+        if writable and not self.path.exists():
+            self._create()
+        self._map()
+
+    def _create(self, capacity: int = 1024) -> None:
+        header = np.zeros(HEADER_WORDS, dtype=np.uint64)
+        header[:4] = (MAGIC, self.dim, 0, capacity)
+        with open(self.path, "wb") as f:
+            f.write(header.tobytes())
+            f.truncate(HEADER_BYTES + capacity * self.dim * 4)
+        with open(self.ids_path, "wb") as f:
+            f.truncate(capacity * 8)
+
+    def _map(self) -> None:
+        if not self.path.exists():
+            return
+        mode = "r+" if self.writable else "r"
+        self.header = np.memmap(self.path, dtype=np.uint64, mode=mode, shape=(HEADER_WORDS,))
+        if int(self.header[0]) != MAGIC or int(self.header[1]) != self.dim:
+            raise ValueError(f"{self.path} is not a {self.dim}-dimensional vector store")
+        capacity = int(self.header[3])
+        self.vectors = np.memmap(self.path, dtype=np.float32, mode=mode,
+                                 offset=HEADER_BYTES, shape=(capacity, self.dim))
+        self.keys = np.memmap(self.ids_path, dtype=np.int64, mode=mode, shape=(capacity,))
+
+    @property
+    def count(self) -> int:
+        return 0 if self.header is None else int(self.header[2])
+
+    @property
+    def last_key(self) -> int:
+        count = self.count
+        return int(self.keys[count - 1]) if count else 0
+
+    def refresh(self) -> int:
+        """Pick up rows committed by the writer, remapping if the files grew"""
+        if self.header is None or self.count > len(self.vectors):
+            self._map()
+        return self.count
+
+    def append(self, keys: np.ndarray, vectors: np.ndarray) -> None:
+        if not self.writable:
+            raise PermissionError("vector store is open read-only")
+        count = self.count
+        needed = count + len(keys)
+        if needed > len(self.vectors):
+            self._grow(max(needed, 2 * len(self.vectors)))
+        self.vectors[count:needed] = vectors
+        self.keys[count:needed] = keys
+        self.vectors.flush()
+        self.keys.flush()
+        # Readers only look at rows below the committed count
+        self.header[2] = needed
+        self.header.flush()
+
+    def _grow(self, capacity: int) -> None:
+        with open(self.path, "r+b") as f:
+            f.truncate(HEADER_BYTES + capacity * self.dim * 4)
+        with open(self.ids_path, "r+b") as f:
+            f.truncate(capacity * 8)
+        self.header[3] = capacity
+        self.header.flush()
+        self._map()
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means centroids of unit vectors"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        occupied = np.bincount(assignment, minlength=k) > 0
+        centroids[occupied] = sums[occupied]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids /= np.where(norms == 0, 1, norms)
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index over a VectorStore, kept in files beside it."""
+
+    def __init__(self, store_path: Path, min_train: int = 4096, sample: int = 20000):
+        self.centroids_path = Path(store_path).with_suffix(".ivf.npz")
+        self.min_train = min_train
+        self.sample = sample
+        self.centroids: Optional[np.ndarray] = None
+        self.lists = np.zeros(0, dtype=np.int32)
+        self.generation = 0
+        self.trained_count = 0
+        self._stamp = None
+        self._lists_path: Optional[Path] = None
+
+    def _lists_file(self, generation: int) -> Path:
+        return self.centroids_path.with_name(f"{self.centroids_path.stem}.{generation}.lists")
+
+    def load(self) -> None:
+        """Reload centroids after a retrain and remap the row assignments"""
+        try:
+            stat = os.stat(self.centroids_path)
+        except FileNotFoundError:
+            return
+        stamp = (stat.st_ino, stat.st_mtime_ns)
+        if stamp != self._stamp:
+            with np.load(self.centroids_path) as data:
+                self.centroids = data["centroids"]
+                self.generation = int(data["generation"])
+                self.trained_count = int(data["trained_count"])
+            self._stamp = stamp
+            self._lists_path = self._lists_file(self.generation)
+        if self._lists_path is not None and self._lists_path.exists():
+            size = self._lists_path.stat().st_size // 4
+            if size != len(self.lists):
+                self.lists = np.memmap(self._lists_path, dtype=np.int32, mode="r", shape=(size,)) \
+                    if size else np.zeros(0, dtype=np.int32)
+
+    def update(self, store: VectorStore) -> None:
+        """Writer side: assign new rows, retraining once the store has doubled"""
+        count = store.count
+        if count < self.min_train:
+            return
+        if self.centroids is None or count >= 2 * self.trained_count:
+            self._train(store, count)
+            return
+        assigned = len(self.lists)
+        if assigned < count:
+            new = np.argmax(store.vectors[assigned:count] @ self.centroids.T, axis=1).astype(np.int32)
+            with open(self._lists_path, "ab") as f:
+                f.write(new.tobytes())
+            self.load()
+
+    def _train(self, store: VectorStore, count: int) -> None:
+        rng = np.random.default_rng(count)
+        sample = store.vectors[np.sort(rng.choice(count, size=min(count, self.sample), replace=False))]
+        centroids = kmeans(np.asarray(sample), k=max(8, int(4 * np.sqrt(count))))
+        lists = np.empty(count, dtype=np.int32)
+        for start in range(0, count, 65536):
+            block = store.vectors[start:min(count, start + 65536)]
+            lists[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        generation = self.generation + 1
+        lists_path = self._lists_file(generation)
+        lists.tofile(lists_path)
+        tmp = self.centroids_path.with_name(self.centroids_path.name + ".tmp.npz")
+        np.savez(tmp, centroids=centroids, generation=generation, trained_count=count)
+        os.replace(tmp, self.centroids_path)
+        old = self._lists_path
+        self.load()
+        if old is not None and old != lists_path:
+            old.unlink(missing_ok=True)
+
+    def probe(self, query: np.ndarray, nprobe: int) -> Optional[np.ndarray]:
+        """Rows in the nprobe lists closest to the query, or None without a trained index"""
+        if self.centroids is None or not len(self.lists):
+            return None
+        nearest = np.argpartition(-(self.centroids @ query), min(nprobe, len(self.centroids)) - 1)[:nprobe]
+        return np.flatnonzero(np.isin(self.lists, nearest))
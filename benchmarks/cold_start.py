@@ -0,0 +1,74 @@
+"""Cold-start benchmark for the Streamlit app.
+
+Measures, in fresh interpreters:
+  * import cost of the app module from ``python -X importtime``, and which
+    heavy dependencies it pulls in at import time;
+  * time to first paint: process start until the first script run (the
+    "add your API key" screen) has rendered, via streamlit's AppTest.
+
+Usage: python benchmarks/cold_start.py [--app streamlit_app.py] [--runs 5]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY = ("pandas", "numpy", "openai", "pyarrow")
+
+FIRST_PAINT = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=60)
+at.run()
+print(time.perf_counter() - start)
+"""
+
+
+def import_profile(app: Path):
+    module = app.stem
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys; sys.argv = ['bench']; import {module}"],
+        cwd=app.parent, capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            cumulative[match.group(3)] = int(match.group(1))
+    return cumulative.get(module, 0) / 1e6, [name for name in HEAVY if name in cumulative]
+
+
+def first_paint(app: Path) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_PAINT.format(app=str(app))],
+        cwd=app.parent, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", type=Path, default=ROOT / "streamlit_app.py")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    app = args.app.resolve()
+
+    imports, paints, heavy = [], [], []
+    for _ in range(args.runs):
+        seconds, heavy = import_profile(app)
+        imports.append(seconds)
+        paints.append(first_paint(app))
+
+    print(f"app: {app}")
+    print(f"module import (median of {args.runs}): {statistics.median(imports) * 1000:.0f} ms")
+    print(f"heavy modules imported at startup: {', '.join(heavy) or 'none'}")
+    print(f"time to first paint (median of {args.runs}): {statistics.median(paints) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
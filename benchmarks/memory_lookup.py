@@ -0,0 +1,84 @@
+"""Semantic memory lookup benchmark.
+
+Fills a fresh ``SemanticMemory`` with synthetic research messages spread
+over many topics (each topic draws from its own vocabulary, so the data
+clusters the way real topics do), then times:
+  * journaling plus ingest into the memory-mapped store, including IVF
+    training;
+  * top-K lookups over all of a user's topics, through the IVF index and as
+    an exact scan, with the recall of the IVF results against the exact ones;
+  * lookups within a single topic.
+
+Usage: python benchmarks/memory_lookup.py [--messages 100000] [--topics 200] [--queries 50]
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from authentifi.memory import SemanticMemory  # noqa: E402
+
+GENERAL = "learning students teachers study effect results sample evidence school data analysis found".split()
+
+
+def timed(fn, queries):
+    samples, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append([hit.message_id for hit in fn(query)])
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1], results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [f"term{i}" for i in range(3000)]
+    topic_words = [rng.sample(vocabulary, 12) for _ in range(args.topics)]
+
+    def message(topic: int) -> str:
+        words = rng.choices(topic_words[topic], k=12) + rng.choices(GENERAL, k=10) + rng.choices(vocabulary, k=4)
+        return " ".join(words)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = SemanticMemory(Path(tmp) / "memory.db", sync_interval=3600)
+        start = time.perf_counter()
+        # Topics grow side by side, a conversation's worth of messages at a time
+        per_topic = args.messages // args.topics
+        for first in range(0, per_topic, 25):
+            for topic in range(args.topics):
+                memory.add_many("user", f"topic-{topic}", [
+                    {"id": f"{topic}-{i}", "role": "user", "content": message(topic)}
+                    for i in range(first, min(per_topic, first + 25))
+                ])
+        elapsed = time.perf_counter() - start
+        print(f"{len(memory):,} messages: {elapsed / len(memory) * 1e6:.0f} µs per message "
+              f"(embedding, journal, store append and IVF upkeep)")
+
+        queries = [" ".join(rng.choices(topic_words[rng.randrange(args.topics)], k=5))
+                   for _ in range(args.queries)]
+        search = lambda query: memory.search(query, "user", min_score=0)  # noqa: E731
+        nprobe, memory.nprobe = memory.nprobe, 0
+        median, p95, exact = timed(search, queries)
+        print(f"all topics, exact scan: median {median:.2f} ms, p95 {p95:.2f} ms")
+        memory.nprobe = nprobe
+        median, p95, approximate = timed(search, queries)
+        recall = statistics.mean(len(set(a) & set(e)) / max(1, len(e)) for a, e in zip(approximate, exact))
+        print(f"all topics, IVF (nprobe={nprobe}): median {median:.2f} ms, p95 {p95:.2f} ms, recall {recall:.2f}")
+        median, p95, _ = timed(lambda query: memory.search(query, "user", ["topic-0"], min_score=0), queries)
+        print(f"one topic: median {median:.2f} ms, p95 {p95:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from authentifi import archive, branches
+from authentifi.progress import ProgressSeries
+
+
+def _jsonl(*rows) -> io.BytesIO:
+    return io.BytesIO("".join(json.dumps(row) + "\n" for row in rows).encode("utf-8"))
+
+
+def _row(**values):
+    row = {"topic_id": "t1", "topic_name": "Topic", "topic_created_at": "2024-01-01T09:00:00",
+           "message_id": "m1", "role": "user", "content": "hello", "timestamp": "2024-01-01T09:01:00"}
+    row.update(values)
+    return row
+
+
+def test_jsonl_round_trip_skips_existing_messages():
+    topics = {"t1": {"name": "Topic", "created_at": "2024-01-01T09:00:00", "messages": [
+        {"id": "m1", "role": "user", "content": "hello", "timestamp": "2024-01-01T09:01:00"},
+        {"id": "m2", "role": "assistant", "content": "hi", "timestamp": "2024-01-01T09:01:05"},
+    ]}, "t2": {"name": "Empty", "created_at": "2024-01-02T09:00:00", "messages": []}}
+    sink = io.BytesIO()
+    assert archive.export_topics(topics, sink, "jsonl") == 3
+
+    restored = {}
+    assert archive.import_topics(io.BytesIO(sink.getvalue()), "jsonl", restored) == {"topics": 2, "messages": 2}
+    assert restored == topics
+    assert archive.import_topics(io.BytesIO(sink.getvalue()), "jsonl", restored) == {"topics": 0, "messages": 0}
+
+
+@pytest.mark.parametrize("row, error", [
+    ({key: value for key, value in _row().items() if key != "role"}, "missing columns: role"),
+    (_row(role="system"), "unknown role"),
+    (_row(role="tool"), "unknown role"),
+    (_row(content=None), "no message content"),
+    (_row(topic_id=None), "no topic_id"),
+    (_row(timestamp="yesterday"), "timestamp is not an ISO timestamp"),
+    (_row(topic_created_at=12), "topic_created_at is not an ISO timestamp"),
+])
+def test_bad_rows_raise_value_error_and_import_nothing(row, error):
+    topics = {}
+    with pytest.raises(ValueError, match=error):
+        archive.import_topics(_jsonl(_row(message_id="ok", topic_id="t0"), row), "jsonl", topics)
+    assert topics == {}
+
+
+def test_missing_timestamps_get_defaults():
+    topics = {}
+    archive.import_topics(_jsonl(
+        _row(topic_created_at=None, message_id="m1", timestamp="2024-03-01T10:00:00"),
+        _row(topic_created_at=None, message_id="m2", role="assistant", timestamp=None),
+        _row(topic_id="t2", topic_name=None, topic_created_at=None, message_id=None, timestamp=None),
+    ), "jsonl", topics)
+    assert topics["t1"]["created_at"] == "2024-03-01T10:00:00"
+    assert [m["timestamp"] for m in topics["t1"]["messages"]] == ["2024-03-01T10:00:00"] * 2
+    assert topics["t2"]["name"] == "Imported topic"
+    assert topics["t2"]["messages"][0]["id"]
+    for topic in topics.values():
+        datetime.fromisoformat(topic["created_at"])
+        series = ProgressSeries()
+        series.catch_up(topic["messages"])
+
+
+def test_import_appends_to_a_branched_topic():
+    parent = [{"id": "m1", "role": "user", "content": "hello", "timestamp": "2024-01-01T09:01:00"}]
+    topics = {"t1": {"name": "Topic", "created_at": "2024-01-01T09:00:00", "messages": branches.fork(parent, 1)}}
+    counts = archive.import_topics(_jsonl(_row(), _row(message_id="m2", role="assistant", content="hi",
+                                                       timestamp=None)), "jsonl", topics)
+    assert counts == {"topics": 0, "messages": 1}
+    assert [m["id"] for m in topics["t1"]["messages"]] == ["m1", "m2"]
+    assert topics["t1"]["messages"][1]["timestamp"] == "2024-01-01T09:01:00"
+    assert len(parent) == 1
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_columnar_round_trip_reads_back_in_batches(fmt):
+    pytest.importorskip("pyarrow")
+    topics = {f"t{i}": {"name": f"Topic {i}", "created_at": "2024-01-01T09:00:00", "messages": [
+        {"id": f"t{i}-m{j}", "role": ("user", "assistant")[j % 2], "content": f"message {j} é",
+         "timestamp": f"2024-01-01T09:{j:02d}:00"} for j in range(i)
+    ]} for i in range(6)}
+    sink = io.BytesIO()
+    assert archive.export_topics(topics, sink, fmt, batch_size=4) == 16
+
+    batches = list(archive.iter_archive(io.BytesIO(sink.getvalue()), fmt, batch_size=4))
+    assert [len(batch) for batch in batches] == [4, 4, 4, 4]
+    assert list(batches[0][0]) == list(archive.COLUMNS)
+
+    restored = {}
+    counts = archive.import_topics(io.BytesIO(sink.getvalue()), fmt, restored, batch_size=4)
+    assert counts == {"topics": 6, "messages": 15}
+    assert restored == topics
+
+
+def test_check_format():
+    archive.check_format("jsonl")
+    with pytest.raises(ValueError):
+        archive.check_format("csv")
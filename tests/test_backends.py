@@ -0,0 +1,177 @@
+"""Conformance tests every chat backend must pass.
+
+``OpenAIBackend`` runs against a stub server on localhost that speaks the
+chat completions protocol (streamed server-sent events and plain JSON), so
+the suite needs no network access or API key.
+"""
+import contextlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+import pytest
+
+from authentifi.backends import LLMBackend, OfflineBackend, OpenAIBackend, conformance_failures
+
+ANSWER = "Research findings should be checked against the original sources before they are cited."
+MODEL = "gpt-3.5-turbo"
+MESSAGES = [
+    {"role": "system", "content": "You are a concise research assistant."},
+    {"role": "user", "content": "How should research findings be checked?"},
+]
+
+
+class _ChatCompletions(BaseHTTPRequestHandler):
+    """Answers every request with ANSWER, one word per chunk when streaming"""
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        words = ANSWER.split(" ")
+        if body.get("max_tokens"):
+            words = words[:body["max_tokens"]]
+        usage = {"prompt_tokens": 20, "completion_tokens": len(words), "total_tokens": 20 + len(words),
+                 "prompt_tokens_details": {"cached_tokens": 8}}
+        if not body.get("stream"):
+            self._send_json({
+                "id": "stub", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        if body["model"] == "stall":
+            # Headers are out but the first chunk never comes, like a model still thinking
+            self.wfile.flush()
+            self.server.released.wait(10)
+            return
+        for i, word in enumerate(words):
+            self._send_event({"choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word},
+                                           "finish_reason": None}]}, body["model"])
+        if body.get("stream_options", {}).get("include_usage"):
+            self._send_event({"choices": [], "usage": usage}, body["model"])
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def _send_json(self, payload: Dict) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_event(self, payload: Dict, model: str) -> None:
+        payload = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": model, **payload}
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+@pytest.fixture(scope="module")
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatCompletions)
+    server.requests: List[Dict] = []
+    server.released = threading.Event()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.released.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["offline", "openai"])
+def backend(request) -> LLMBackend:
+    if request.param == "offline":
+        return OfflineBackend()
+    server = request.getfixturevalue("stub_server")
+    return OpenAIBackend("stub", base_url=f"http://127.0.0.1:{server.server_port}/v1")
+
+
+def test_conformance(backend):
+    assert conformance_failures(backend, MODEL) == []
+
+
+def test_stream_reports_usage_once(backend):
+    usage = []
+    chunks = list(backend.stream_chat(MESSAGES, MODEL, on_usage=usage.append))
+    assert chunks and all(isinstance(chunk, str) for chunk in chunks)
+    assert len(usage) == 1
+    assert set(usage[0]) == {"prompt_tokens", "completion_tokens", "cached_tokens"}
+    assert all(isinstance(value, int) and value >= 0 for value in usage[0].values())
+    assert usage[0]["completion_tokens"] > 0
+
+
+def test_complete_reports_usage_once(backend):
+    usage = []
+    answer = backend.complete(MESSAGES, MODEL, on_usage=usage.append)
+    assert isinstance(answer, str) and answer.strip()
+    assert len(usage) == 1
+    assert usage[0]["completion_tokens"] > 0
+
+
+def test_max_tokens_limits_the_answer(backend):
+    usage = []
+    answer = backend.complete(MESSAGES, MODEL, max_tokens=3, on_usage=usage.append)
+    assert answer.strip()
+    assert usage[0]["completion_tokens"] <= 3
+
+
+def test_stream_matches_complete(backend):
+    assert "".join(backend.stream_chat(MESSAGES, MODEL)) == backend.complete(MESSAGES, MODEL)
+
+
+def test_early_close_leaves_backend_usable(backend):
+    stream = backend.stream_chat(MESSAGES, MODEL)
+    assert next(stream)
+    stream.close()
+    assert "".join(backend.stream_chat(MESSAGES, MODEL)).strip()
+
+
+def test_abort_unblocks_a_stream_waiting_for_its_first_chunk(backend, stub_server):
+    aborts = []
+    model = "stall" if isinstance(backend, OpenAIBackend) else MODEL
+    if isinstance(backend, OfflineBackend):
+        backend.delay = 10
+    stream = backend.stream_chat(MESSAGES, model, on_open=aborts.append)
+    threading.Timer(0.2, lambda: aborts[0]()).start()
+    started = time.monotonic()
+    with contextlib.suppress(Exception):
+        assert list(stream) == []
+    assert time.monotonic() - started < 5
+
+
+def test_openai_backend_sends_override_model_and_usage_option(stub_server):
+    backend = OpenAIBackend("stub", base_url=f"http://127.0.0.1:{stub_server.server_port}/v1",
+                            model_override="local-model")
+    list(backend.stream_chat(MESSAGES, MODEL))
+    request = stub_server.requests[-1]
+    assert request["model"] == "local-model"
+    assert request["stream_options"] == {"include_usage": True}
+    assert request["messages"] == MESSAGES
+
+
+def test_openai_backend_without_usage_option(stub_server):
+    backend = OpenAIBackend("stub", base_url=f"http://127.0.0.1:{stub_server.server_port}/v1",
+                            include_usage=False)
+    usage = []
+    assert "".join(backend.stream_chat(MESSAGES, MODEL, on_usage=usage.append)) == ANSWER
+    assert usage == []
+    assert "stream_options" not in stub_server.requests[-1]
+
+
+def test_backend_must_implement_stream_chat():
+    class Incomplete(LLMBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    with pytest.raises(TypeError):
+        LLMBackend()
@@ -0,0 +1,188 @@
+import numpy as np
+import pytest
+
+from authentifi import branches
+from authentifi.branches import Branch
+from authentifi.findings import FindingsExtractor
+from authentifi.memory import SemanticMemory
+from authentifi.overlap import OverlapIndex, OverlapTracker
+from authentifi.scoring import ScoreTracker
+from authentifi.sources import SourceIndex
+
+FINDINGS = [
+    "Evidence shows a significant increase in attendance after the mentoring program.",
+    "The study found that homework load has no effect on sleep quality in teenagers.",
+    "Results indicate smaller classes improved reading scores by 12 percent overall.",
+    "Researchers found peer tutoring reduced dropout rates among rural students significantly.",
+]
+REFERENCE = ("Retrieval practice produces durable learning gains for students across many grades "
+             "and subjects when feedback is given promptly after each quiz session.")
+
+
+def _messages(count, start=0):
+    return [{"id": f"m{i}", "role": ("user", "assistant")[i % 2], "content": f"message {i}"}
+            for i in range(start, start + count)]
+
+
+def _answers(contents, start=0):
+    return [{"id": f"a{i}", "role": "assistant", "content": content} for i, content in enumerate(contents, start)]
+
+
+def test_branch_reads_the_parent_prefix_then_its_own_messages():
+    parent = _messages(5)
+    branch = branches.fork(parent, 3)
+    branch.append({"id": "b0", "role": "user", "content": "branch"})
+    assert len(branch) == 4
+    assert [m["id"] for m in branch] == ["m0", "m1", "m2", "b0"]
+    assert branch[-1]["id"] == "b0" and branch[2]["id"] == "m2"
+    assert [m["id"] for m in branch[1:4]] == ["m1", "m2", "b0"]
+    with pytest.raises(IndexError):
+        branch[4]
+
+
+def test_parent_appends_after_the_fork_stay_out_of_the_branch():
+    parent = _messages(3)
+    branch = branches.fork(parent, 2)
+    parent.extend(_messages(2, start=3))
+    assert [m["id"] for m in branch] == ["m0", "m1"]
+    assert len(branch) == 2
+    with pytest.raises(IndexError):
+        branch[2]
+
+
+def test_nested_forks_share_prefixes():
+    root = _messages(4)
+    first = branches.fork(root, 4)
+    first.append({"id": "f0"})
+    first.append({"id": "f1"})
+    second = branches.fork(first, 5)
+    second.append({"id": "s0"})
+    first.append({"id": "f2"})
+    root.append({"id": "r4"})
+    assert second.depth == 2 and second.parent is first
+    assert [m["id"] for m in second] == ["m0", "m1", "m2", "m3", "f0", "s0"]
+    assert [second[i]["id"] for i in range(len(second))] == ["m0", "m1", "m2", "m3", "f0", "s0"]
+    assert [m["id"] for m in first] == ["m0", "m1", "m2", "m3", "f0", "f1", "f2"]
+
+
+def test_fork_inside_the_shared_prefix_attaches_to_the_ancestor():
+    root = _messages(4)
+    child = branches.fork(root, 3)
+    child.append({"id": "c0"})
+    grandchild = branches.fork(child, 2)
+    assert grandchild.parent is root and grandchild.depth == 1
+    assert [m["id"] for m in grandchild] == ["m0", "m1"]
+    with pytest.raises(IndexError):
+        branches.fork(root, 5)
+    with pytest.raises(IndexError):
+        Branch(root, -1)
+
+
+def test_findings_fork_keeps_only_findings_before_the_fork():
+    parent = FindingsExtractor()
+    messages = _answers(FINDINGS[:2])
+    parent.process(messages)
+    branch_messages = branches.fork(messages, 1)
+    branch = parent.fork(1)
+    messages.append(_answers([FINDINGS[2]], start=2)[0])
+    parent.process(messages)
+    assert [f.message_id for f in branch.findings] == ["a0"]
+    branch_messages.append(_answers([FINDINGS[3]], start=5)[0])
+    branch.process(branch_messages)
+    assert [f.message_id for f in branch.findings] == ["a0", "a5"]
+    assert [f.message_id for f in parent.findings] == ["a0", "a1", "a2"]
+
+    nested = branch.fork(2)
+    assert [f.message_id for f in nested.findings] == ["a0", "a5"]
+    assert nested.cursor == 2
+
+
+def test_sources_fork_counts_references_before_the_fork():
+    parent = SourceIndex()
+    messages = _answers(["(Smith, 2020) found gains.", "(Smith, 2020) and (Jones, 2019) agree."])
+    parent.catch_up(messages)
+    branch = parent.fork(1)
+    messages.append(_answers(["(Lee, 2018) disagrees."], start=2)[0])
+    parent.catch_up(messages)
+    assert set(branch.sources) == {"cite:smith|2020"}
+    assert branch.sources["cite:smith|2020"].positions == [0]
+    assert branch.total_references == 1 and branch.cursor == 1
+    assert parent.total_references == 4
+
+    nested = branch.fork(0)
+    assert nested.sources == {} and nested.total_references == 0
+
+
+def test_score_fork_copies_scores_before_the_fork():
+    parent = ScoreTracker()
+    parent.record(0, np.array([0.2, 0.8]), 10)
+    parent.record(2, np.array([0.6, 0.4]), 30)
+    parent.cursor = 3
+    branch = parent.fork(2)
+    assert branch.cursor == 2
+    assert branch.mean("bias") == pytest.approx(0.2)
+    parent.record(4, np.array([1.0, 1.0]), 10)
+    assert branch.mean("depth") == pytest.approx(0.8)
+
+    nested = branch.fork(1)
+    branch.record(1, np.array([0.4, 0.4]), 10)
+    assert nested.mean("bias") == pytest.approx(0.2)
+    assert branch.mean("bias") == pytest.approx(0.3)
+
+
+def test_overlap_fork_keeps_totals_before_the_fork(tmp_path):
+    index = OverlapIndex(tmp_path / "overlap.db")
+    index.add_chunks("u", [{"id": "c1", "content": REFERENCE}])
+    parent = OverlapTracker()
+    original = "Cats sleep on warm windowsills most afternoons while the dogs chase squirrels outside the house."
+    messages = _answers([REFERENCE, original])
+    parent.process(messages, index, "u")
+    branch = parent.fork(1)
+    assert branch.cursor == 1 and len(branch.totals) == 1
+    assert branch.overlap > 0.9 and parent.overlap < branch.overlap
+
+    messages.append(_answers([REFERENCE], start=2)[0])
+    parent.process(messages, index, "u")
+    assert len(branch.totals) == 1
+
+    branch_messages = branches.fork(messages, 1)
+    branch_messages.append(_answers([original], start=5)[0])
+    branch.process(branch_messages, index, "u")
+    assert branch.overlap == pytest.approx(parent.fork(2).overlap)
+    assert branch.fork(1).totals == branch.totals[:1]
+
+
+def test_lineage_excludes_ancestor_messages_written_after_the_fork():
+    root = {"name": "Root", "messages": _messages(4)}
+    child = {"name": "Child", "messages": branches.fork(root["messages"], 3), "parent_id": "root", "forked_at": 3}
+    child["messages"].append({"id": "c0", "role": "user", "content": "child"})
+    grandchild = {"name": "Grandchild", "messages": branches.fork(child["messages"], 4),
+                  "parent_id": "child", "forked_at": 4}
+    child["messages"].append({"id": "c1", "role": "assistant", "content": "later"})
+    root["messages"].append({"id": "m4", "role": "assistant", "content": "later"})
+    topics = {"root": root, "child": child, "grandchild": grandchild}
+
+    assert branches.lineage(topics, "root") == (["root"], set())
+    assert branches.lineage(topics, "child") == (["child", "root"], {"m3", "m4"})
+    assert branches.lineage(topics, "grandchild") == (["grandchild", "child", "root"], {"c1", "m3", "m4"})
+
+
+def test_recall_in_a_branch_ignores_what_the_parent_said_after_the_fork(tmp_path):
+    memory = SemanticMemory(tmp_path / "memory.db", sync_interval=60)
+    parent = {"name": "Parent", "messages": [
+        {"id": "p0", "role": "user", "content": "Spaced practice improves long term retention of vocabulary."},
+        {"id": "p1", "role": "assistant", "content": "Interleaving subjects helps students compare problem types."},
+    ]}
+    branch = {"name": "Branch", "messages": branches.fork(parent["messages"], 1), "parent_id": "parent",
+              "forked_at": 1}
+    parent["messages"].append({"id": "p2", "role": "user",
+                               "content": "Spaced practice schedules for vocabulary retention in adults."})
+    branch["messages"].append({"id": "b1", "role": "user", "content": "What about spaced practice and retention?"})
+    memory.add_many("u", "parent", parent["messages"])
+    memory.add_many("u", "branch", branch["messages"][1:])
+
+    scope, later = branches.lineage({"parent": parent, "branch": branch}, "branch")
+    hits = memory.search("spaced practice vocabulary retention", "u", scope, later | {"b1"})
+    assert [hit.message_id for hit in hits] == ["p0"]
+    everything = memory.search("spaced practice vocabulary retention", "u", scope, {"b1"})
+    assert "p2" in [hit.message_id for hit in everything]
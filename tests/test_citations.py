@@ -0,0 +1,87 @@
+import io
+import json
+import os
+import sqlite3
+
+import pytest
+
+from authentifi.citations import BloomFilter, CitationVerifier, import_jsonl, parse_work, verify_job
+from authentifi.sources import SourceIndex
+
+CROSSREF = {"DOI": "10.1000/ABC.1", "title": ["Spaced Practice and Long-Term Retention."],
+            "issued": {"date-parts": [[2020, 5]]}, "author": [{"given": "Ann", "family": "Smith"}]}
+OPENALEX = {"doi": "https://doi.org/10.2000/xyz", "display_name": "Peer tutoring in rural schools",
+            "publication_year": 2019, "authorships": [{"author": {"display_name": "Li Jones"}}]}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "bibliography.db"
+    dump = io.StringIO("".join(json.dumps(record) + "\n" for record in [CROSSREF, OPENALEX, {"title": "no doi"}]))
+    assert import_jsonl(path, dump) == 2
+    return path
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives(tmp_path):
+    bloom = BloomFilter(2000, error_rate=0.01)
+    for i in range(2000):
+        bloom.add(f"doi:10.1000/{i}")
+    assert all(f"doi:10.1000/{i}" in bloom for i in range(2000))
+    false_positives = sum(f"doi:10.9999/{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+    path = tmp_path / "filter.npz"
+    bloom.save(path, "stamp-1")
+    loaded = BloomFilter.load(path, "stamp-1")
+    assert loaded is not None and "doi:10.1000/7" in loaded
+    assert BloomFilter.load(path, "stamp-2") is None
+    assert BloomFilter.load(tmp_path / "missing.npz", "stamp-1") is None
+
+
+def test_parse_work_reads_crossref_and_openalex():
+    assert parse_work(CROSSREF) == ("10.1000/abc.1", "Spaced Practice and Long-Term Retention.", 2020, "smith")
+    assert parse_work(OPENALEX) == ("10.2000/xyz", "Peer tutoring in rural schools", 2019, "jones")
+    assert parse_work({"title": "no doi"}) is None
+
+
+def test_verify_checks_dois_citations_and_titles(db_path):
+    verifier = CitationVerifier(db_path)
+    keys = ["doi:10.1000/abc.1", "doi:10.1000/missing", "cite:smith|2020", "cite:smith|2021",
+            "cite:jones|2019", "title:spaced practice and long-term retention",
+            "title:peer tutoring in rural schools", "title:a study that does not exist"]
+    assert verifier.verify(keys) == {
+        "doi:10.1000/abc.1": True, "doi:10.1000/missing": False,
+        "cite:smith|2020": True, "cite:smith|2021": False, "cite:jones|2019": True,
+        "title:spaced practice and long-term retention": True,
+        "title:peer tutoring in rural schools": True, "title:a study that does not exist": False,
+    }
+    assert verifier.verify([]) == {}
+
+
+def test_bloom_filter_is_rebuilt_when_the_database_changes(db_path):
+    verifier = CitationVerifier(db_path)
+    assert verifier.verify(["doi:10.3000/new"]) == {"doi:10.3000/new": False}
+    assert verifier.bloom_path.exists()
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO work VALUES ('10.3000/new', 'New work', 2023, 'lee')")
+    stat = os.stat(db_path)
+    os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert verifier.verify(["doi:10.3000/new"]) == {"doi:10.3000/new": True}
+    assert verify_job({"db": str(db_path), "keys": ["cite:lee|2023"]}) == {"cite:lee|2023": True}
+
+
+def test_missing_database_verifies_nothing(tmp_path):
+    verifier = CitationVerifier(tmp_path / "missing.db")
+    assert not verifier.available
+    assert verifier.verify(["doi:10.1000/abc.1"]) == {"doi:10.1000/abc.1": False}
+
+
+def test_answers_are_verified_end_to_end(db_path):
+    index = SourceIndex()
+    index.catch_up([{"id": "a1", "role": "assistant", "content":
+                     'Smith (2020). "Spaced practice and long-term retention." See https://example.com and '
+                     "(Brown, 2018)."}])
+    assert index.unique_count == 4 and index.checkable_count == 3
+    index.mark_verified(CitationVerifier(db_path).verify(index.unverified()))
+    assert index.verified_count == 2 and index.checked_count == 3
+    assert index.unverified() == []
@@ -0,0 +1,116 @@
+import gc
+
+from authentifi.collab import CollaborationHub, InProcessBroker, LiveView, Subscription
+
+
+def _apply(events, session_id):
+    live = LiveView(session_id)
+    live.apply(events)
+    return live.messages, live.streams
+
+
+def test_publish_fans_out_to_every_subscriber_of_the_channel():
+    broker = InProcessBroker()
+    first, second = broker.subscribe("topic"), broker.subscribe("topic")
+    other = broker.subscribe("other")
+    broker.publish("topic", {"n": 1})
+    broker.publish("topic", {"n": 2})
+    assert first.drain() == [{"n": 1}, {"n": 2}]
+    assert second.drain() == [{"n": 1}, {"n": 2}]
+    assert other.drain() == []
+    assert first.drain() == []
+
+
+def test_unsubscribed_queue_gets_nothing():
+    broker = InProcessBroker()
+    kept, dropped = broker.subscribe("topic"), broker.subscribe("topic")
+    broker.unsubscribe(dropped)
+    broker.unsubscribe(dropped)
+    broker.publish("topic", {"n": 1})
+    assert kept.drain() == [{"n": 1}]
+    assert dropped.drain() == []
+    assert broker.subscriber_count("topic") == 1
+
+
+def test_abandoned_subscription_is_released():
+    broker = InProcessBroker()
+    broker.subscribe("topic")
+    gc.collect()
+    assert broker.subscriber_count("topic") == 0
+    broker.publish("topic", {"n": 1})
+
+
+def test_full_queue_drops_the_oldest_events():
+    subscription = Subscription("topic", maxsize=3)
+    for n in range(5):
+        subscription.deliver({"n": n})
+    assert [event["n"] for event in subscription.drain()] == [2, 3, 4]
+
+
+def test_bounded_queue_overflow_through_the_broker():
+    broker = InProcessBroker()
+    subscription = broker.subscribe("topic")
+    size = subscription.events.maxsize
+    for n in range(size + 10):
+        broker.publish("topic", {"n": n})
+    events = subscription.drain()
+    assert len(events) == size
+    assert events[0]["n"] == 10 and events[-1]["n"] == size + 9
+
+
+def test_viewers_skip_their_own_events():
+    hub = CollaborationHub()
+    writer, reader = hub.subscribe("topic"), hub.subscribe("topic")
+    hub.message_added("topic", {"id": "m1", "role": "user", "content": "hi"}, origin="writer")
+    hub.message_added("topic", {"id": "m2", "role": "user", "content": "hello"}, origin="reader")
+    assert _apply(writer.drain(), "writer")[0] == [{"id": "m2", "role": "user", "content": "hello"}]
+    assert _apply(reader.drain(), "reader")[0] == [{"id": "m1", "role": "user", "content": "hi"}]
+
+
+def test_stream_deltas_arrive_in_order_before_the_end():
+    hub = CollaborationHub()
+    viewer = hub.subscribe("topic")
+    for text in ["Research ", "needs ", "evidence."]:
+        hub.stream_delta("topic", "a1", text, origin="writer")
+    events = viewer.drain()
+    assert [event["type"] for event in events] == ["delta"] * 3
+    assert _apply(events, "viewer")[1] == {"a1": "Research needs evidence."}
+
+    hub.stream_end("topic", "a1", origin="writer")
+    hub.message_added("topic", {"id": "a1", "role": "assistant", "content": "Research needs evidence."},
+                      origin="writer")
+    events += viewer.drain()
+    assert [event["type"] for event in events] == ["delta", "delta", "delta", "end", "message"]
+    messages, streams = _apply(events, "viewer")
+    assert streams == {}
+    assert [message["id"] for message in messages] == ["a1"]
+
+
+def test_shared_topic_is_the_same_dict_for_every_session():
+    hub = CollaborationHub()
+    topic = {"name": "Shared", "messages": []}
+    hub.share("t1", topic)
+    hub.share("t1", {"name": "Other", "messages": []})
+    joined = hub.join("t1")
+    assert joined is topic and topic["shared"]
+    joined["messages"].append({"id": "m1"})
+    assert topic["messages"] == [{"id": "m1"}]
+    assert hub.join("missing") is None
+
+
+def test_redraw_drops_shown_messages_but_keeps_open_streams():
+    hub = CollaborationHub()
+    viewer = hub.subscribe("topic")
+    live = LiveView("viewer")
+    hub.message_added("topic", {"id": "m1", "role": "user", "content": "hi"}, origin="writer")
+    hub.stream_delta("topic", "a1", "Partial ", origin="writer")
+    live.apply(viewer.drain())
+    assert [message["id"] for message in live.messages] == ["m1"]
+
+    hub.stream_delta("topic", "a1", "answer", origin="writer")
+    live.redrawn(viewer.drain())
+    assert live.messages == [] and live.streams == {"a1": "Partial answer"}
+
+    hub.message_added("topic", {"id": "a1", "role": "assistant", "content": "Partial answer"}, origin="writer")
+    live.apply(viewer.drain())
+    assert live.streams == {} and [message["id"] for message in live.messages] == ["a1"]
@@ -0,0 +1,85 @@
+import os
+import socket
+import sqlite3
+import subprocess
+import time
+
+import pytest
+
+from authentifi import documents
+
+
+class _RecordingPool:
+    def __init__(self, *args, **kwargs):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args)
+
+
+@pytest.fixture
+def ingestor(tmp_path, monkeypatch):
+    monkeypatch.setattr(documents, "ProcessPoolExecutor", _RecordingPool)
+    return documents.DocumentIngestor(tmp_path / "documents.db", tmp_path / "uploads",
+                                      tmp_path / "memory.db", tmp_path / "overlap.db")
+
+
+def _insert(db_path, doc_hash, status, owner=None, lease_until=None):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            """INSERT INTO document (doc_hash, topic_id, user_id, name, kind, status, updated, owner, lease_until)
+               VALUES (?, 't1', 'u', ?, 'txt', ?, ?, ?, ?)""",
+            (doc_hash, f"{doc_hash}.txt", status, time.time(), owner, lease_until)
+        )
+
+
+def _resumed(ingestor):
+    ingestor.pool = _RecordingPool()
+    ingestor.resume()
+    return sorted(args[4] for args in ingestor.pool.submitted)
+
+
+def test_resume_skips_documents_held_by_a_live_worker(ingestor):
+    host = socket.gethostname()
+    later = time.time() + 60
+    _insert(ingestor.db_path, "queued", "queued")
+    _insert(ingestor.db_path, "live", "processing", f"{host}:{os.getpid()}:a", later)
+    _insert(ingestor.db_path, "remote", "processing", "elsewhere:1:b", later)
+    _insert(ingestor.db_path, "expired", "processing", "elsewhere:1:c", time.time() - 1)
+    _insert(ingestor.db_path, "legacy", "processing")
+    _insert(ingestor.db_path, "done", "done")
+    assert _resumed(ingestor) == ["expired", "legacy", "queued"]
+
+
+def test_resume_takes_over_from_an_exited_local_owner(ingestor):
+    process = subprocess.Popen(["true"])
+    process.wait()
+    owner = f"{socket.gethostname()}:{process.pid}:a"
+    _insert(ingestor.db_path, "orphan", "processing", owner, time.time() + 60)
+    assert _resumed(ingestor) == ["orphan"]
+    assert documents._claim(ingestor.db_path, "orphan", "t1", "new:1:x")
+
+
+def test_claim_is_exclusive_until_the_lease_runs_out(ingestor, monkeypatch):
+    _insert(ingestor.db_path, "doc", "queued")
+    assert documents._claim(ingestor.db_path, "doc", "t1", "first:1:a")
+    assert not documents._claim(ingestor.db_path, "doc", "t1", "second:2:b")
+    later = time.time() + documents.LEASE + 1
+    monkeypatch.setattr(documents.time, "time", lambda: later)
+    assert documents._claim(ingestor.db_path, "doc", "t1", "second:2:b")
+    assert not documents._update(ingestor.db_path, "doc", "t1", "first:1:a", progress=0.5)
+
+
+def test_ingest_indexes_a_document_once(ingestor):
+    path = ingestor.upload_dir / "notes.txt"
+    path.write_text("Spaced practice improves retention.\n\nRetrieval practice helps too.\n")
+    doc_hash = ingestor.submit("u", "t1", "notes.txt", path.read_bytes())
+    args = ingestor.pool.submitted[-1]
+    documents.ingest(*args)
+    documents.ingest(*args)
+    [row] = ingestor.documents("t1")
+    assert row["status"] == "done" and row["chunks_indexed"] == 1
+    with sqlite3.connect(ingestor.db_path) as conn:
+        assert conn.execute("SELECT owner IS NOT NULL, lease_until FROM document WHERE doc_hash = ?",
+                            (doc_hash,)).fetchone() == (1, None)
+
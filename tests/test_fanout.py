@@ -0,0 +1,96 @@
+import threading
+import time
+
+from authentifi.fanout import FanOutExecutor, FanOutResult, FanOutTarget, merge_answers
+
+MESSAGES = [{"role": "user", "content": "How does feedback affect learning?"}]
+
+
+class _Backend:
+    """stream_fn answering per model: (delay before the first chunk, chunks), or raising"""
+
+    def __init__(self, plans):
+        self.plans = plans
+        self.aborted = set()
+        self.finished = set()
+
+    def __call__(self, messages, model, on_usage=None, on_open=None):
+        aborted = threading.Event()
+
+        def abort():
+            self.aborted.add(model)
+            aborted.set()
+
+        on_open(abort)
+        return self._stream(model, aborted, on_usage)
+
+    def _stream(self, model, aborted, on_usage):
+        delay, chunks = self.plans[model]
+        # A blocked read only ends when the request is aborted
+        if aborted.wait(delay):
+            raise ConnectionError("aborted")
+        if isinstance(chunks, Exception):
+            raise chunks
+        yield from chunks
+        on_usage({"prompt_tokens": 10, "completion_tokens": len(chunks), "cached_tokens": 4})
+        self.finished.add(model)
+
+
+def _run(backend, models, mode, timeout=5.0):
+    result = FanOutResult()
+    executor = FanOutExecutor(backend, timeout=timeout)
+    events = list(executor.run([FanOutTarget(model, model) for model in models], MESSAGES, mode, result))
+    return result, [(event.label, event.kind) for event in events if event.kind != "chunk"]
+
+
+def test_race_takes_the_first_answer_and_aborts_the_rest():
+    backend = _Backend({"fast": (0.0, ["Quick ", "answer."]), "slow": (30.0, ["Late."])})
+    started = time.monotonic()
+    result, events = _run(backend, ["fast", "slow"], "race")
+    assert time.monotonic() - started < 5
+    assert events == [("fast", "done"), ("slow", "cancelled")]
+    assert result.winner == "fast" and result.merged == "Quick answer."
+    assert result.status == {"fast": "done", "slow": "cancelled"}
+    assert result.usage == {"fast": {"prompt_tokens": 10, "completion_tokens": 2, "cached_tokens": 4}}
+    assert "slow" in backend.aborted and "slow" not in backend.finished
+
+
+def test_race_skips_failed_and_empty_answers():
+    backend = _Backend({"broken": (0.0, RuntimeError("boom")), "empty": (0.0, [" "]), "good": (0.2, ["Fine."])})
+    result, events = _run(backend, ["broken", "empty", "good"], "race")
+    assert ("broken", "error") in events
+    assert result.winner == "good" and result.merged == "Fine."
+    assert result.status["broken"] == "error"
+
+
+def test_ensemble_merges_every_answer():
+    backend = _Backend({
+        "a": (0.0, ["Feedback improves learning outcomes in most classrooms. "]),
+        "b": (0.1, ["Feedback improves learning outcomes in most classrooms. ",
+                    "Timely peer review adds further gains for older students."]),
+    })
+    result, events = _run(backend, ["a", "b"], "ensemble")
+    assert sorted(events) == [("a", "done"), ("b", "done")]
+    assert result.winner is None
+    assert result.merged == merge_answers(result.answers)
+    assert result.merged.startswith(result.answers["b"])
+    assert set(result.usage) == {"a", "b"}
+
+
+def test_ensemble_adds_only_new_sentences():
+    merged = merge_answers({
+        "short": "Class size matters less than teacher feedback quality overall.",
+        "long": "Feedback quality is the strongest predictor. Spaced practice helps retention a great deal.",
+    })
+    assert merged.startswith("Feedback quality is the strongest predictor.")
+    assert "*(short)*" in merged
+
+
+def test_timeout_aborts_a_target_blocked_before_its_first_chunk():
+    backend = _Backend({"stuck": (30.0, ["Never."]), "ok": (0.0, ["Done."])})
+    started = time.monotonic()
+    result, events = _run(backend, ["stuck", "ok"], "ensemble", timeout=0.3)
+    assert time.monotonic() - started < 5
+    assert ("stuck", "timeout") in events
+    assert result.answers == {"ok": "Done."}
+    assert backend.aborted == {"stuck"}
@@ -0,0 +1,81 @@
+from authentifi.findings import FindingsExtractor, SimilarityIndex, score_sentence, shingles
+
+
+def _answer(message_id, content):
+    return {"id": message_id, "role": "assistant", "content": content}
+
+
+def test_cue_phrases_and_numbers_raise_the_score():
+    plain = "The classroom had chairs arranged in rows today."
+    cued = "The study found a significant increase in reading scores overall."
+    assert score_sentence(plain, listed=False) == 0.0
+    assert score_sentence(cued, listed=False) >= 3.0
+    assert score_sentence(cued + " By 20%.", listed=False) == score_sentence(cued, listed=False) + 0.5
+    assert score_sentence(cued, listed=True) == score_sentence(cued, listed=False) + 1.0
+
+
+def test_too_short_or_too_long_sentences_are_not_findings():
+    assert score_sentence("Results were significant.", listed=True) == 0.0
+    assert score_sentence("Results show " + "word " * 60, listed=False) == 0.0
+
+
+def test_abbreviations_and_decimals_do_not_split_sentences():
+    extractor = FindingsExtractor()
+    extractor.process([_answer("a1", "Smith et al. found that retention rose by 2.5 points, e.g. in math classes. "
+                                     "Unrelated filler sentence here.")])
+    assert [finding.text for finding in extractor.findings] == [
+        "Smith et al. found that retention rose by 2.5 points, e.g. in math classes."
+    ]
+
+
+def test_markdown_emphasis_and_list_markers_are_stripped():
+    extractor = FindingsExtractor()
+    extractor.process([_answer("a1", "1. **Feedback** shows a significant increase in engagement across schools.")])
+    [finding] = extractor.findings
+    assert finding.text == "Feedback shows a significant increase in engagement across schools."
+    assert finding.message_id == "a1"
+
+
+def test_near_duplicate_findings_are_kept_once():
+    extractor = FindingsExtractor()
+    sentence = "The study found a significant increase in reading scores for rural students."
+    extractor.process([_answer("a1", sentence)])
+    extractor.process([_answer("a1", sentence), _answer("a2", sentence.replace("rural", "all rural"))])
+    assert len(extractor.findings) == 1
+
+
+def test_only_new_assistant_messages_are_read():
+    extractor = FindingsExtractor()
+    messages = [{"id": "u1", "role": "user", "content": "Results show a significant increase in scores, right?"}]
+    assert extractor.process(messages) == 0
+    messages.append(_answer("a1", "Evidence shows a significant decrease in absences after the program."))
+    assert extractor.process(messages) == 1
+    assert extractor.process(messages) == 0
+    assert extractor.cursor == 2
+
+
+def test_similarity_index_finds_entries_above_the_threshold():
+    index = SimilarityIndex(threshold=0.6)
+    first = index.add(shingles("peer tutoring improves reading fluency in rural schools"))
+    assert index.find_similar(shingles("peer tutoring improves reading fluency in rural schools")) == first
+    assert index.find_similar(shingles("homework load has no effect on sleep quality")) == -1
+
+
+def test_similarity_index_fork_reads_only_the_base_prefix():
+    base = SimilarityIndex()
+    kept = shingles("peer tutoring improves reading fluency in rural schools")
+    later = shingles("homework load has no effect on sleep quality at all")
+    base.add(kept)
+    fork = base.fork(1)
+    base.add(later)
+    assert fork.find_similar(kept) == 0
+    assert fork.find_similar(later) == -1
+
+    own = fork.add(shingles("class size matters less than teacher feedback quality"))
+    assert own == 1 and len(fork) == 2
+    assert base.find_similar(shingles("class size matters less than teacher feedback quality")) == -1
+
+    nested = fork.fork(2)
+    assert nested.find_similar(kept) == 0
+    assert nested.find_similar(shingles("class size matters less than teacher feedback quality")) == 1
+    assert nested.find_similar(later) == -1
@@ -0,0 +1,203 @@
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from authentifi.jobs import ENRICHMENT, INTERACTIVE, JobQueue, alive
+
+
+def _noop(payload, context):
+    return None
+
+
+def _run_next(queue):
+    job = queue._claim()
+    assert job is not None
+    queue._run(*job)
+    return job[0]
+
+
+def _row(db, job_id, *columns):
+    with sqlite3.connect(db) as conn:
+        return conn.execute(f"SELECT {', '.join(columns)} FROM job WHERE id = ?", (job_id,)).fetchone()
+
+
+def _set(db, job_id, **values):
+    with sqlite3.connect(db) as conn:
+        conn.execute(f"UPDATE job SET {', '.join(f'{column} = ?' for column in values)} WHERE id = ?",
+                     (*values.values(), job_id))
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+@pytest.fixture
+def db(tmp_path):
+    return tmp_path / "jobs.db"
+
+
+def test_alive():
+    assert alive(_dead_pid()) is False
+    assert alive(os.getpid()) is True
+
+
+def test_pending_jobs_are_deduplicated_at_the_most_urgent_priority(db):
+    queue = JobQueue(db, {"index": _noop}, workers=0)
+    first = queue.enqueue("index", {"topic": "t"}, priority=ENRICHMENT)
+    assert queue.enqueue("index", {"topic": "t"}, priority=INTERACTIVE) == first
+    assert queue.enqueue("index", {"topic": "u"}) != first
+    assert _row(db, first, "priority") == (INTERACTIVE,)
+    _run_next(queue)
+    assert queue.get(first)["status"] == "done"
+    # Only queued jobs are deduplicated, so the same work can be queued again once it has run
+    assert queue.enqueue("index", {"topic": "t"}) != first
+
+
+def test_concurrent_claims_never_hand_out_a_job_twice(db):
+    queues = [JobQueue(db, {"index": _noop}, workers=0) for _ in range(2)]
+    ids = {queues[0].enqueue("index", {"n": n}) for n in range(40)}
+    claimed = []
+
+    def claim(queue):
+        while True:
+            job = queue._claim()
+            if job is None:
+                return
+            claimed.append(job[0])
+
+    threads = [threading.Thread(target=claim, args=(queue,)) for queue in queues for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(ids)
+
+
+def test_jobs_with_the_same_key_never_overlap(db):
+    queue = JobQueue(db, {"index": _noop}, workers=0)
+    running = queue.enqueue("index", key="t")
+    assert queue._claim()[0] == running
+    waiting = queue.enqueue("index", key="t")
+    other = queue.enqueue("index", key="u")
+    assert queue._claim()[0] == other
+    assert queue._claim() is None
+    queue._finish(running, "done")
+    assert queue._claim()[0] == waiting
+
+
+def test_failures_are_retried_with_exponential_backoff(db):
+    calls = []
+
+    def flaky(payload, context):
+        calls.append(payload)
+        raise ValueError("boom")
+
+    queue = JobQueue(db, {"flaky": flaky}, workers=0, backoff=10.0)
+    job_id = queue.enqueue("flaky", {"n": 1}, max_attempts=3)
+    for attempt, delay in [(1, 10.0), (2, 20.0)]:
+        before = time.time()
+        _run_next(queue)
+        assert queue.get(job_id) == {"status": "queued", "attempts": attempt, "result": None,
+                                     "error": "ValueError: boom"}
+        (not_before,) = _row(db, job_id, "not_before")
+        assert before + delay <= not_before <= time.time() + delay
+        assert queue._claim() is None
+        _set(db, job_id, not_before=0)
+    _run_next(queue)
+    assert queue.get(job_id)["status"] == "failed"
+    assert calls == [{"n": 1}] * 3
+
+
+def test_results_are_stored_as_json(db):
+    queue = JobQueue(db, {"count": lambda payload, context: {"total": payload["n"] * 2}}, workers=0)
+    job_id = queue.enqueue("count", {"n": 21})
+    _run_next(queue)
+    assert queue.get(job_id) == {"status": "done", "attempts": 1, "result": {"total": 42}, "error": None}
+
+
+def test_context_jobs_run_only_in_the_process_that_holds_the_context(db):
+    seen = []
+    handlers = {"summarize": lambda payload, context: seen.append(context)}
+    owner = JobQueue(db, handlers, workers=0)
+    other = JobQueue(db, handlers, workers=0)
+    context = object()
+    job_id = owner.enqueue("summarize", key="t", context=context)
+    assert other._claim() is None
+    assert _run_next(owner) == job_id
+    assert seen == [context]
+
+    lost = owner.enqueue("summarize", key="t", context=object())
+    owner._contexts.clear()
+    _run_next(owner)
+    assert owner.get(lost)["status"] == "failed" and owner.get(lost)["error"] == "context lost"
+    assert len(seen) == 1
+
+
+def test_worker_threads_run_queued_jobs(db):
+    ran = threading.Event()
+    queue = JobQueue(db, {"index": lambda payload, context: ran.set()}, workers=2, poll_interval=0.05)
+    job_id = queue.enqueue("index")
+    assert ran.wait(5)
+    deadline = time.monotonic() + 5
+    while queue.get(job_id)["status"] != "done":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_recovery_fails_jobs_of_exited_processes_and_drops_old_ones(db):
+    queue = JobQueue(db, {"summarize": _noop, "index": _noop}, workers=0)
+    dead = queue.enqueue("summarize", key="dead", context=object())
+    live = queue.enqueue("summarize", key="live", context=object())
+    old = queue.enqueue("index", key="old")
+    recent = queue.enqueue("index", key="recent")
+    _set(db, dead, scope=f"{socket.gethostname()}:{_dead_pid()}:abcd1234")
+    _set(db, old, status="done", finished=time.time() - 7200)
+    _set(db, recent, status="done", finished=time.time())
+
+    JobQueue(db, {}, workers=0, retention=3600)
+    assert _row(db, dead, "status", "error") == ("failed", "owner process exited")
+    assert _row(db, live, "status") == ("queued",)
+    assert _row(db, old, "status") is None
+    assert _row(db, recent, "status") == ("done",)
+
+
+def test_jobs_of_dead_workers_are_reclaimed_once_their_lease_runs_out(db):
+    crashed = JobQueue(db, {"index": _noop}, workers=0)
+    job_id = crashed.enqueue("index", key="t")
+    assert crashed._claim()[0] == job_id
+    survivor = JobQueue(db, {"index": _noop}, workers=0)
+    assert survivor._claim() is None
+    _set(db, job_id, lease_until=time.time() - 1)
+    assert _run_next(survivor) == job_id
+    assert survivor.get(job_id) == {"status": "done", "attempts": 2, "result": None, "error": None}
+
+
+def test_running_jobs_keep_their_lease(db):
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow(payload, context):
+        started.set()
+        release.wait(5)
+
+    queue = JobQueue(db, {"summarize": slow}, workers=1, lease=0.3, poll_interval=0.05)
+    running = queue.enqueue("summarize", key="t", context=object())
+    assert started.wait(5)
+    queue.enqueue("summarize", key="t", context=object())
+    sibling = JobQueue(db, {"summarize": slow}, workers=0, lease=0.3)
+    sibling.scope = queue.scope
+    try:
+        # Well past the original lease, neither the job itself nor its sibling is claimable
+        time.sleep(1.0)
+        assert sibling._claim() is None
+        assert _row(db, running, "lease_until")[0] > time.time()
+    finally:
+        release.set()
@@ -0,0 +1,101 @@
+import random
+
+import numpy as np
+import pytest
+
+from authentifi import overlap
+from authentifi.overlap import MinHasher, OverlapIndex, OverlapTracker, band_keys, shingle_hashes
+
+VOCAB = [f"w{i}" for i in range(5000)]
+
+
+def _text(rng, words):
+    return " ".join(rng.choices(VOCAB, k=words))
+
+
+@pytest.fixture
+def index(tmp_path):
+    return OverlapIndex(tmp_path / "overlap.db")
+
+
+def test_shingles_are_distinct_and_in_order():
+    hashes = shingle_hashes("a b c d e f a b c d e")
+    assert len(hashes) == 6
+    assert len(set(hashes.tolist())) == len(hashes)
+    assert shingle_hashes("A B C D E")[0] == shingle_hashes("a b c d e")[0]
+    assert len(shingle_hashes("too short")) == 1 and len(shingle_hashes("")) == 0
+
+
+def test_minhash_agreement_estimates_jaccard():
+    rng = random.Random(1)
+    hasher = MinHasher()
+    words = _text(rng, 400).split()
+    a, b = shingle_hashes(" ".join(words[:300])), shingle_hashes(" ".join(words[100:]))
+    exact = len(np.intersect1d(a, b)) / len(np.union1d(a, b))
+    estimate = float(np.mean(hasher.signature(a) == hasher.signature(b)))
+    assert abs(estimate - exact) < 0.12
+    assert np.array_equal(hasher.signature(a), MinHasher().signature(a))
+    assert hasher.signature(np.zeros(0, dtype=np.uint64)).max() == np.iinfo(np.uint32).max
+
+
+def test_band_keys_match_only_where_bands_agree():
+    hasher = MinHasher()
+    signature = hasher.signature(shingle_hashes(_text(random.Random(2), 50)))
+    keys = band_keys(signature)
+    assert keys.shape == (overlap.BANDS,) and keys.dtype == np.int64
+    changed = signature.copy()
+    changed[0] += 1
+    assert (band_keys(changed) != keys).tolist() == [True] + [False] * (overlap.BANDS - 1)
+    # The same rows in different bands give different keys
+    uniform = np.full(overlap.NUM_PERM, 7, dtype=np.uint32)
+    assert len(set(band_keys(uniform).tolist())) == overlap.BANDS
+
+
+def test_containment_of_copied_partial_and_original_text(index):
+    rng = random.Random(3)
+    docs = [_text(rng, 200) for _ in range(50)]
+    assert index.add_chunks("u", [{"id": str(i), "content": doc} for i, doc in enumerate(docs)]) == 50
+    assert index.add_chunks("u", [{"id": "0", "content": docs[0]}]) == 0
+
+    copied = " ".join(docs[7].split()[:120])
+    half = " ".join(docs[9].split()[:60]) + " " + _text(rng, 60)
+    assert index.containment("u", copied) > 0.85
+    assert 0.3 < index.containment("u", half) < 0.7
+    assert index.containment("u", _text(rng, 120)) < 0.1
+    assert index.containment("v", copied) == 0.0
+    assert index.containment("u", "only a few words") is None
+
+
+def _message(position, role, content):
+    return {"id": f"m{position}", "role": role, "content": content}
+
+
+def test_tracker_scores_assistant_messages_only(index):
+    rng = random.Random(4)
+    reference = _text(rng, 200)
+    index.add_chunks("u", [{"id": "ref", "content": reference}])
+    tracker = OverlapTracker()
+    messages = [_message(0, "user", reference), _message(1, "assistant", _text(rng, 100))]
+    tracker.process(messages, index, "u")
+    assert tracker.positions == [1]
+    assert tracker.overlap < 0.1
+
+    messages.append(_message(2, "assistant", reference))
+    tracker.process(messages, index, "u")
+    assert tracker.positions == [1, 2]
+    assert tracker.overlap == pytest.approx(tracker.totals[-1][0] / 300)
+    assert tracker.overlap > 0.6
+
+
+def test_tracker_waits_for_reference_chunks(index):
+    rng = random.Random(5)
+    reference = _text(rng, 200)
+    tracker = OverlapTracker()
+    messages = [_message(0, "user", "question"), _message(1, "assistant", reference)]
+    tracker.process(messages, index, "u")
+    assert tracker.cursor == 0 and tracker.overlap is None
+
+    index.add_chunks("u", [{"id": "ref", "content": reference}])
+    tracker.process(messages, index, "u")
+    assert tracker.cursor == 2 and tracker.positions == [1]
+    assert tracker.overlap > 0.85
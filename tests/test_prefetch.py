@@ -0,0 +1,76 @@
+from concurrent.futures import wait
+
+from authentifi import prefetch
+from authentifi.backends import OfflineBackend
+from authentifi.prefetch import PrefetchEngine, suggest_followups
+
+CONTEXT = [{"role": "user", "content": "How does spaced practice affect retention? " * 40}]
+
+
+def _message(i):
+    return {"id": f"a{i}", "role": "assistant", "content": f"Answer {i} without any sources."}
+
+
+def _run(engine, topic_id, message):
+    followups = engine.prefetch(topic_id, message, CONTEXT, lambda followup: "model")
+    futures = [engine.cache.get((topic_id, message["id"], followup)) for followup in followups]
+    futures = [future for future in futures if future is not None]
+    wait(futures)
+    return followups, [future.result() for future in futures if future.exception() is None]
+
+
+def test_suggestions_ask_for_sources_when_there_are_none():
+    assert suggest_followups("Plain answer.")[0] == "Give sources for this"
+    assert "Give sources for this" not in suggest_followups("See https://example.com for details.")
+
+
+def test_actual_usage_replaces_the_reservation():
+    engine = PrefetchEngine(OfflineBackend().complete, budget_tokens=5000)
+    followups, answers = _run(engine, "t1", _message(0))
+    assert len(answers) == len(followups) == 2
+    reservation = sum(prefetch.estimate_tokens(m["content"]) for m in CONTEXT) + engine.max_answer_tokens
+    assert 0 < engine.spent_tokens < 2 * reservation
+    answered = len(answers)
+    for turn in range(1, 8):
+        answered += len(_run(engine, "t1", _message(turn))[1])
+        assert engine.spent_tokens <= engine.budget_tokens
+    # Charging reservations alone would have stopped after budget // reservation prefetches
+    assert answered > engine.budget_tokens // reservation + 2
+
+
+def test_reported_usage_is_charged():
+    def complete(messages, model, max_tokens, on_usage):
+        on_usage({"prompt_tokens": 100, "completion_tokens": 20, "cached_tokens": 0})
+        return "answer"
+
+    engine = PrefetchEngine(complete, budget_tokens=100000)
+    _run(engine, "t1", _message(0))
+    assert engine.spent_tokens == 2 * 120
+
+
+def test_failed_prefetch_charges_nothing():
+    def complete(messages, model, max_tokens, on_usage):
+        raise RuntimeError("offline")
+
+    engine = PrefetchEngine(complete, budget_tokens=100000)
+    followups, answers = _run(engine, "t1", _message(0))
+    assert answers == []
+    assert engine.spent_tokens == 0
+    assert engine.take("t1", "a0", followups[0]) is None
+
+
+def test_budget_is_per_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prefetch.time, "monotonic", lambda: now[0])
+
+    def complete(messages, model, max_tokens, on_usage):
+        on_usage({"prompt_tokens": 900, "completion_tokens": 100, "cached_tokens": 0})
+        return "answer"
+
+    engine = PrefetchEngine(complete, budget_tokens=2000, window=60, max_answer_tokens=50)
+    assert len(_run(engine, "t1", _message(0))[1]) == 2
+    assert engine.spent_tokens == 2000
+    assert _run(engine, "t1", _message(1))[1] == []
+    now[0] += 61
+    assert engine.spent_tokens == 0
+    assert len(_run(engine, "t1", _message(2))[1]) == 2
@@ -0,0 +1,66 @@
+import json
+
+from authentifi import prompts
+from authentifi.prompts import PromptCacheStats, assemble, build_prefix, canonical, compaction_boundary
+
+FILTERS = {"years": (2020, 2024), "sources": ["Academic Papers", "Books"], "regions": ["Global"]}
+
+
+def _turns(count):
+    return [{"id": f"m{i}", "role": ("user", "assistant")[i % 2], "content": f"turn {i}", "timestamp": "t"}
+            for i in range(count)]
+
+
+def test_prefix_is_byte_stable_across_filter_order():
+    reordered = {"regions": ["Global"], "sources": ["Books", "Academic Papers"], "years": [2020, 2024]}
+    assert canonical(FILTERS) == canonical(reordered)
+    assert json.dumps(build_prefix("Feedback", FILTERS)) == json.dumps(build_prefix("Feedback", reordered))
+    assert build_prefix("Feedback", FILTERS)[0]["content"].startswith(prompts.SYSTEM_PROMPT)
+
+
+def test_compaction_boundary_moves_in_fixed_steps():
+    step = prompts.COMPACTION_STEP
+    assert compaction_boundary(10, recent=20) == 0
+    assert compaction_boundary(step + 19, recent=20) == 0
+    assert compaction_boundary(step + 20, recent=20) == step
+    assert compaction_boundary(2 * step + 19, recent=20) == step
+    assert compaction_boundary(2 * step + 20, recent=20) == 2 * step
+
+
+def test_assemble_keeps_only_role_and_content_after_the_summary():
+    prefix = build_prefix("Feedback", FILTERS)
+    messages = assemble(prefix, "Earlier findings.", _turns(2))
+    assert messages[0] == prefix[0]
+    assert messages[1]["role"] == "system" and messages[1]["content"].endswith("Earlier findings.")
+    assert messages[2:] == [{"role": "user", "content": "turn 0"}, {"role": "assistant", "content": "turn 1"}]
+
+
+def test_recalled_turns_go_just_before_the_last_turn():
+    prefix = build_prefix("Feedback", FILTERS)
+    messages = assemble(prefix, None, _turns(3), ["an earlier point"])
+    assert [m["content"] for m in messages[1:3]] == ["turn 0", "turn 1"]
+    assert messages[3]["role"] == "system" and "- an earlier point" in messages[3]["content"]
+    assert messages[4]["content"] == "turn 2"
+    assert assemble(prefix, None, [], ["an earlier point"])[-1]["role"] == "system"
+
+
+def test_growing_conversation_only_appends_between_compactions():
+    prefix = build_prefix("Feedback", FILTERS)
+    turns = _turns(prompts.COMPACTION_STEP + 30)
+    previous = None
+    for count in range(prompts.COMPACTION_STEP + 20, prompts.COMPACTION_STEP + 30):
+        boundary = compaction_boundary(count, recent=20)
+        messages = assemble(prefix, "digest", turns[boundary:count])
+        encoded = [json.dumps(m) for m in messages]
+        if previous is not None:
+            assert encoded[:len(previous)] == previous
+        previous = encoded
+
+
+def test_cache_stats_hit_ratio():
+    stats = PromptCacheStats()
+    assert stats.hit_ratio == 0.0
+    stats.record({"prompt_tokens": 100, "completion_tokens": 5, "cached_tokens": 60})
+    stats.record({"prompt_tokens": 100, "completion_tokens": 5})
+    assert (stats.calls, stats.prompt_tokens, stats.cached_tokens) == (2, 200, 60)
+    assert stats.hit_ratio == 0.3
@@ -0,0 +1,49 @@
+import pytest
+
+from authentifi.routing import DEFAULT_ROUTES, ModelRouter, Route, heuristic_classifier
+
+ROUTES = {
+    "cheap": Route("cheap", "small-model", 0.001, 0.002),
+    "strong": Route("strong", "large-model", 0.01, 0.02),
+}
+
+
+def test_heuristic_sends_research_questions_deep():
+    assert heuristic_classifier("What is an RCT?") == "fast"
+    assert heuristic_classifier("Compare the methodology of these studies") == "deep"
+    assert heuristic_classifier("Why? And how?") == "deep"
+    assert heuristic_classifier("word " * 41) == "deep"
+
+
+def test_override_wins_over_the_classifier():
+    router = ModelRouter(classifier=lambda prompt: "fast")
+    decision = router.route("hi", "deep")
+    assert (decision.route, decision.model, decision.reason) == ("deep", DEFAULT_ROUTES["deep"].model, "topic override")
+    assert router.route("hi", "missing").route == "fast"
+
+
+def test_unknown_routes_fall_back_to_the_last_route():
+    router = ModelRouter(ROUTES, classifier=lambda prompt: "deep")
+    decision = router.route("hi")
+    assert decision.route == "strong" and decision.reason == "unknown route 'deep'"
+
+
+def test_unknown_routes_fall_back_to_the_configured_default():
+    router = ModelRouter(ROUTES, classifier=lambda prompt: "deep", default="cheap")
+    assert router.route("hi").model == "small-model"
+    with pytest.raises(ValueError):
+        ModelRouter(ROUTES, default="deep")
+
+
+def test_reported_usage_replaces_estimates():
+    router = ModelRouter(ROUTES, classifier=lambda prompt: "cheap")
+    estimated, reported = router.route("a"), router.route("b")
+    router.record(estimated, 1000, 500)
+    router.record(reported, 1000, 500, {"prompt_tokens": 2000, "completion_tokens": 100, "cached_tokens": 0})
+    assert estimated.cost == pytest.approx(0.002)
+    assert reported.cost == pytest.approx(0.0022)
+    assert estimated.latency is not None
+
+    [row] = router.stats()
+    assert row["Route"] == "cheap" and row["Queries"] == 2
+    assert row["Cost ($)"] == pytest.approx(0.0042)
@@ -0,0 +1,141 @@
+import logging
+import time
+
+import numpy as np
+import pytest
+
+from authentifi import scoring
+from authentifi.scoring import ResponseClassifier, ScoreTracker, ScoringService
+
+BIASED = "This is clearly and obviously the best policy; critics are absurd and it proves everything."
+HEDGED = "Some studies suggest it may help, however evidence is mixed and the limitations are uncertain."
+DEEP = ("A randomized controlled study with a large sample found a significant correlation; "
+        "the methodology and limitations are discussed in the peer reviewed literature (Smith et al.).")
+SHALLOW = "Basically it is great stuff and things are sure to work out."
+
+
+def _answers(*contents):
+    return [{"id": f"a{i}", "role": "assistant", "content": content} for i, content in enumerate(contents)]
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+class _CountingClassifier(ResponseClassifier):
+    def __init__(self):
+        base = ResponseClassifier.lexicon()
+        super().__init__(base.weights, base.intercept)
+        self.calls = []
+
+    def predict(self, texts):
+        self.calls.append(list(texts))
+        return super().predict(texts)
+
+
+class _FailingOnceClassifier(_CountingClassifier):
+    def predict(self, texts):
+        if not self.calls:
+            self.calls.append(None)
+            raise RuntimeError("model not ready")
+        return super().predict(texts)
+
+
+def test_lexicon_heads_separate_cue_words():
+    classifier = ResponseClassifier.lexicon()
+    bias, depth = classifier.predict([BIASED, HEDGED, DEEP, SHALLOW]).T
+    assert bias[0] > bias[1]
+    assert depth[2] > depth[3]
+    assert classifier.predict([]).shape == (0, 2)
+
+
+def test_classifier_loads_trained_weights(tmp_path):
+    weights = np.zeros((scoring.FEATURES, 2), dtype=np.float32)
+    np.savez(tmp_path / "weights.npz", weights=weights, intercept=np.array([0.0, 2.0]))
+    classifier = ResponseClassifier.load(tmp_path / "weights.npz")
+    assert classifier.predict([BIASED])[0] == pytest.approx([0.5, 1 / (1 + np.exp(-2.0))])
+    assert classifier.version != ResponseClassifier.lexicon().version
+    assert ResponseClassifier.lexicon().version == ResponseClassifier.lexicon().version
+
+
+def test_tracker_means_are_weighted_by_length():
+    tracker = ScoreTracker()
+    assert tracker.mean("bias") is None
+    tracker.record(1, np.array([1.0, 0.0]), 30)
+    tracker.record(3, np.array([0.0, 1.0]), 10)
+    tracker.record(3, np.array([1.0, 1.0]), 10)
+    assert tracker.mean("bias") == pytest.approx(0.75)
+    assert tracker.mean("depth") == pytest.approx(0.25)
+
+
+def test_pending_returns_new_assistant_messages_once():
+    tracker = ScoreTracker()
+    messages = [{"id": "u0", "role": "user", "content": "q"}] + _answers("a")
+    assert [position for position, _ in tracker.pending(messages)] == [1]
+    assert tracker.pending(messages) == []
+    tracker.rewind(1)
+    assert [position for position, _ in tracker.pending(messages)] == [1]
+
+
+def test_scores_recorded_after_a_fork_reach_the_fork():
+    parent = ScoreTracker()
+    messages = _answers(BIASED, HEDGED, DEEP)
+    parent.pending(messages)
+    fork = parent.fork(2)
+    parent.record(0, np.array([0.8, 0.2]), 10)
+    parent.record(2, np.array([0.1, 0.9]), 10)
+    assert fork.mean("bias") == pytest.approx(0.8)
+    assert parent.mean("bias") == pytest.approx(0.45)
+
+    nested = fork.fork(2)
+    parent.record(1, np.array([0.2, 0.2]), 10)
+    assert fork.mean("bias") == pytest.approx(0.5)
+    assert nested.mean("bias") == pytest.approx(0.5)
+
+
+def test_score_batch_hits_the_memory_and_database_caches(tmp_path):
+    classifier = _CountingClassifier()
+    service = ScoringService(tmp_path / "scores.db", classifier)
+    tracker = ScoreTracker()
+    batch = [(tracker, i, message) for i, message in enumerate(_answers(BIASED, HEDGED, BIASED))]
+    service.score_batch(batch)
+    assert classifier.calls == [[BIASED, HEDGED]]
+    assert service.inferred == 2 and service.batches == 1
+
+    other = ScoreTracker()
+    service.score_batch([(other, 0, _answers(HEDGED)[0])])
+    assert len(classifier.calls) == 1
+    assert other.mean("bias") == pytest.approx(float(classifier.predict([HEDGED])[0, 0]))
+
+    restarted_classifier = _CountingClassifier()
+    restarted = ScoringService(tmp_path / "scores.db", restarted_classifier)
+    restarted.score_batch([(ScoreTracker(), 0, _answers(DEEP)[0]), (ScoreTracker(), 1, _answers(BIASED)[0])])
+    assert restarted_classifier.calls == [[DEEP]]
+
+
+def test_enqueued_messages_are_scored_in_the_background(tmp_path):
+    service = ScoringService(tmp_path / "scores.db")
+    tracker = ScoreTracker()
+    messages = [{"id": "u0", "role": "user", "content": "q"}] + _answers(DEEP, SHALLOW)
+    assert service.enqueue(tracker, messages) == 2
+    _wait(lambda: tracker.recorded.sum() == 2)
+    assert tracker.recorded[1] and tracker.recorded[2]
+    assert service.enqueue(tracker, messages) == 0
+
+
+def test_failed_batch_is_logged_and_queued_again(tmp_path, caplog):
+    classifier = _FailingOnceClassifier()
+    service = ScoringService(tmp_path / "scores.db", classifier)
+    tracker = ScoreTracker()
+    messages = _answers(DEEP, SHALLOW)
+    with caplog.at_level(logging.ERROR, logger="authentifi.scoring"):
+        assert service.enqueue(tracker, messages) == 2
+        _wait(lambda: tracker.cursor == 0)
+    assert "messages failed" in caplog.text
+    assert tracker.mean("depth") is None
+
+    assert service.enqueue(tracker, messages) == 2
+    _wait(lambda: tracker.mean("depth") is not None)
@@ -0,0 +1,37 @@
+from authentifi.search import SearchIndex, SearchSession
+
+
+def _topics():
+    return {
+        "t1": {"name": "Retention", "messages": [{"content": "Spaced practice helps retention."}]},
+        "t2": {"name": "Math", "messages": [{"content": "Retention of formulas"}, {"content": "Retrieval practice"}]},
+    }
+
+
+def test_search_matches_names_and_messages():
+    index = SearchIndex()
+    index.sync(_topics())
+    session = SearchSession(index)
+    assert {(hit.topic_id, hit.matches) for hit in session.search("retention")} == {("t1", 2), ("t2", 1)}
+    assert [hit.topic_id for hit in session.search("ma")] == ["t2"]
+    assert session.search("   ") == []
+
+
+def test_longer_query_refines_the_cached_prefix():
+    index = SearchIndex()
+    index.sync(_topics())
+    session = SearchSession(index)
+    session.search("ret")
+    index.candidates = None  # a refined query must not go back to the index
+    assert {hit.topic_id for hit in session.search("retri")} == {"t2"}
+
+
+def test_new_messages_invalidate_cached_results():
+    topics = _topics()
+    index = SearchIndex()
+    index.sync(topics)
+    session = SearchSession(index)
+    assert [hit.topic_id for hit in session.search("interleaving")] == []
+    topics["t1"]["messages"].append({"content": "Interleaving also works"})
+    index.sync(topics)
+    assert [hit.topic_id for hit in session.search("interleaving")] == ["t1"]
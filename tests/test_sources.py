@@ -0,0 +1,106 @@
+import pytest
+
+from authentifi.sources import SourceIndex, StreamingSourceExtractor, find_sources, normalize_doi, normalize_url
+
+
+def _keys(text):
+    return [key for key, _, _, _ in find_sources(text)]
+
+
+def test_url_normalization_drops_tracking_and_trailing_noise():
+    assert normalize_url("HTTPS://Example.COM/paper/?utm_source=x&id=3).") == "https://example.com/paper?id=3"
+    assert normalize_url("https://example.com/a/") == normalize_url("https://example.com/a")
+
+
+def test_doi_normalization():
+    assert normalize_doi("10.1000/ABC.123).") == "10.1000/abc.123"
+
+
+def test_references_are_found_in_text_order():
+    text = ("Smith et al. (2020) reported gains, see https://doi.org/10.1000/XYZ and "
+            "https://example.com/study?utm_medium=email; also 10.2000/abc (Jones & Lee, 2019).")
+    assert _keys(text) == [
+        "cite:smith|2020", "doi:10.1000/xyz", "url:https://example.com/study", "doi:10.2000/abc", "cite:jones|2019",
+    ]
+
+
+def test_citations_inside_urls_are_ignored():
+    assert _keys("https://example.com/Smith, 2020/report") == ["url:https://example.com/Smith"]
+
+
+@pytest.mark.parametrize("text", [
+    "The policy changed in January, 2021 across districts.",
+    "Enrollment rose in Sept, 2019.",
+    "Scores were collected on Monday, 2022 schedules.",
+    "Data from Spring (2020) and Autumn, 2021.",
+    "Since (2020) the program has grown.",
+    "This was true In 2019, but not later.",
+])
+def test_dates_are_not_citations(text):
+    assert [key for key in _keys(text) if key.startswith("cite:")] == []
+
+
+@pytest.mark.parametrize("text, key", [
+    ("(Smith, 2020)", "cite:smith|2020"),
+    ("Smith (2020)", "cite:smith|2020"),
+    ("Smith et al., 2021b", "cite:smith|2021"),
+    ("(O'Neil and Baker, 2018)", "cite:o'neil|2018"),
+    ("Garcia-Lopez (1999)", "cite:garcia-lopez|1999"),
+])
+def test_author_year_citations(text, key):
+    assert _keys(text) == [key]
+
+
+def test_streamed_references_are_indexed_only_on_commit():
+    index = SourceIndex()
+    extractor = StreamingSourceExtractor(index, "a1", 1)
+    for chunk in ["See (Smith, 20", "20) and\nhttps://exa", "mple.com/x"]:
+        extractor.feed(chunk)
+    extractor.finish()
+    assert index.total_references == 0
+    extractor.commit()
+    assert index.total_references == 2
+    assert {key for key in index.sources} == {"cite:smith|2020", "url:https://example.com/x"}
+    extractor.commit()
+    assert index.total_references == 2
+
+
+def test_abandoned_stream_leaves_no_references():
+    index = SourceIndex()
+    extractor = StreamingSourceExtractor(index, "a1", 1)
+    extractor.feed("Partial answer citing (Smith, 2020)\n")
+    messages = [{"id": "u1", "role": "user", "content": "q"}]
+    index.catch_up(messages)
+    assert index.total_references == 0 and index.sources == {}
+
+
+def test_catch_up_skips_streamed_messages_and_counts_the_rest():
+    index = SourceIndex()
+    messages = [
+        {"id": "u1", "role": "user", "content": "What did (Smith, 2020) find?"},
+        {"id": "a1", "role": "assistant", "content": "(Smith, 2020) and (Jones, 2019)."},
+        {"id": "a2", "role": "assistant", "content": "Streamed (Smith, 2020)."},
+    ]
+    extractor = StreamingSourceExtractor(index, "a2", 2)
+    extractor.feed(messages[2]["content"])
+    index.catch_up(messages)
+    extractor.commit()
+    index.catch_up(messages)
+    assert index.total_references == 3
+    assert index.sources["cite:smith|2020"].count == 2
+    assert index.sources["cite:smith|2020"].positions == [1, 2]
+    assert [source.key for source in index.ranked(1)] == ["cite:smith|2020"]
+
+
+@pytest.mark.parametrize("text, title", [
+    ('Smith (2020). "Spaced practice and retention." Journal of Learning.', "Spaced practice and retention"),
+    ("(Smith, 2020), “Peer tutoring in rural schools”", "Peer tutoring in rural schools"),
+])
+def test_quoted_titles_after_a_year_are_sources(text, title):
+    found = [item for item in find_sources(text) if item[1] == "title"]
+    assert found == [(f"title:{title.lower()}", "title", title, "")]
+
+
+def test_quotes_without_a_reference_are_not_titles():
+    assert [key for key in _keys('She said "this is not a paper title" twice in 2020.') if key.startswith("title:")] == []
+    assert [key for key in _keys('Smith (2020) "too short"') if key.startswith("title:")] == []
@@ -0,0 +1,69 @@
+import re
+
+from authentifi.summaries import SummaryTree, extractive_summary
+
+
+def _messages(count):
+    return [{"role": "user" if i % 2 == 0 else "assistant",
+             "content": f"Point {i} opens here. Detail {i} follows with evidence. Conclusion {i} closes it."}
+            for i in range(count)]
+
+
+def _covered(text):
+    return {int(n) for n in re.findall(r"(?:Point|Detail|Conclusion) (\d+)", text)}
+
+
+def test_summary_keeps_every_text_within_budget():
+    texts = [f"First {i}. Second {i}. Third {i}." for i in range(6)]
+    summary = extractive_summary(texts, max_chars=200)
+    assert len(summary) <= 200
+    assert _covered(summary.replace("First", "Point")) == set(range(6))
+    assert extractive_summary([]) == ""
+    assert extractive_summary(["", "   "]) == ""
+
+
+def test_short_text_leaves_budget_for_the_rest():
+    summary = extractive_summary(["Short.", "One long sentence here. " * 20], max_chars=300)
+    assert summary.startswith("Short. ")
+    assert len(summary) > 200
+
+
+def test_long_sentence_is_trimmed():
+    assert extractive_summary(["x" * 1000], max_chars=100).endswith("...")
+    assert len(extractive_summary(["x" * 1000], max_chars=100)) <= 100
+
+
+def test_parents_cover_every_message_of_their_children():
+    tree = SummaryTree()
+    tree.update(_messages(128))
+    for level, nodes in enumerate(tree.levels):
+        for node in nodes:
+            assert len(node.text) <= tree.budget(level)
+            covered = _covered(node.text)
+            if level <= 1:
+                assert covered == set(range(node.start, node.end))
+            else:
+                span = (node.end - node.start) // tree.fanout
+                assert all(covered & set(range(start, start + span)) for start in range(node.start, node.end, span))
+    assert tree.budget(1) > tree.budget(0)
+    assert tree.budget(10) == tree.max_parent_chars
+
+
+def test_digest_covers_the_prefix_in_order():
+    tree = SummaryTree()
+    tree.update(_messages(75))
+    digest = tree.digest()
+    assert [node.start for node in digest] == [0] + [node.end for node in digest[:-1]]
+    assert digest[-1].end == 75
+    assert [node.level for node in digest] == [1, 1, 0, 0]
+
+
+def test_fork_shares_nodes_inside_the_fork_point():
+    messages = _messages(80)
+    tree = SummaryTree()
+    tree.update(messages)
+    branch = tree.fork(70)
+    assert branch.covered == 64
+    assert branch.levels[1][0] is tree.levels[1][0]
+    branch.update(messages[:70] + _messages(3))
+    assert branch.digest()[-1].end == 73